@@ -0,0 +1,262 @@
+"""
+RetireUS Analysis Pipeline
+==========================
+Formats quiz responses, detects red flags and computes every score and
+analytic returned by /api/analyze. Kept free of Flask so the same pipeline
+can serve single, batch and streaming requests.
+"""
+
+from red_flag_detector import RedFlagDetector, ServiceTier
+from scoring import calculate_pacing_score, calculate_pacing_scores, calculate_tax_planning_scores, \
+    calculate_risk_of_failure_score, calculate_roth_conversion_plan
+from withdrawal_simulator import simulate_withdrawals
+from concentration_risk import DEFAULT_CONCENTRATION, estimate_concentration_risk, unit_risk
+from fee_drag import analyze_fee_drag
+from estate_projection import project_estate_summaries
+from historical_replay import ALLOCATION_MAP, load_historical_returns
+from reference_population import load_reference_population, percentile_ranks_batch
+from load_control import FidelityLevel
+
+# Initialize detector
+detector = RedFlagDetector()
+
+# Quiz fields that hold lists of choices
+MULTI_SELECT_FIELDS = ['q2_concerns', 'q8_work_benefits', 'q11_account_types']
+
+# Simulation path counts per fidelity level (closed_form skips simulations)
+SIMULATION_PATHS = {
+    FidelityLevel.FULL: {'withdrawal': 2000, 'concentration': 20000},
+    FidelityLevel.REDUCED: {'withdrawal': 500, 'concentration': 5000},
+}
+
+
+def preload_tables():
+    """
+    Build the read-only tables every analysis shares in this process: the
+    historical returns, the reference population and the simulated stock
+    and portfolio returns for each style at every simulated fidelity. A
+    preforking server calls this before fork so workers share them.
+    """
+    load_historical_returns()
+    load_reference_population()
+    for paths in SIMULATION_PATHS.values():
+        for style in ALLOCATION_MAP:
+            unit_risk(style, DEFAULT_CONCENTRATION, paths['concentration'])
+
+
+def analyze_responses(responses, fidelity=FidelityLevel.FULL):
+    """
+    Run the full analysis for one set of raw quiz responses
+    Returns: dict with red flags, recommended plan, scores and analytics
+    """
+    return analyze_formatted(format_responses(responses), fidelity)
+
+
+def analyze_formatted(formatted_responses, fidelity=FidelityLevel.FULL):
+    """
+    analyze_responses for responses already run through format_responses
+    Returns: dict with red flags, recommended plan, scores and analytics
+    """
+    return _analyze_formatted([formatted_responses], fidelity)[0]
+
+
+def analyze_batch(responses_list, fidelity=FidelityLevel.FULL):
+    """
+    Run the full analysis for many sets of raw quiz responses.
+    
+    The scores and projections that have batch forms run once for the whole
+    batch. If that pass fails, the items are re-run one at a time so a bad
+    item only fails itself.
+    
+    Returns: list in input order of result dicts, or {'error': message} for
+             items that could not be analyzed
+    """
+    results = [None] * len(responses_list)
+    formatted_list = []
+    positions = []
+    for i, responses in enumerate(responses_list):
+        if not isinstance(responses, dict):
+            results[i] = {'error': 'Each item must be a JSON object of quiz responses'}
+            continue
+        try:
+            formatted_list.append(format_responses(responses))
+            positions.append(i)
+        except Exception as e:
+            results[i] = {'error': str(e)}
+    
+    try:
+        analyzed = _analyze_formatted(formatted_list, fidelity)
+    except Exception:
+        analyzed = []
+        for formatted_responses in formatted_list:
+            try:
+                analyzed.append(_analyze_formatted([formatted_responses], fidelity)[0])
+            except Exception as e:
+                analyzed.append({'error': str(e)})
+    
+    for i, result in zip(positions, analyzed):
+        results[i] = result
+    return results
+
+
+def _analyze_formatted(formatted_list, fidelity):
+    """
+    Analyze already formatted responses, using the batch form of each
+    score and projection where one exists
+    Returns: list of result dicts, in input order
+    """
+    if not formatted_list:
+        return []
+    simulated = fidelity != FidelityLevel.CLOSED_FORM
+    paths = SIMULATION_PATHS.get(fidelity)
+    
+    pacing_scores = calculate_pacing_scores(formatted_list)
+    tax_planning_scores = calculate_tax_planning_scores(formatted_list)
+    estates = project_estate_summaries(formatted_list)
+    
+    # Detect red flags and score risk, then rank the whole batch at once
+    red_flag_lists = [detector.detect(formatted_responses) for formatted_responses in formatted_list]
+    risk_scores = [
+        calculate_risk_of_failure_score(formatted_responses, red_flags, pacing['score'])
+        for formatted_responses, red_flags, pacing in zip(formatted_list, red_flag_lists, pacing_scores)
+    ]
+    percentiles = percentile_ranks_batch(
+        [formatted_responses.get('q4_retirement_age', 65) for formatted_responses in formatted_list], {
+            'pacing_score': [pacing['score'] for pacing in pacing_scores],
+            'risk_score': [risk_of_failure['score'] for risk_of_failure in risk_scores],
+            'total_savings': [f.get('q12_total_savings', 0) for f in formatted_list],
+            'annual_savings': [f.get('q10_annual_savings', 0) for f in formatted_list],
+        })
+    
+    results = []
+    for formatted_responses, red_flags, pacing, tax_planning, risk_of_failure, estate, ranks in zip(
+            formatted_list, red_flag_lists, pacing_scores, tax_planning_scores, risk_scores, estates,
+            percentiles):
+        results.append(_analyze_one(formatted_responses, red_flags, pacing, tax_planning,
+                                    risk_of_failure, estate, ranks, fidelity, simulated, paths))
+    return results
+
+
+def _analyze_one(formatted_responses, red_flags, pacing, tax_planning, risk_of_failure, estate,
+                 percentiles, fidelity, simulated, paths):
+    """Per-user part of the analysis, given the batch-computed flags, scores and ranks"""
+    recommendations = detector.get_recommendations(red_flags)
+    
+    # Price the old employer plan's fees behind basic_rf6 (closed form)
+    for rf in red_flags:
+        if rf.id == 'basic_rf6':
+            rf.details = {'fee_drag': analyze_fee_drag(formatted_responses)}
+    
+    # Size the single-stock exposure behind wealth_rf3
+    if simulated:
+        for rf in red_flags:
+            if rf.id == 'wealth_rf3':
+                rf.details = {'concentration_risk': estimate_concentration_risk(
+                    formatted_responses, n_paths=paths['concentration'])}
+    
+    # Calculate scores (NEW!)
+    historical_pacing = None
+    if simulated:
+        historical_pacing = calculate_pacing_score(formatted_responses, mode='historical')
+    
+    # Decumulation phase: withdrawal strategies after retirement
+    decumulation = None
+    if simulated:
+        decumulation = simulate_withdrawals(formatted_responses, n_paths=paths['withdrawal'])
+    
+    # Roth conversion schedule for Tax Mastery leads lacking tax diversification
+    roth_conversion = None
+    tax_flag_ids = {rf.id for rf in red_flags if rf.tier == ServiceTier.TAX_MASTERY}
+    if simulated and len(tax_flag_ids) >= 2 and tax_flag_ids & {'tax_rf3', 'tax_rf4'}:
+        roth_conversion = calculate_roth_conversion_plan(formatted_responses)
+    
+    # Get the recommended plan (highest tier only)
+    recommended_plan = None
+    if recommendations:
+        highest_tier = list(recommendations.keys())[0]  # Only one tier in dict now
+        flag_count = len(recommendations[highest_tier])
+        recommended_plan = {
+            'tier': highest_tier.value,
+            'flag_count': flag_count
+        }
+    else:
+        # Failsafe
+        recommended_plan = {
+            'tier': 'Basic Planning',
+            'flag_count': 0
+        }
+    
+    # Format response
+    result = {
+        'red_flags': [
+            {
+                'id': rf.id,
+                'name': rf.name,
+                'tier': rf.tier.value,
+                'description': rf.description,
+                'details': rf.details
+            }
+            for rf in red_flags
+        ],
+        'recommended_plan': recommended_plan,
+        'scores': {
+            'pacing': pacing,
+            'historical_pacing': historical_pacing,
+            'tax_planning': tax_planning,
+            'risk_of_failure': risk_of_failure
+        },
+        'decumulation': decumulation,
+        'roth_conversion': roth_conversion,
+        'estate_projection': estate,
+        'percentiles': percentiles,
+        'fidelity': fidelity.value,
+        'summary': {
+            'total_flags': len(red_flags),
+            'basic_count': sum(1 for rf in red_flags if rf.tier == ServiceTier.BASIC_PLANNING),
+            'tax_count': sum(1 for rf in red_flags if rf.tier == ServiceTier.TAX_MASTERY),
+            'wealth_count': sum(1 for rf in red_flags if rf.tier == ServiceTier.WEALTH_MASTERY),
+        }
+    }
+    
+    return result
+
+
+def format_responses(raw_responses):
+    """Format responses from web form to detector format"""
+    formatted = {}
+    
+    # Handle multi-select fields (arrays)
+    for field in MULTI_SELECT_FIELDS:
+        if field in raw_responses:
+            formatted[field] = raw_responses[field] if isinstance(raw_responses[field], list) else []
+    
+    # Handle numeric fields (ADDED q7_annual_retirement_cost)
+    numeric_fields = ['q4_retirement_age', 'q7_annual_retirement_cost', 'q8b_pension_income', 
+                      'q10_annual_savings', 'q12_total_savings']
+    for field in numeric_fields:
+        if field in raw_responses and raw_responses[field]:
+            try:
+                formatted[field] = int(raw_responses[field])
+            except (ValueError, TypeError):
+                formatted[field] = 0
+    
+    # Handle single-select fields
+    single_select_fields = [
+        'q9_investment_style', 
+        'timed_q1_value_more', 
+        'timed_q2_upset_more',
+        'timed_q3_saving_enough',
+        'timed_q4_on_pace',
+        'timed_q5_investments_appropriate',
+        'timed_q6_rmd_planning',
+        'timed_q7_market_crash',
+        'timed_q8_financial_plan',
+        'q_current_progress',
+        'q_tax_concern',
+        'q_market_volatility_concern'
+    ]
+    for field in single_select_fields:
+        if field in raw_responses:
+            formatted[field] = raw_responses[field]
+    
+    return formatted
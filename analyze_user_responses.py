@@ -8,9 +8,15 @@ USAGE:
 3. Run this file: python analyze_user_responses.py
 4. Get instant red flag analysis
 
+To analyze one of the QA scenarios in data/scenarios.json instead:
+    python analyze_user_responses.py high_earner
+
 """
 
+import sys
+
 from red_flag_detector import analyze_quiz_responses
+from scenario_catalog import scenario_catalog
 
 # ============================================================================
 # PASTE YOUR QUIZ RESPONSES HERE
@@ -87,6 +93,11 @@ if __name__ == "__main__":
     print("="*80)
     print("ANALYZING USER QUIZ RESPONSES")
     print("="*80)
+    if len(sys.argv) > 1:
+        if sys.argv[1] not in scenario_catalog.by_id:
+            print(f"Unknown scenario. Choose from: {', '.join(scenario_catalog.ids())}")
+            sys.exit(1)
+        test_responses = scenario_catalog.responses(sys.argv[1])
     print("\nProcessing responses...\n")
     
     red_flags, recommendations = analyze_quiz_responses(test_responses)
@@ -108,76 +119,3 @@ if __name__ == "__main__":
         print("   • Advanced optimization review")
     
     print("\n" + "="*80 + "\n")
-
-
-# ============================================================================
-# COMMON EXAMPLES FOR QUICK COPY-PASTE
-# ============================================================================
-
-"""
-EXAMPLE 1: Young person just starting out
-------------------------------------------
-{
-    'q2_concerns': ['running_out_of_money', 'not_being_on_pace'],
-    'q4_retirement_age': 55,
-    'q9_investment_style': 'a',
-    'q10_annual_savings': 3000,
-    'q11_account_types': [],
-    'q12_total_savings': 10000,
-    'timed_q4_on_pace': 'not_sure',
-    'timed_q7_market_crash': 'concerned_stressed',
-    'timed_q8_financial_plan': 'dont_have_one',
-}
-
-EXAMPLE 2: High net worth executive
-------------------------------------
-{
-    'q2_concerns': ['paying_too_much_taxes'],
-    'q4_retirement_age': 68,
-    'q8_work_benefits': ['pension', 'deferred_compensation', 'stock_options'],
-    'q8b_pension_income': 80000,
-    'q9_investment_style': 'b',
-    'q10_annual_savings': 50000,
-    'q11_account_types': ['old_employer_plan'],
-    'q12_total_savings': 2500000,
-    'timed_q6_rmd_planning': 'no_unclear',
-}
-
-EXAMPLE 3: Conservative mid-career
------------------------------------
-{
-    'q2_concerns': ['market_volatility'],
-    'q4_retirement_age': 62,
-    'q9_investment_style': 'd',
-    'q10_annual_savings': 18000,
-    'q11_account_types': ['roth_accounts', 'whole_life'],
-    'q12_total_savings': 600000,
-    'timed_q8_financial_plan': 'very_clear',
-}
-
-EXAMPLE 4: Edge case - exactly 2 tax flags (threshold)
--------------------------------------------------------
-{
-    'q2_concerns': ['paying_too_much_taxes'],
-    'q4_retirement_age': 57,
-    'q9_investment_style': 'b',
-    'q10_annual_savings': 20000,
-    'q11_account_types': ['old_employer_plan'],
-    'q12_total_savings': 800000,
-}
-
-EXAMPLE 5: Zero red flags (optimal planner)
---------------------------------------------
-{
-    'q2_concerns': [],
-    'q4_retirement_age': 65,
-    'q9_investment_style': 'b',
-    'q10_annual_savings': 25000,
-    'q11_account_types': ['roth_accounts', 'whole_life'],
-    'q12_total_savings': 1200000,
-    'timed_q4_on_pace': 'calculated_target',
-    'timed_q5_investments_appropriate': 'risk_return_target',
-    'timed_q6_rmd_planning': 'yes_long_term_plan',
-    'timed_q8_financial_plan': 'very_clear',
-}
-"""
@@ -4,309 +4,306 @@ RetireUS Red Flag Tester - Web Application
 A web interface for testing the red flag detection logic.
 """
 
-from flask import Flask, render_template, request, jsonify
+from flask import Flask, Response, redirect, render_template, request, jsonify, stream_with_context, url_for
+import itertools
 import json
-from red_flag_detector import RedFlagDetector, ServiceTier
-from scoring import calculate_pacing_score, calculate_tax_planning_score, calculate_risk_of_failure_score
+from build_assets import load_manifest
+from analysis import analyze_batch, preload_tables
+from load_control import FidelityLevel, LoadController, lower_fidelity, parse_request_start
+from ndjson_stream import MAX_STREAM_BYTES, StreamTooLarge, analyze_ndjson
+from bulk_analysis import analyze_records
+from result_cache import RULESET_VERSION, analyze_cached, answers_token, canonical_key, \
+    decode_answers_token, result_cache, single_flight
+from scenario_catalog import body_etag, encode_bundle, scenario_catalog
+from scenario_validation import validate_scenarios
+from wire_format import RESULT_MIME_TYPE, WireFormatError, decode_records, encode_results
 
 app = Flask(__name__)
 
-# Initialize detector
-detector = RedFlagDetector()
+# Per-worker load tracking for adaptive analytics fidelity
+load_controller = LoadController.from_env()
+
+# Full-fidelity GET results are fixed for a rule-set version (which is in the URL),
+# and fingerprinted assets for their hash
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+# Built asset names (empty until build_assets.py has run) and rendered pages
+asset_manifest = load_manifest()
+DIST_URL_PREFIX = '/static/dist/'
+rendered_pages = {}
+
+@app.template_global()
+def asset_url(path):
+    """URL of a static asset: its fingerprinted build when built (see build_assets.py)"""
+    return url_for('static', filename=asset_manifest.get(path, path))
+
+@app.after_request
+def cache_fingerprinted_assets(response):
+    """Fingerprinted assets never change content, so caches may keep them for good"""
+    if request.path.startswith(DIST_URL_PREFIX) and response.status_code == 200:
+        response.headers['Cache-Control'] = IMMUTABLE_CACHE_CONTROL
+    return response
 
 @app.route('/')
 def index():
     """Main page with quiz interface"""
-    return render_template('index.html')
+    return revalidated_response(*rendered_page('index.html'), mimetype='text/html')
 
 @app.route('/scenarios')
 def scenarios():
     """Scenario testing page"""
-    return render_template('scenarios.html')
+    return revalidated_response(*rendered_page('scenarios.html'), mimetype='text/html')
 
 @app.route('/api/analyze', methods=['POST'])
 def analyze():
     """Analyze quiz responses and return red flags + scores"""
     try:
-        responses = request.json
-        
-        # Convert responses to proper format
-        formatted_responses = format_responses(responses)
-        
-        # Detect red flags
-        red_flags = detector.detect(formatted_responses)
-        recommendations = detector.get_recommendations(red_flags)
-        
-        # Calculate scores (NEW!)
-        pacing = calculate_pacing_score(formatted_responses)
-        tax_planning = calculate_tax_planning_score(formatted_responses)
-        risk_of_failure = calculate_risk_of_failure_score(
-            formatted_responses, 
-            red_flags, 
-            pacing['score']
-        )
-        
-        # Get the recommended plan (highest tier only)
-        recommended_plan = None
-        if recommendations:
-            highest_tier = list(recommendations.keys())[0]  # Only one tier in dict now
-            flag_count = len(recommendations[highest_tier])
-            recommended_plan = {
-                'tier': highest_tier.value,
-                'flag_count': flag_count
-            }
-        else:
-            # Failsafe
-            recommended_plan = {
-                'tier': 'Basic Planning',
-                'flag_count': 0
-            }
+        body, _ = analyze_cached(request.json, load_controller.track, request_start_time())
         
-        # Format response
-        result = {
-            'red_flags': [
-                {
-                    'id': rf.id,
-                    'name': rf.name,
-                    'tier': rf.tier.value,
-                    'description': rf.description
-                }
-                for rf in red_flags
-            ],
-            'recommended_plan': recommended_plan,
-            'scores': {
-                'pacing': pacing,
-                'tax_planning': tax_planning,
-                'risk_of_failure': risk_of_failure
-            },
-            'summary': {
-                'total_flags': len(red_flags),
-                'basic_count': sum(1 for rf in red_flags if rf.tier == ServiceTier.BASIC_PLANNING),
-                'tax_count': sum(1 for rf in red_flags if rf.tier == ServiceTier.TAX_MASTERY),
-                'wealth_count': sum(1 for rf in red_flags if rf.tier == ServiceTier.WEALTH_MASTERY),
-            }
-        }
-        
-        return jsonify(result)
+        return Response(body, mimetype='application/json')
         
     except Exception as e:
         return jsonify({'error': str(e)}), 400
 
+@app.route('/api/analyze/<version>/<token>', methods=['GET'])
+def analyze_get(version, token):
+    """
+    Cacheable analysis of an answers token (see result_cache.answers_token).
+    URLs carry the rule-set version, so a full-fidelity result never changes
+    and caches may keep it indefinitely; the ETag lets them revalidate.
+    """
+    try:
+        formatted = decode_answers_token(token)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    # Send stale versions and non-canonical encodings to the one canonical URL
+    canonical_token = answers_token(formatted)
+    if version != RULESET_VERSION or token != canonical_token:
+        response = redirect(url_for('analyze_get', version=RULESET_VERSION, token=canonical_token), 308)
+        response.headers['Cache-Control'] = 'no-cache'
+        return response
+    
+    etag = canonical_key(formatted).hex()
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = IMMUTABLE_CACHE_CONTROL
+        return response
+    
+    try:
+        body, fidelity = analyze_cached(formatted, load_controller.track, request_start_time())
+    except Exception as e:
+        return jsonify({'error': str(e)}), 400
+    
+    response = Response(body, mimetype='application/json')
+    if fidelity == FidelityLevel.FULL:
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = IMMUTABLE_CACHE_CONTROL
+    else:
+        # Degraded under load: do not let caches keep it
+        response.headers['Cache-Control'] = 'no-store'
+    return response
+
+# Batches run detection and the closed-form scores unless asked for more: the
+# simulations cost ~20x as much per item and would cap bulk throughput
+BATCH_DEFAULT_FIDELITY = FidelityLevel.CLOSED_FORM
+
+@app.route('/api/analyze/batch', methods=['POST'])
+def analyze_batch_endpoint():
+    """
+    Analyze a JSON array of quiz responses; results come back in input order.
+    Items are analyzed at closed_form fidelity (red flags, tiers and the
+    closed-form scores, as /api/analyze returns under load);
+    ?fidelity=reduced or full adds the simulations, still subject to load
+    control.
+    """
+    try:
+        requested = FidelityLevel(request.args.get('fidelity', BATCH_DEFAULT_FIDELITY.value))
+    except ValueError:
+        return jsonify({'error': 'Unknown fidelity level'}), 400
+    
+    responses_list = request.get_json(silent=True)
+    if not isinstance(responses_list, list):
+        return jsonify({'error': 'Expected a JSON array of quiz responses'}), 400
+    
+    with load_controller.track(queued_since=request_start_time(), items=len(responses_list)) as level:
+        fidelity = lower_fidelity(requested, level)
+        results = analyze_batch(responses_list, fidelity)
+    
+    return jsonify({
+        'results': results,
+        'count': len(results),
+        'errors': sum(1 for result in results if 'error' in result),
+        'fidelity': fidelity.value
+    })
+
+@app.route('/api/analyze/stream', methods=['POST'])
+def analyze_stream_endpoint():
+    """
+    Analyze newline-delimited JSON quiz responses, streaming NDJSON results
+    back. Like /api/analyze/batch, records are analyzed at
+    BATCH_DEFAULT_FIDELITY unless ?fidelity= asks for more. Bodies over
+    MAX_STREAM_BYTES once decompressed get 413 (or, when results have
+    already been sent, a final error line).
+    """
+    try:
+        requested = FidelityLevel(request.args.get('fidelity', BATCH_DEFAULT_FIDELITY.value))
+    except ValueError:
+        return jsonify({'error': 'Unknown fidelity level'}), 400
+    
+    compressed = request.headers.get('Content-Encoding', '').lower() == 'gzip'
+    if not compressed and (request.content_length or 0) > MAX_STREAM_BYTES:
+        return jsonify({'error': f'Upload larger than {MAX_STREAM_BYTES} bytes'}), 413
+    
+    results = analyze_ndjson(request.stream, compressed, track=load_controller.track, fidelity=requested)
+    try:
+        first = next(results, None)
+    except StreamTooLarge as e:
+        return jsonify({'error': str(e)}), 413
+    if first is not None:
+        results = itertools.chain([first], results)
+    
+    return Response(stream_with_context(results), mimetype='application/x-ndjson')
+
+@app.route('/api/analyze/packed', methods=['POST'])
+def analyze_packed_endpoint():
+    """Analyze binary wire-format records (see wire_format.py); results come back packed"""
+    try:
+        records = decode_records(request.get_data(cache=False))
+    except WireFormatError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    return Response(encode_results(analyze_records(records)), mimetype=RESULT_MIME_TYPE)
+
+@app.route('/api/cache/stats', methods=['GET'])
+def cache_stats():
+    """Shared result cache counters (across every worker on this host) and this worker's coalescing counts"""
+    if result_cache is None:
+        return jsonify({'enabled': False, 'coalescing': single_flight.stats()})
+    return jsonify({'enabled': True, **result_cache.stats(), 'coalescing': single_flight.stats()})
+
 @app.route('/api/scenarios/list', methods=['GET'])
 def list_scenarios():
     """Get list of all test scenarios"""
-    scenarios = [
-        {
-            'id': 'young_professional',
-            'name': 'Young Professional - Just Starting Out',
-            'description': 'Multiple basic planning issues, early retirement penalty',
-            'expected_flags': 7,
-            'expected_tiers': ['Basic Planning', 'Tax Mastery']
-        },
-        {
-            'id': 'high_earner',
-            'name': 'High Earner Approaching Retirement',
-            'description': 'Executive compensation, high net worth, tax complexity',
-            'expected_flags': 7,
-            'expected_tiers': ['Basic Planning', 'Tax Mastery', 'Wealth Mastery']
-        },
-        {
-            'id': 'conservative',
-            'name': 'Conservative Mid-Career Investor',
-            'description': 'Risk-averse with inflation concerns',
-            'expected_flags': 2,
-            'expected_tiers': ['Basic Planning']
-        },
-        {
-            'id': 'optimal',
-            'name': 'Optimal Retirement Planner',
-            'description': 'Well-prepared with minimal issues',
-            'expected_flags': 0,
-            'expected_tiers': []
-        },
-        {
-            'id': 'tax_threshold',
-            'name': 'Tax Mastery Threshold Test',
-            'description': 'Exactly 2 tax flags (edge case)',
-            'expected_flags': 2,
-            'expected_tiers': ['Tax Mastery']
-        },
-        {
-            'id': 'age_58',
-            'name': 'Age 58 Boundary Test',
-            'description': 'Early retirement penalty boundary',
-            'expected_flags': 1,
-            'expected_tiers': []
-        },
-        {
-            'id': 'age_68',
-            'name': 'Age 68 Boundary Test',
-            'description': 'RMD planning boundary',
-            'expected_flags': 1,
-            'expected_tiers': []
-        },
-        {
-            'id': 'savings_10k',
-            'name': 'Annual Savings $10k Boundary',
-            'description': 'Limited savings boundary test',
-            'expected_flags': 1,
-            'expected_tiers': ['Basic Planning']
-        },
-        {
-            'id': 'wealth_2m',
-            'name': 'Total Savings $2M+ Boundary',
-            'description': 'Estate planning threshold test',
-            'expected_flags': 1,
-            'expected_tiers': ['Wealth Mastery']
-        }
-    ]
-    
-    return jsonify(scenarios)
+    return revalidated_response(scenario_catalog.list_body, scenario_catalog.list_etag)
 
 @app.route('/api/scenarios/<scenario_id>', methods=['GET'])
 def get_scenario(scenario_id):
     """Get specific scenario data"""
-    scenarios_data = {
-        'young_professional': {
-            'q2_concerns': ['running_out_of_money', 'not_being_on_pace'],
-            'q4_retirement_age': 55,
-            'q8_work_benefits': [],
-            'q9_investment_style': 'a',
-            'q10_annual_savings': 3000,
-            'q11_account_types': [],
-            'q12_total_savings': 10000,
-            'timed_q4_on_pace': 'not_sure',
-            'timed_q5_investments_appropriate': 'should_reevaluate',
-            'timed_q7_market_crash': 'concerned_stressed',
-            'timed_q8_financial_plan': 'dont_have_one',
-        },
-        'high_earner': {
-            'q2_concerns': ['paying_too_much_taxes'],
-            'q4_retirement_age': 68,
-            'q8_work_benefits': ['pension', 'deferred_compensation', 'stock_options'],
-            'q8b_pension_income': 80000,
-            'q9_investment_style': 'b',
-            'q10_annual_savings': 50000,
-            'q11_account_types': ['old_employer_plan'],
-            'q12_total_savings': 2500000,
-            'q_current_progress': 'multiple_retirement_accounts',
-            'timed_q6_rmd_planning': 'no_unclear',
-        },
-        'conservative': {
-            'q2_concerns': ['market_volatility'],
-            'q4_retirement_age': 62,
-            'q8_work_benefits': [],
-            'q9_investment_style': 'd',
-            'q10_annual_savings': 18000,
-            'q11_account_types': ['roth_accounts', 'whole_life'],
-            'q12_total_savings': 600000,
-            'timed_q8_financial_plan': 'very_clear',
-        },
-        'optimal': {
-            'q2_concerns': [],
-            'q4_retirement_age': 65,
-            'q8_work_benefits': [],
-            'q9_investment_style': 'b',
-            'q10_annual_savings': 25000,
-            'q11_account_types': ['roth_accounts', 'whole_life'],
-            'q12_total_savings': 1200000,
-            'timed_q4_on_pace': 'calculated_target',
-            'timed_q5_investments_appropriate': 'risk_return_target',
-            'timed_q6_rmd_planning': 'yes_long_term_plan',
-            'timed_q8_financial_plan': 'very_clear',
-        },
-        'tax_threshold': {
-            'q2_concerns': ['paying_too_much_taxes'],
-            'q4_retirement_age': 57,
-            'q8_work_benefits': [],
-            'q9_investment_style': 'b',
-            'q10_annual_savings': 20000,
-            'q11_account_types': ['old_employer_plan'],
-            'q12_total_savings': 800000,
-        },
-        'age_58': {
-            'q2_concerns': [],
-            'q4_retirement_age': 58,
-            'q8_work_benefits': [],
-            'q9_investment_style': 'b',
-            'q10_annual_savings': 20000,
-            'q11_account_types': ['roth_accounts'],
-            'q12_total_savings': 500000,
-        },
-        'age_68': {
-            'q2_concerns': [],
-            'q4_retirement_age': 68,
-            'q8_work_benefits': [],
-            'q9_investment_style': 'b',
-            'q10_annual_savings': 20000,
-            'q11_account_types': ['roth_accounts'],
-            'q12_total_savings': 500000,
-        },
-        'savings_10k': {
-            'q2_concerns': [],
-            'q4_retirement_age': 65,
-            'q8_work_benefits': [],
-            'q9_investment_style': 'b',
-            'q10_annual_savings': 10000,
-            'q11_account_types': ['roth_accounts'],
-            'q12_total_savings': 500000,
-        },
-        'wealth_2m': {
-            'q2_concerns': [],
-            'q4_retirement_age': 65,
-            'q8_work_benefits': [],
-            'q9_investment_style': 'b',
-            'q10_annual_savings': 50000,
-            'q11_account_types': ['roth_accounts'],
-            'q12_total_savings': 2500000,
-        }
-    }
-    
-    if scenario_id in scenarios_data:
-        return jsonify(scenarios_data[scenario_id])
-    else:
+    if scenario_id not in scenario_catalog.bodies:
+        return jsonify({'error': 'Scenario not found'}), 404
+    return revalidated_response(*scenario_catalog.bodies[scenario_id])
+
+@app.route('/api/scenarios/<scenario_id>/result', methods=['GET'])
+def get_scenario_result(scenario_id):
+    """Full-fidelity analysis of a scenario, served from the warmed catalog results"""
+    if scenario_id not in scenario_catalog.by_id:
         return jsonify({'error': 'Scenario not found'}), 404
+    
+    # No-op once create_app() or an earlier request has warmed the results
+    scenario_catalog.warm_results()
+    warmed = scenario_catalog.result(scenario_id)
+    if warmed is not None:
+        return revalidated_response(*warmed)
+    
+    try:
+        body, _ = analyze_cached(scenario_catalog.responses(scenario_id), load_controller.track,
+                                 request_start_time())
+    except Exception as e:
+        return jsonify({'error': str(e)}), 400
+    return Response(body, mimetype='application/json')
 
-def format_responses(raw_responses):
-    """Format responses from web form to detector format"""
-    formatted = {}
+@app.route('/api/scenarios/<scenario_id>/bundle', methods=['GET'])
+def get_scenario_bundle(scenario_id):
+    """
+    A scenario's metadata and responses in one payload, with its analysis
+    under 'result' when called with ?result=1
+    """
+    if scenario_id not in scenario_catalog.by_id:
+        return jsonify({'error': 'Scenario not found'}), 404
     
-    # Handle multi-select fields (arrays)
-    multi_select_fields = ['q2_concerns', 'q8_work_benefits', 'q11_account_types']
-    for field in multi_select_fields:
-        if field in raw_responses:
-            formatted[field] = raw_responses[field] if isinstance(raw_responses[field], list) else []
+    include_result = request.args.get('result', '0') not in ('0', 'false', '')
+    if include_result:
+        scenario_catalog.warm_results()
+    bundle = scenario_catalog.bundle(scenario_id, include_result)
+    if bundle is not None:
+        return revalidated_response(*bundle)
     
-    # Handle numeric fields (ADDED q7_annual_retirement_cost)
-    numeric_fields = ['q4_retirement_age', 'q7_annual_retirement_cost', 'q8b_pension_income', 
-                      'q10_annual_savings', 'q12_total_savings']
-    for field in numeric_fields:
-        if field in raw_responses and raw_responses[field]:
-            try:
-                formatted[field] = int(raw_responses[field])
-            except (ValueError, TypeError):
-                formatted[field] = 0
+    try:
+        body, _ = analyze_cached(scenario_catalog.responses(scenario_id), load_controller.track,
+                                 request_start_time())
+    except Exception as e:
+        return jsonify({'error': str(e)}), 400
+    body, _ = encode_bundle(scenario_catalog.by_id[scenario_id], json.loads(body))
+    return Response(body, mimetype='application/json')
+
+# Posted validation runs in the request's own worker, so bound its size
+MAX_VALIDATE_BYTES = 1024 * 1024
+MAX_VALIDATE_SCENARIOS = 256
+
+@app.route('/api/scenarios/validate', methods=['GET', 'POST'])
+def validate_scenarios_endpoint():
+    """
+    Check scenarios against their expected flags and tiers: the built-in
+    catalog on GET, a posted JSON array of scenarios on POST (at most
+    MAX_VALIDATE_SCENARIOS). ?fidelity=full includes the simulations
+    (default closed_form). Runs in this worker; large catalogs belong in
+    the scenario_validation.py CLI, which uses a process pool.
+    """
+    try:
+        fidelity = FidelityLevel(request.args.get('fidelity', FidelityLevel.CLOSED_FORM.value))
+    except ValueError:
+        return jsonify({'error': 'Unknown fidelity level'}), 400
     
-    # Handle single-select fields
-    single_select_fields = [
-        'q9_investment_style', 
-        'timed_q1_value_more', 
-        'timed_q2_upset_more',
-        'timed_q3_saving_enough',
-        'timed_q4_on_pace',
-        'timed_q5_investments_appropriate',
-        'timed_q6_rmd_planning',
-        'timed_q7_market_crash',
-        'timed_q8_financial_plan',
-        'q_current_progress',
-        'q_tax_concern',
-        'q_market_volatility_concern'
-    ]
-    for field in single_select_fields:
-        if field in raw_responses:
-            formatted[field] = raw_responses[field]
+    if request.method == 'GET':
+        scenarios = scenario_catalog.scenarios
+    else:
+        if request.content_length is None or request.content_length > MAX_VALIDATE_BYTES:
+            return jsonify({'error': f'Request body must be at most {MAX_VALIDATE_BYTES} bytes'}), 413
+        scenarios = request.get_json(silent=True)
+        if not isinstance(scenarios, list) or not all(isinstance(s, dict) for s in scenarios):
+            return jsonify({'error': 'Expected a JSON array of scenarios'}), 400
+        if len(scenarios) > MAX_VALIDATE_SCENARIOS:
+            return jsonify({'error': f'At most {MAX_VALIDATE_SCENARIOS} scenarios per request'}), 413
     
-    return formatted
+    return jsonify(validate_scenarios(scenarios, fidelity, workers=1))
+
+def revalidated_response(body, etag, mimetype='application/json'):
+    """Pre-encoded body, or 304 when the client's copy is current"""
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+    else:
+        response = Response(body, mimetype=mimetype)
+    response.set_etag(etag)
+    # Only changes on deploy: let clients keep it but revalidate
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+def rendered_page(template_name):
+    """Page bytes and ETag, rendered once per worker (pages only vary by deploy)"""
+    if template_name not in rendered_pages:
+        body = render_template(template_name, ruleset_version=RULESET_VERSION).encode('utf-8')
+        rendered_pages[template_name] = (body, body_etag(body))
+    return rendered_pages[template_name]
+
+def request_start_time():
+    """When the router queued this request, or None (see load_control.parse_request_start)"""
+    return parse_request_start(request.headers.get('X-Request-Start', ''))
+
+def create_app():
+    """
+    The app with every read-only structure built in this process: analysis
+    lookup tables, scenario catalog results and rendered pages. Gunicorn
+    calls this in the master with preload_app (see gunicorn.conf.py), so
+    workers inherit them copy-on-write instead of each building their own.
+    """
+    preload_tables()
+    scenario_catalog.warm_results()
+    with app.test_request_context():
+        for template_name in ('index.html', 'scenarios.html'):
+            rendered_page(template_name)
+    return app
 
 if __name__ == '__main__':
     app.run(host='0.0.0.0', port=5000, debug=True)
\ No newline at end of file
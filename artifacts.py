@@ -0,0 +1,201 @@
+"""
+RetireUS Prebuilt Artifacts
+===========================
+Read-only lookup tables (historical returns, reference population,
+simulated concentration-risk returns) written ahead of time by
+build_artifacts.py as .npy files, with a manifest recording the inputs
+version, each file's SHA-256, dtype and shape.
+
+Workers open them with numpy.load(mmap_mode='r'), so loading is a header
+read and every process on the host shares one copy in the OS page cache
+instead of building its own.
+
+The inputs version is a digest of only what the tables are generated from:
+data/* and the generating modules (ARTIFACT_INPUTS). Changes elsewhere in
+the app leave a built set valid, so `build_artifacts.py check` passes and a
+restart does not rebuild it.
+
+Each build is written to its own directory inside the artifacts directory,
+and the 'current' symlink is then flipped to it in one rename, so readers
+see either the old set or the new one and never a mix. The set 'current'
+replaced is kept for processes that resolved it before the flip; older sets
+are removed.
+
+The manifest is checked once per process. A missing set, a manifest built
+from other inputs or in another format, or any file whose checksum or shape
+does not match rejects the whole set, and each table falls back to being
+computed as before.
+
+Configuration:
+    RETIREUS_ARTIFACTS_DIR  artifacts directory (default: artifacts/ next to this file)
+"""
+
+import glob
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from functools import lru_cache
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+ARTIFACTS_DIR = os.environ.get('RETIREUS_ARTIFACTS_DIR', os.path.join(ROOT, 'artifacts'))
+MANIFEST_NAME = 'manifest.json'
+CURRENT_LINK = 'current'
+FORMAT_VERSION = 2
+
+# Modules the artifact tables are generated by (data/* is always included)
+ARTIFACT_INPUTS = ('build_artifacts.py', 'historical_replay.py', 'concentration_risk.py',
+                   'reference_population.py')
+
+
+def _file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _inputs_version():
+    """Digest of the data files and modules the artifacts are generated from"""
+    paths = sorted(os.path.join(ROOT, name) for name in ARTIFACT_INPUTS) + \
+        sorted(glob.glob(os.path.join(ROOT, 'data', '*')))
+    digest = hashlib.sha256()
+    for path in paths:
+        digest.update(os.path.basename(path).encode('utf-8'))
+        with open(path, 'rb') as f:
+            digest.update(f.read())
+    return digest.hexdigest()[:16]
+
+
+INPUTS_VERSION = _inputs_version()
+
+
+def _file_name(name):
+    return name.replace('/', '__') + '.npy'
+
+
+def write_artifacts(arrays, directory=ARTIFACTS_DIR):
+    """
+    Write one .npy file per array and a manifest as a new set in directory,
+    then atomically point directory/current at it
+
+    Args:
+        arrays: dict of artifact name -> numpy array
+    Returns: the manifest dict
+    """
+    os.makedirs(directory, exist_ok=True)
+    staging = tempfile.mkdtemp(prefix=f'{INPUTS_VERSION}-', dir=directory)
+    entries = {}
+    for name, array in sorted(arrays.items()):
+        array = np.ascontiguousarray(array)
+        path = os.path.join(staging, _file_name(name))
+        np.save(path, array, allow_pickle=False)
+        entries[name] = {
+            'file': _file_name(name),
+            'sha256': _file_sha256(path),
+            'dtype': array.dtype.str,
+            'shape': list(array.shape),
+        }
+
+    manifest = {'format': FORMAT_VERSION, 'inputs_version': INPUTS_VERSION, 'artifacts': entries}
+    with open(os.path.join(staging, MANIFEST_NAME), 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.chmod(staging, 0o755)
+
+    current = os.path.join(directory, CURRENT_LINK)
+    previous = os.path.basename(os.path.realpath(current)) if os.path.islink(current) else None
+    link = os.path.join(directory, f'.{CURRENT_LINK}-{os.path.basename(staging)}')
+    os.symlink(os.path.basename(staging), link)
+    os.replace(link, current)
+
+    for name in os.listdir(directory):
+        if name in (CURRENT_LINK, os.path.basename(staging), previous):
+            continue
+        path = os.path.join(directory, name)
+        if os.path.isdir(path) and not os.path.islink(path):
+            shutil.rmtree(path, ignore_errors=True)
+        else:
+            os.remove(path)
+    return manifest
+
+
+def current_set(directory=ARTIFACTS_DIR):
+    """Resolved directory of the set directory/current points at"""
+    return os.path.realpath(os.path.join(directory, CURRENT_LINK))
+
+
+def check_artifacts(directory=ARTIFACTS_DIR):
+    """
+    Validate the current set in an artifacts directory against the inputs
+    Returns: (manifest entries dict, or None when rejected, reason string)
+    """
+    return _check_set(current_set(directory))
+
+
+def _check_set(directory):
+    try:
+        with open(os.path.join(directory, MANIFEST_NAME)) as f:
+            manifest = json.load(f)
+    except FileNotFoundError:
+        return None, 'no artifacts built'
+    except (ValueError, NotADirectoryError):
+        return None, 'unreadable manifest'
+
+    if manifest.get('format') != FORMAT_VERSION:
+        return None, f"format {manifest.get('format')}, expected {FORMAT_VERSION}"
+    if manifest.get('inputs_version') != INPUTS_VERSION:
+        return None, f"built from inputs {manifest.get('inputs_version')}, current are {INPUTS_VERSION}"
+
+    entries = manifest.get('artifacts', {})
+    for name, entry in entries.items():
+        path = os.path.join(directory, entry['file'])
+        if not os.path.isfile(path):
+            return None, f'{name}: file missing'
+        if _file_sha256(path) != entry['sha256']:
+            return None, f'{name}: checksum mismatch'
+    return entries, f'{len(entries)} artifacts for inputs {INPUTS_VERSION}'
+
+
+@lru_cache(maxsize=1)
+def _valid_entries():
+    """
+    (set directory, entries) for the current set, resolved once per process
+    so a later flip of 'current' does not mix two sets
+    """
+    directory = current_set()
+    entries, _ = _check_set(directory)
+    return directory, entries or {}
+
+
+def load_artifact(name):
+    """
+    Memory-mapped read-only array for an artifact, or None when it is not
+    available (the caller computes the table instead)
+    """
+    directory, entries = _valid_entries()
+    entry = entries.get(name)
+    if entry is None:
+        return None
+    array = np.load(os.path.join(directory, entry['file']), mmap_mode='r', allow_pickle=False)
+    if array.dtype.str != entry['dtype'] or list(array.shape) != entry['shape']:
+        return None
+    return array
+
+
+def load_artifact_group(prefix):
+    """
+    Every artifact named '<prefix>/<key>' as a dict of key -> array, or
+    None when there are none
+    """
+    group = {}
+    for name in _valid_entries()[1]:
+        if name.startswith(prefix + '/'):
+            array = load_artifact(name)
+            if array is None:
+                return None
+            group[name[len(prefix) + 1:]] = array
+    return group or None
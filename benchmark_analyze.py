@@ -0,0 +1,72 @@
+"""
+RetireUS Analyze Benchmark
+==========================
+Times POST /api/analyze through the Flask app and through the raw WSGI
+fast path (fast_analyze.py), calling each WSGI app directly so no server
+or network cost is included, and reports the time each spends outside
+analysis.analyze_responses.
+
+USAGE:
+    python benchmark_analyze.py [requests]
+"""
+
+import json
+import os
+import sys
+import time
+
+# Measure the pipeline, not the shared result cache
+os.environ.setdefault('RETIREUS_CACHE_SLOTS', '0')
+
+from werkzeug.test import EnvironBuilder
+
+from analysis import analyze_responses
+from app import app, load_controller
+from fast_analyze import application
+from load_control import FidelityLevel
+
+SCENARIO = 'young_professional'
+
+
+def build_environs(body, count):
+    """Fresh WSGI environs for count POST /api/analyze requests"""
+    return [
+        EnvironBuilder(path='/api/analyze', method='POST', data=body,
+                       content_type='application/json').get_environ()
+        for _ in range(count)
+    ]
+
+
+def time_wsgi_app(wsgi_app, environs):
+    """Seconds per request for a WSGI app over prebuilt environs"""
+    def start_response(status, headers, exc_info=None):
+        pass
+
+    started = time.perf_counter()
+    for environ in environs:
+        b''.join(wsgi_app(environ, start_response))
+    return (time.perf_counter() - started) / len(environs)
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    with app.test_client() as client:
+        body = json.dumps(client.get(f'/api/scenarios/{SCENARIO}').get_json())
+
+    # Warm the caches, then pin fidelity so both paths do the same work
+    time_wsgi_app(app, build_environs(body, 20))
+    load_controller.latency_budget = float('inf')
+    load_controller.queue_budget = float('inf')
+    assert load_controller.level == FidelityLevel.FULL
+
+    responses = json.loads(body)
+    started = time.perf_counter()
+    for _ in range(count):
+        analyze_responses(responses)
+    pipeline = (time.perf_counter() - started) / count
+    print(f"{'pipeline':>10}: {pipeline * 1000:.3f} ms/request")
+
+    for name, wsgi_app in (('flask', app), ('fast path', application)):
+        per_request = time_wsgi_app(wsgi_app, build_environs(body, count))
+        print(f"{name:>10}: {per_request * 1000:.3f} ms/request ({1 / per_request:.0f} req/s), "
+              f"{(per_request - pipeline) * 1000:.3f} ms outside the pipeline")
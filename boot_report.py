@@ -0,0 +1,135 @@
+"""
+RetireUS Worker Memory and Boot Report
+======================================
+Starts gunicorn twice on a local port, first the plain way
+(gunicorn app:app, every worker importing and building everything itself)
+and then with gunicorn.conf.py (app built once in the master, gc frozen
+before fork). Each run sends the same requests and then reports:
+- boot time: launch until every worker has finished starting up (its CPU
+  time stops moving) and the app answers
+- per-worker RSS, PSS (shared pages split between the processes sharing
+  them) and USS (pages private to the worker), from /proc/<pid>/smaps_rollup
+
+Linux only (reads /proc).
+
+USAGE:
+    python boot_report.py [workers] [requests per worker]
+"""
+
+import json
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+from scenario_catalog import scenario_catalog
+
+PORT = 8765
+BOOT_TIMEOUT = 60
+# A worker counts as booted once its CPU time has not moved for this long
+SETTLE_SECONDS = 0.3
+
+
+def worker_pids(master_pid):
+    """Pids of the master's child processes"""
+    with open(f'/proc/{master_pid}/task/{master_pid}/children') as f:
+        return [int(pid) for pid in f.read().split()]
+
+
+def cpu_ticks(pid):
+    """User plus system CPU time of a process, in clock ticks"""
+    with open(f'/proc/{pid}/stat') as f:
+        fields = f.read().rsplit(')', 1)[1].split()
+    return int(fields[11]) + int(fields[12])
+
+
+def memory_kb(pid):
+    """(rss, pss, uss) in kB from /proc/<pid>/smaps_rollup"""
+    fields = {}
+    with open(f'/proc/{pid}/smaps_rollup') as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == 'kB':
+                fields[parts[0].rstrip(':')] = int(parts[1])
+    return fields['Rss'], fields['Pss'], fields['Private_Clean'] + fields['Private_Dirty']
+
+
+def request(path, payload=None):
+    url = f'http://127.0.0.1:{PORT}{path}'
+    data = json.dumps(payload).encode('utf-8') if payload is not None else None
+    headers = {'Content-Type': 'application/json'} if data else {}
+    with urllib.request.urlopen(urllib.request.Request(url, data, headers), timeout=30) as response:
+        return response.read()
+
+
+def run(arguments, workers, requests_per_worker):
+    """Boot seconds and per-worker (rss, pss, uss) for one gunicorn configuration"""
+    started = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', *arguments, '--workers', str(workers),
+         '--bind', f'127.0.0.1:{PORT}', '--log-level', 'warning'],
+        env={**os.environ, 'RETIREUS_CACHE_SLOTS': '0'})
+    try:
+        while True:
+            if time.perf_counter() - started > BOOT_TIMEOUT:
+                raise RuntimeError('gunicorn did not boot in time')
+            try:
+                if len(worker_pids(server.pid)) == workers:
+                    request('/')
+                    break
+            except OSError:
+                pass
+            time.sleep(0.02)
+
+        # Wait for every worker's CPU time to settle; boot ends at the last change
+        ticks = {}
+        changed = {}
+        while True:
+            now = time.perf_counter()
+            for pid in worker_pids(server.pid):
+                current = cpu_ticks(pid)
+                if ticks.get(pid) != current:
+                    ticks[pid] = current
+                    changed[pid] = now
+            if now - max(changed.values()) >= SETTLE_SECONDS:
+                break
+            time.sleep(0.01)
+        boot_seconds = max(changed.values()) - started
+
+        # The same traffic for both configurations
+        ids = scenario_catalog.ids()
+        for n in range(requests_per_worker * workers):
+            scenario_id = ids[n % len(ids)]
+            request('/api/analyze', scenario_catalog.responses(scenario_id))
+            request(f'/api/scenarios/{scenario_id}/bundle?result=1')
+
+        return boot_seconds, [memory_kb(pid) for pid in worker_pids(server.pid)]
+    finally:
+        server.send_signal(signal.SIGTERM)
+        server.wait(timeout=30)
+
+
+if __name__ == "__main__":
+    workers = int(sys.argv[1]) if len(sys.argv) > 1 else 4
+    requests_per_worker = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+
+    # The baseline gets an empty config file, or gunicorn would pick up
+    # ./gunicorn.conf.py by default
+    empty_config = tempfile.NamedTemporaryFile(suffix='.py')
+    configurations = (
+        ('gunicorn app:app', ['--config', empty_config.name, 'app:app']),
+        ('gunicorn.conf.py', ['--config', 'gunicorn.conf.py']),
+    )
+
+    print(f"{workers} workers, {requests_per_worker * workers * 2} requests per run\n")
+    for label, arguments in configurations:
+        boot_seconds, memory = run(arguments, workers, requests_per_worker)
+        print(f"{label}: booted in {boot_seconds:.2f}s")
+        print(f"  {'worker':<8}{'RSS MB':>10}{'PSS MB':>10}{'USS MB':>10}")
+        for n, (rss, pss, uss) in enumerate(memory):
+            print(f"  {n:<8}{rss / 1024:>10.1f}{pss / 1024:>10.1f}{uss / 1024:>10.1f}")
+        totals = [sum(column) / 1024 for column in zip(*memory)]
+        print(f"  {'total':<8}{totals[0]:>10.1f}{totals[1]:>10.1f}{totals[2]:>10.1f}\n")
@@ -0,0 +1,65 @@
+"""
+RetireUS Artifact Build
+=======================
+Writes the read-only lookup tables to artifacts/ as .npy files with a
+manifest (see artifacts.py), so workers memory-map them instead of
+building them at boot:
+- historical returns, parsed from data/historical_returns.csv
+- the reference population, unpacked from data/reference_population.npz
+- the simulated stock and portfolio returns behind concentration risk, for
+  every investment style at every simulated fidelity's path count
+
+Artifacts are tied to the inputs version (data/* and the modules that
+generate them, see artifacts.ARTIFACT_INPUTS): a stale set is rejected and
+the tables are computed as before. `check` exits non-zero when the current
+set is missing or stale, so a start command only rebuilds when needed:
+
+    python build_artifacts.py check || python build_artifacts.py
+
+USAGE:
+    python build_artifacts.py          # build
+    python build_artifacts.py check    # validate the existing artifacts
+"""
+
+import sys
+
+import numpy as np
+
+from analysis import SIMULATION_PATHS
+from artifacts import ARTIFACTS_DIR, check_artifacts, write_artifacts
+from concentration_risk import DEFAULT_SEED, STOCK_CORRELATION, compute_returns, returns_artifact_name
+from historical_replay import read_historical_returns
+from reference_population import SOURCE_KEY, read_reference_population
+
+
+def build_arrays():
+    """Every artifact, computed from the source data: dict of name -> array"""
+    years, returns = read_historical_returns()
+    arrays = {
+        'historical_returns/years': years,
+        'historical_returns/returns': returns,
+    }
+    for key, values in read_reference_population().items():
+        if key == SOURCE_KEY:
+            arrays[f'reference_population/{SOURCE_KEY}'] = np.array(values)
+        else:
+            arrays[f'reference_population/{key[0]}__{key[1]}'] = values
+
+    for n_paths in sorted({paths['concentration'] for paths in SIMULATION_PATHS.values()}):
+        for style in STOCK_CORRELATION:
+            arrays[returns_artifact_name(style, n_paths, DEFAULT_SEED)] = np.stack(
+                compute_returns(style, n_paths, DEFAULT_SEED))
+    return arrays
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == 'check':
+        entries, reason = check_artifacts()
+        print(f"{'OK' if entries is not None else 'REJECTED'}: {reason}")
+        sys.exit(0 if entries is not None else 1)
+
+    manifest = write_artifacts(build_arrays())
+    size = sum(np.prod(entry['shape']) * np.dtype(entry['dtype']).itemsize
+               for entry in manifest['artifacts'].values())
+    print(f"Wrote {len(manifest['artifacts'])} artifacts ({size / 1e6:.1f} MB) to {ARTIFACTS_DIR} "
+          f"for inputs {manifest['inputs_version']}")
@@ -0,0 +1,202 @@
+"""
+RetireUS Asset Build
+====================
+Minifies and fingerprints the stylesheets and scripts in static/ into
+static/dist/, and writes static/dist/manifest.json mapping each source path
+(e.g. 'js/app.js') to its hashed copy (e.g. 'dist/js/app.3f2a9c1b04de.js').
+
+Templates link assets through asset_url(), which looks paths up in the
+manifest, so a build changes every reference at once. A hashed file never
+changes content, so the app serves static/dist/ with immutable year-long
+cache headers. Without a manifest (development), asset_url() falls back to
+the unhashed files.
+
+Minification is whitespace and comment removal only: strings, template
+literals and regular expressions are copied as they are, and line breaks
+are kept so automatic semicolon insertion still applies.
+
+USAGE:
+    python build_assets.py
+"""
+
+import glob
+import hashlib
+import json
+import os
+import re
+import shutil
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+STATIC_DIR = os.path.join(ROOT, 'static')
+DIST_DIR = os.path.join(STATIC_DIR, 'dist')
+MANIFEST_PATH = os.path.join(DIST_DIR, 'manifest.json')
+
+ASSET_PATTERNS = ('css/*.css', 'js/*.js')
+
+# Characters after which a '/' starts a regular expression rather than a division
+_REGEX_PRECEDERS = set('(,=:[!&|?{};+-*%<>~^')
+_REGEX_KEYWORDS = ('return', 'typeof', 'case', 'do', 'else', 'in', 'of', 'void', 'delete', 'throw')
+
+
+def _copy_string(source, i, out):
+    """Copy the quoted string starting at source[i]; returns the index after it"""
+    quote = source[i]
+    j = i + 1
+    while j < len(source) and source[j] != quote:
+        j += 2 if source[j] == '\\' else 1
+    out.append(source[i:j + 1])
+    return j + 1
+
+
+def _copy_regex(source, i, out):
+    """Copy the regular expression literal (and flags) starting at source[i]"""
+    j = i + 1
+    in_class = False
+    while j < len(source) and (in_class or source[j] != '/'):
+        if source[j] == '\\':
+            j += 1
+        elif source[j] == '[':
+            in_class = True
+        elif source[j] == ']':
+            in_class = False
+        j += 1
+    j += 1
+    while j < len(source) and source[j].isalpha():
+        j += 1
+    out.append(source[i:j])
+    return j
+
+
+def _regex_allowed(out):
+    """Whether a '/' following the output so far starts a regular expression"""
+    previous = ''.join(out[-3:]).rstrip()
+    if not previous:
+        return True
+    if previous[-1] in _REGEX_PRECEDERS:
+        return True
+    return re.search(r'\b(' + '|'.join(_REGEX_KEYWORDS) + r')$', previous) is not None
+
+
+def _append_space(out, space):
+    """Append a space or line break, merging it with whitespace already there"""
+    if out and out[-1] in (' ', '\n'):
+        if space == '\n':
+            out[-1] = '\n'
+    else:
+        out.append(space)
+
+
+def minify_js(source):
+    """JavaScript without comments, indentation or blank lines"""
+    out = []
+    # One entry per open template literal: brace depth of its current ${...}
+    templates = []
+    i = 0
+    while i < len(source):
+        char = source[i]
+        if templates and templates[-1] is None:
+            # Inside template literal text
+            j = i
+            while j < len(source) and source[j] != '`' and not source.startswith('${', j):
+                j += 2 if source[j] == '\\' else 1
+            out.append(source[i:j])
+            if source.startswith('${', j):
+                out.append('${')
+                templates[-1] = 0
+                i = j + 2
+            else:
+                out.append('`')
+                templates.pop()
+                i = j + 1
+        elif char == '`':
+            out.append('`')
+            templates.append(None)
+            i += 1
+        elif char in '\'"':
+            i = _copy_string(source, i, out)
+        elif source.startswith('//', i):
+            while i < len(source) and source[i] != '\n':
+                i += 1
+        elif source.startswith('/*', i):
+            i = source.index('*/', i + 2) + 2
+            _append_space(out, ' ')
+        elif char == '/' and _regex_allowed(out):
+            i = _copy_regex(source, i, out)
+        elif char.isspace():
+            j = i
+            while j < len(source) and source[j].isspace():
+                j += 1
+            _append_space(out, '\n' if '\n' in source[i:j] else ' ')
+            i = j
+        else:
+            if templates and char == '{':
+                templates[-1] += 1
+            elif templates and char == '}':
+                if templates[-1] == 0:
+                    templates[-1] = None
+                else:
+                    templates[-1] -= 1
+            out.append(char)
+            i += 1
+
+    return ''.join(out).strip() + '\n'
+
+
+def minify_css(source):
+    """CSS without comments and with whitespace collapsed (strings untouched)"""
+    parts = re.split(r'("(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\')', source)
+    for n in range(0, len(parts), 2):
+        text = re.sub(r'/\*.*?\*/', '', parts[n], flags=re.S)
+        text = re.sub(r'\s+', ' ', text)
+        text = re.sub(r'\s*([{};,])\s*', r'\1', text)
+        text = re.sub(r':\s+', ':', text)
+        parts[n] = text.replace(';}', '}')
+    return ''.join(parts).strip() + '\n'
+
+
+MINIFIERS = {'.css': minify_css, '.js': minify_js}
+
+
+def build(static_dir=STATIC_DIR, dist_dir=DIST_DIR):
+    """
+    Rebuild dist_dir from the sources in static_dir
+    Returns: manifest dict of source path -> fingerprinted path, both relative to static_dir
+    """
+    if os.path.isdir(dist_dir):
+        shutil.rmtree(dist_dir)
+
+    manifest = {}
+    for pattern in ASSET_PATTERNS:
+        for path in sorted(glob.glob(os.path.join(static_dir, pattern))):
+            name = os.path.relpath(path, static_dir).replace(os.sep, '/')
+            stem, ext = os.path.splitext(name)
+            with open(path, encoding='utf-8') as f:
+                content = MINIFIERS[ext](f.read()).encode('utf-8')
+
+            fingerprint = hashlib.sha256(content).hexdigest()[:12]
+            built = os.path.join(dist_dir, f'{stem}.{fingerprint}{ext}')
+            os.makedirs(os.path.dirname(built), exist_ok=True)
+            with open(built, 'wb') as f:
+                f.write(content)
+            manifest[name] = os.path.relpath(built, static_dir).replace(os.sep, '/')
+
+    with open(os.path.join(dist_dir, 'manifest.json'), 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    return manifest
+
+
+def load_manifest(path=MANIFEST_PATH):
+    """Manifest written by build(), or an empty dict when assets are not built"""
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+if __name__ == "__main__":
+    manifest = build()
+    for name, built in manifest.items():
+        before = os.path.getsize(os.path.join(STATIC_DIR, name))
+        after = os.path.getsize(os.path.join(STATIC_DIR, built))
+        print(f"{name:<20} -> {built}  ({before:,} -> {after:,} bytes)")
@@ -0,0 +1,97 @@
+"""
+RetireUS Reference Population - Offline Build
+=============================================
+Scores a population of quiz responses and writes the sorted per-bucket
+metric arrays that reference_population.py serves percentile ranks from.
+
+USAGE:
+    python build_reference_population.py                  # synthetic sample population
+    python build_reference_population.py archive.jsonl    # real archive, one JSON object per line
+
+Run it again whenever the archive, the scoring rules or the buckets change.
+"""
+
+import json
+import sys
+
+import numpy as np
+
+from red_flag_detector import RedFlagDetector
+from reference_population import AGE_BUCKETS, DATA_PATH, METRICS, SOURCE_KEY, age_bucket
+from scoring import calculate_pacing_scores, calculate_risk_of_failure_score
+
+SAMPLE_SIZE = 4000
+SAMPLE_SEED = 2024
+
+
+def sample_population(size=SAMPLE_SIZE, seed=SAMPLE_SEED):
+    """
+    Synthetic quiz responses, used until a real archive is available
+    """
+    rng = np.random.default_rng(seed)
+    concerns = ['running_out_of_money', 'not_being_on_pace', 'market_volatility', 'paying_too_much_taxes']
+    benefits = ['pension', 'deferred_compensation', 'stock_options']
+    accounts = ['roth_accounts', 'whole_life', 'annuity_contracts', 'old_employer_plan']
+
+    population = []
+    for _ in range(size):
+        responses = {
+            'q2_concerns': [c for c in concerns if rng.random() < 0.3],
+            'q4_retirement_age': int(rng.integers(55, 73)),
+            'q8_work_benefits': [b for b in benefits if rng.random() < 0.15],
+            'q9_investment_style': str(rng.choice(['a', 'b', 'c', 'd'], p=[0.1, 0.5, 0.25, 0.15])),
+            'q10_annual_savings': int(rng.lognormal(np.log(15000), 0.8)),
+            'q11_account_types': [a for a in accounts if rng.random() < 0.35],
+            'q12_total_savings': int(rng.lognormal(np.log(350000), 1.1)),
+            'timed_q7_market_crash': str(rng.choice(['wouldnt_bother_me', 'concerned_stressed'])),
+        }
+        if 'pension' in responses['q8_work_benefits']:
+            responses['q8b_pension_income'] = int(rng.integers(10000, 90000))
+        population.append(responses)
+    return population
+
+
+def build_reference_population(population, source):
+    """
+    Score every response and group the metrics into sorted per-bucket arrays
+
+    Args:
+        source: where the population came from ('synthetic' or 'archive')
+    Returns: dict of 'bucket__metric' -> sorted float64 array, plus the
+             source under SOURCE_KEY
+    """
+    detector = RedFlagDetector()
+    pacing_scores = calculate_pacing_scores(population)
+
+    rows = {name: {metric: [] for metric in METRICS} for name, _, _ in AGE_BUCKETS}
+    for responses, pacing in zip(population, pacing_scores):
+        red_flags = detector.detect(responses)
+        risk = calculate_risk_of_failure_score(responses, red_flags, pacing['score'])
+
+        bucket = rows[age_bucket(responses.get('q4_retirement_age', 65))]
+        bucket['pacing_score'].append(pacing['score'])
+        bucket['risk_score'].append(risk['score'])
+        bucket['total_savings'].append(responses.get('q12_total_savings', 0))
+        bucket['annual_savings'].append(responses.get('q10_annual_savings', 0))
+
+    arrays = {
+        f"{bucket}__{metric}": np.sort(np.array(values, dtype=np.float64))
+        for bucket, metrics in rows.items()
+        for metric, values in metrics.items()
+    }
+    arrays[SOURCE_KEY] = np.array(source)
+    return arrays
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        with open(sys.argv[1]) as f:
+            population = [json.loads(line) for line in f if line.strip()]
+        source = 'archive'
+    else:
+        population = sample_population()
+        source = 'synthetic'
+
+    arrays = build_reference_population(population, source)
+    np.savez_compressed(DATA_PATH, **arrays)
+    print(f"Wrote {DATA_PATH} from {len(population)} {source} responses")
@@ -0,0 +1,121 @@
+"""
+RetireUS Vectorized Bulk Analysis
+=================================
+Red flag detection, recommended tier and the closed-form scores for a whole
+array of wire-format records at once (see wire_format.py).
+
+Every rule in red_flag_detector.py and every score in scoring.py is
+evaluated as one numpy expression over the record columns, so the cost per
+record is a handful of array operations rather than a dict walk. The
+simulations and optimizers behind /api/analyze are not part of this path;
+the results match /api/analyze at closed_form fidelity.
+"""
+
+import numpy as np
+
+from scoring import RATE_MAP, RISK_FLAG_POINTS, pacing_below_target, pacing_score_values, \
+    risk_of_failure_score_values, tax_planning_score_values
+from wire_format import FLAG_IDS, RESULT_DTYPE, TIERS, answers, chose, numeric
+
+
+def detect_flags(records):
+    """
+    Every red flag rule over every record
+    Returns: dict of flag id -> boolean array
+    """
+    concerns = 'q2_concerns'
+    benefits = 'q8_work_benefits'
+    accounts = 'q11_account_types'
+
+    retirement_age = numeric(records, 'q4_retirement_age', 65)
+    style = answers(records, 'q9_investment_style')
+    on_pace = answers(records, 'timed_q4_on_pace')
+    rmd_planning = answers(records, 'timed_q6_rmd_planning')
+    financial_plan = answers(records, 'timed_q8_financial_plan')
+    progress = answers(records, 'q_current_progress')
+    tax_concern = answers(records, 'q_tax_concern')
+    has_pension = chose(records, benefits, 'pension')
+
+    return {
+        'basic_rf1': (chose(records, concerns, 'running_out_of_money')
+                      | chose(records, concerns, 'not_being_on_pace')
+                      | (on_pace == 'not_sure')),
+        'basic_rf2': (chose(records, concerns, 'not_being_on_pace')
+                      | (on_pace == 'not_sure')
+                      | (answers(records, 'timed_q5_investments_appropriate') == 'should_reevaluate')
+                      | (progress == 'savings_not_set_for_retirement')
+                      | (progress == 'havent_started_saving')
+                      | (financial_plan == 'dont_have_one')),
+        'basic_rf3': ((answers(records, 'q_market_volatility_concern') == 'not_sure_risk_exposure')
+                      | (financial_plan == 'dont_have_one')
+                      | chose(records, concerns, 'market_volatility')),
+        'basic_rf4': (style == 'a') | (answers(records, 'timed_q7_market_crash') == 'concerned_stressed'),
+        'basic_rf5': (style == 'c') | (style == 'd'),
+        'basic_rf6': chose(records, accounts, 'old_employer_plan'),
+        'basic_rf7': numeric(records, 'q10_annual_savings', 0) <= 10000,
+        'tax_rf1': retirement_age < 59,
+        'tax_rf2': ((retirement_age > 67)
+                    | (tax_concern == 'not_much_tax_free_savings')
+                    | (rmd_planning == 'no_unclear')
+                    | (has_pension & (progress == 'only_employer_account'))
+                    | (has_pension & (progress == 'multiple_retirement_accounts'))
+                    | (numeric(records, 'q8b_pension_income', 0) >= 75000)),
+        'tax_rf3': ((tax_concern == 'lot_in_pretax_accounts')
+                    | (tax_concern == 'not_much_tax_free_savings')
+                    | (progress == 'only_employer_account')),
+        'tax_rf4': ~chose(records, accounts, 'roth_accounts') & ~chose(records, accounts, 'whole_life'),
+        'tax_rf5': chose(records, concerns, 'paying_too_much_taxes') | (rmd_planning == 'no_unclear'),
+        'wealth_rf1': numeric(records, 'q12_total_savings', 0) > 2000000,
+        'wealth_rf2': chose(records, benefits, 'deferred_compensation') | chose(records, benefits, 'stock_options'),
+        'wealth_rf3': chose(records, benefits, 'stock_options'),
+    }
+
+
+def analyze_records(records):
+    """
+    Flags, recommended tier and scores for every record
+    Returns: structured array of wire_format.RESULT_DTYPE
+    """
+    flags = detect_flags(records)
+    results = np.zeros(len(records), dtype=RESULT_DTYPE)
+
+    for bit, flag_id in enumerate(FLAG_IDS):
+        results['flags'] |= flags[flag_id].astype(np.uint16) << bit
+
+    # Highest qualifying tier: Wealth (1+ flags) > Tax (2+) > Basic (failsafe)
+    tier_counts = [
+        sum(flags[flag_id].astype(np.int64) for flag_id in FLAG_IDS if flag_id.startswith(prefix))
+        for prefix in ('basic_', 'tax_', 'wealth_')
+    ]
+    basic, tax, wealth = range(len(TIERS))
+    tier = np.where(tier_counts[wealth] >= 1, wealth, np.where(tier_counts[tax] >= 2, tax, basic))
+    results['tier'] = tier
+    results['tier_flag_count'] = np.choose(tier, tier_counts)
+
+    # Scores use scoring.py's defaults for unanswered fields
+    retirement_age = numeric(records, 'q4_retirement_age', 65)
+    annual_cost = numeric(records, 'q7_annual_retirement_cost', 100000)
+    annual_savings = numeric(records, 'q10_annual_savings', 15000)
+    total_savings = numeric(records, 'q12_total_savings', 500000)
+    has_pension = chose(records, 'q8_work_benefits', 'pension')
+    pension_income = np.where(has_pension, numeric(records, 'q8b_pension_income', 0), 0)
+    style = answers(records, 'q9_investment_style')
+    styles = np.where(np.isin(style, list(RATE_MAP)), style, 'b')
+
+    below_target, fv_target, _ = pacing_below_target(
+        retirement_age, annual_cost.astype(np.float64), pension_income.astype(np.float64),
+        annual_savings.astype(np.float64), total_savings.astype(np.float64), styles)
+    pacing_score, results['pacing_status'] = pacing_score_values(below_target)
+    results['pacing_score'] = pacing_score
+    results['pacing_fv_target'] = fv_target
+
+    results['tax_planning_score'], results['tax_planning_status'] = tax_planning_score_values(
+        retirement_age, annual_cost, annual_savings, total_savings, has_pension,
+        chose(records, 'q8_work_benefits', 'deferred_compensation'),
+        answers(records, 'timed_q6_rmd_planning'))
+
+    red_flag_points = sum(flags[flag_id] * points for flag_id, points in RISK_FLAG_POINTS.items())
+    results['risk_score'], results['risk_status'] = risk_of_failure_score_values(
+        retirement_age, red_flag_points, pacing_score)
+
+    return results
@@ -0,0 +1,164 @@
+"""
+RetireUS Concentration Risk (wealth_rf3)
+========================================
+Sizes the single-stock risk behind wealth_rf3 (stock options) with a one-year
+value-at-risk and conditional value-at-risk for a concentrated position held
+alongside the diversified portfolio implied by q9_investment_style.
+
+Stock and portfolio returns are simulated together as correlated lognormals.
+The standard normal draws and the Cholesky factor of each correlation setting
+are cached, so repeat calls skip both the sampling and the decomposition.
+Losses scale linearly with the account value, so a batch only simulates once
+per distinct (style, concentration) pair and ranks every lead from that.
+"""
+
+from functools import lru_cache
+from typing import Dict, List
+
+import numpy as np
+
+from artifacts import load_artifact
+from historical_replay import portfolio_returns
+
+DEFAULT_PATHS = 20000
+DEFAULT_SEED = 2024
+CONFIDENCE = 0.95
+
+# Share of total savings assumed to sit in employer stock when stock options are reported
+DEFAULT_CONCENTRATION = 0.25
+
+# Single stock: expected annual return and volatility
+STOCK_EXPECTED_RETURN = 0.09
+STOCK_VOLATILITY = 0.35
+
+# Correlation between the single stock and each style's diversified portfolio
+STOCK_CORRELATION = {
+    'a': 0.60,  # Casino/aggressive
+    'b': 0.50,  # Moderate
+    'c': 0.35,  # Income investments
+    'd': 0.20,  # Safe investments
+}
+
+
+@lru_cache(maxsize=32)
+def cholesky_factor(correlation):
+    """Lower-triangular Cholesky factor of a 2x2 correlation matrix (cached per setting)"""
+    factor = np.linalg.cholesky(np.array([[1.0, correlation], [correlation, 1.0]]))
+    factor.flags.writeable = False
+    return factor
+
+
+@lru_cache(maxsize=8)
+def standard_normals(n_paths=DEFAULT_PATHS, seed=DEFAULT_SEED):
+    """Independent standard normal draws of shape (n_paths, 2), shared by every call"""
+    draws = np.random.default_rng(seed).standard_normal((n_paths, 2))
+    draws.flags.writeable = False
+    return draws
+
+
+@lru_cache(maxsize=64)
+def simulate_returns(investment_style, n_paths=DEFAULT_PATHS, seed=DEFAULT_SEED):
+    """
+    Correlated one-year simple returns for the single stock and the style's
+    portfolio, from the prebuilt artifacts when they are valid
+    Returns: (stock_returns, portfolio_returns) arrays of length n_paths
+    """
+    style = investment_style if investment_style in STOCK_CORRELATION else 'b'
+    prebuilt = load_artifact(returns_artifact_name(style, n_paths, seed))
+    if prebuilt is not None:
+        return prebuilt[0], prebuilt[1]
+    return compute_returns(style, n_paths, seed)
+
+
+def returns_artifact_name(investment_style, n_paths, seed):
+    """Artifact holding simulate_returns output as a (2, n_paths) array"""
+    return f'concentration_returns/{investment_style}__{n_paths}__{seed}'
+
+
+def compute_returns(investment_style, n_paths=DEFAULT_PATHS, seed=DEFAULT_SEED):
+    """Simulate the returns simulate_returns serves"""
+    style = investment_style if investment_style in STOCK_CORRELATION else 'b'
+    history = portfolio_returns(style)
+    portfolio_mean = float(np.mean(np.log1p(history)))
+    portfolio_volatility = float(np.std(np.log1p(history)))
+
+    correlated = standard_normals(n_paths, seed) @ cholesky_factor(STOCK_CORRELATION[style]).T
+
+    stock_log = np.log1p(STOCK_EXPECTED_RETURN) - STOCK_VOLATILITY ** 2 / 2 + \
+        STOCK_VOLATILITY * correlated[:, 0]
+    portfolio_log = portfolio_mean + portfolio_volatility * correlated[:, 1]
+
+    stock, portfolio = np.expm1(stock_log), np.expm1(portfolio_log)
+    stock.flags.writeable = False
+    portfolio.flags.writeable = False
+    return stock, portfolio
+
+
+@lru_cache(maxsize=256)
+def unit_risk(investment_style, concentration, n_paths=DEFAULT_PATHS, seed=DEFAULT_SEED):
+    """
+    VaR and CVaR per dollar of savings, concentrated and fully diversified
+    Returns: (var, cvar, diversified_var, diversified_cvar)
+    """
+    stock, portfolio = simulate_returns(investment_style, n_paths, seed)
+
+    def var_cvar(returns):
+        losses = -returns
+        var = np.quantile(losses, CONFIDENCE)
+        return float(var), float(losses[losses >= var].mean())
+
+    var, cvar = var_cvar(concentration * stock + (1 - concentration) * portfolio)
+    diversified_var, diversified_cvar = var_cvar(portfolio)
+    return var, cvar, diversified_var, diversified_cvar
+
+
+def estimate_concentration_risk(responses, concentration=DEFAULT_CONCENTRATION,
+                                n_paths=DEFAULT_PATHS) -> Dict:
+    """
+    One-year VaR/CVaR in dollars for a user's concentrated position
+    Returns: dict with the assumptions, dollar VaR/CVaR and the excess over a diversified portfolio
+    """
+    total_savings = responses.get('q12_total_savings', 0)
+    investment_style = responses.get('q9_investment_style', 'b')
+    var, cvar, diversified_var, diversified_cvar = unit_risk(investment_style, concentration, n_paths)
+
+    return {
+        'confidence': CONFIDENCE,
+        'horizon_years': 1,
+        'concentration': concentration,
+        'position_value': round(total_savings * concentration, 2),
+        'var': round(total_savings * var, 2),
+        'cvar': round(total_savings * cvar, 2),
+        'diversified_var': round(total_savings * diversified_var, 2),
+        'excess_var': round(total_savings * (var - diversified_var), 2),
+        'excess_cvar': round(total_savings * (cvar - diversified_cvar), 2),
+        'paths': n_paths,
+    }
+
+
+def rank_wealth_leads(responses_list: List[Dict], concentration=DEFAULT_CONCENTRATION,
+                      n_paths=DEFAULT_PATHS) -> Dict:
+    """
+    Rank wealth_rf3 users (stock options) by excess CVaR from concentration.
+
+    Only one simulation runs per investment style; each user's exposure is
+    their savings times the per-dollar risk of their style.
+
+    Returns: dict with indices (highest exposure first) and matching excess CVaR in dollars
+    """
+    indices = np.array([
+        i for i, responses in enumerate(responses_list)
+        if 'stock_options' in responses.get('q8_work_benefits', [])
+    ], dtype=np.int64)
+
+    savings = np.array([responses_list[i].get('q12_total_savings', 0) for i in indices], dtype=np.float64)
+    styles = [responses_list[i].get('q9_investment_style', 'b') for i in indices]
+
+    per_dollar = {style: unit_risk(style, concentration, n_paths) for style in set(styles)}
+    excess_cvar = savings * np.array([per_dollar[style][1] - per_dollar[style][3] for style in styles])
+
+    order = np.argsort(-excess_cvar, kind='stable')
+    return {
+        'indices': indices[order],
+        'excess_cvar': excess_cvar[order],
+    }
@@ -0,0 +1,18 @@
+"""
+RetireUS Test Configuration
+===========================
+Points the shared result cache at a file private to this test run before any
+test module imports result_cache, so tests never read or write the cache a
+running server uses (/dev/shm/retireus-results.cache).
+"""
+
+import atexit
+import os
+import shutil
+import tempfile
+
+_cache_dir = tempfile.mkdtemp(prefix='retireus-test-cache-')
+atexit.register(shutil.rmtree, _cache_dir, ignore_errors=True)
+
+os.environ['RETIREUS_CACHE_PATH'] = os.path.join(_cache_dir, 'results.cache')
+os.environ['RETIREUS_CACHE_SLOTS'] = '256'
@@ -0,0 +1,167 @@
+"""
+RetireUS Estate-Size Projection (wealth_rf1)
+============================================
+wealth_rf1 only looks at today's q12_total_savings. This projects each
+user's estate at life expectancy and compares it with an exemption
+threshold table, so users who will cross a threshold later can be found
+too - across a whole archive at once.
+
+Accumulation reuses the glide-path factor tables from the pacing
+calculation; retirement spending is drawn down with the flat-rate tables
+from the same cache. Each investment style is one gather from those
+tables, so there is no per-user Python loop in the projection itself.
+
+USAGE (bulk mode over an archive of quiz responses, one JSON object per line):
+    python estate_projection.py archive.jsonl
+"""
+
+import json
+import sys
+from typing import Dict, List
+
+import numpy as np
+
+from glide_path import GlidePath, glide_path_for_style, project_future_value
+from scoring import RATE_MAP
+
+LIFE_EXPECTANCY_AGE = 85
+
+# Threshold wealth_rf1 applies to today's savings
+WEALTH_RF1_THRESHOLD = 2000000
+
+# Estate tax exemption thresholds: (amount today, annual indexation)
+EXEMPTION_THRESHOLDS = {
+    'federal': (15000000, 0.025),
+    'new_york': (7160000, 0.025),
+    'washington': (3000000, 0.0),
+    'massachusetts': (2000000, 0.0),
+    'oregon': (1000000, 0.0),
+}
+
+
+def project_estates(total_savings, annual_savings, retirement_age, annual_spending, styles):
+    """
+    Projected estate at LIFE_EXPECTANCY_AGE for many users.
+
+    Args:
+        total_savings, annual_savings, retirement_age: per-user arrays
+        annual_spending: per-user retirement spending not covered by pension
+        styles: per-user investment style codes
+
+    Returns: array of projected estates (never below zero)
+    """
+    total_savings = np.asarray(total_savings, dtype=np.float64)
+    annual_savings = np.asarray(annual_savings, dtype=np.float64)
+    retirement_age = np.asarray(retirement_age, dtype=np.int64)
+    annual_spending = np.asarray(annual_spending, dtype=np.float64)
+    styles = np.asarray(styles, dtype=object)
+
+    current_age = 40
+    accumulation_years = np.maximum(retirement_age - current_age, 0)
+    retirement_years = np.maximum(LIFE_EXPECTANCY_AGE - np.maximum(retirement_age, current_age), 0)
+
+    estates = np.zeros(len(total_savings))
+    for style, rates in RATE_MAP.items():
+        members = styles == style
+        if not members.any():
+            continue
+        glide_path = glide_path_for_style(style, sum(rates) / len(rates))
+
+        at_retirement = project_future_value(glide_path, total_savings[members],
+                                             annual_savings[members], accumulation_years[members])
+        # Spending is a negative end-of-year contribution at the post-glide rate
+        estates[members] = project_future_value(GlidePath.flat(glide_path.rates[0]), at_retirement,
+                                                -annual_spending[members], retirement_years[members])
+
+    return np.maximum(estates, 0.0)
+
+
+def exemption_thresholds_at(years):
+    """
+    Each exemption threshold, indexed forward by the given number of years
+    Returns: dict of name -> threshold array
+    """
+    years = np.asarray(years, dtype=np.float64)
+    return {
+        name: amount * (1 + indexation) ** years
+        for name, (amount, indexation) in EXEMPTION_THRESHOLDS.items()
+    }
+
+
+def _estate_inputs(responses_list):
+    """Per-user arrays for project_estates"""
+    count = len(responses_list)
+    total_savings = np.empty(count)
+    annual_savings = np.empty(count)
+    retirement_age = np.empty(count, dtype=np.int64)
+    annual_spending = np.empty(count)
+    styles = np.empty(count, dtype=object)
+
+    for i, responses in enumerate(responses_list):
+        has_pension = 'pension' in responses.get('q8_work_benefits', [])
+        pension_income = responses.get('q8b_pension_income', 0) if has_pension else 0
+        style = responses.get('q9_investment_style', 'b')
+        total_savings[i] = responses.get('q12_total_savings', 0)
+        annual_savings[i] = responses.get('q10_annual_savings', 0)
+        retirement_age[i] = responses.get('q4_retirement_age', 65)
+        annual_spending[i] = max(responses.get('q7_annual_retirement_cost', 100000) - pension_income, 0)
+        styles[i] = style if style in RATE_MAP else 'b'
+
+    return total_savings, annual_savings, retirement_age, annual_spending, styles
+
+
+def project_estate(responses) -> Dict:
+    """
+    Estate projection for one user
+    Returns: dict with the projected estate and the thresholds it crosses
+    """
+    return project_estate_summaries([responses])[0]
+
+
+def project_estate_summaries(responses_list: List[Dict]) -> List[Dict]:
+    """
+    project_estate for many users, with one vectorized projection
+    Returns: list of estate dicts, in input order
+    """
+    inputs = _estate_inputs(responses_list)
+    estates = project_estates(*inputs)
+    current_age = 40
+    thresholds = exemption_thresholds_at(LIFE_EXPECTANCY_AGE - current_age)
+
+    return [
+        {
+            'age': LIFE_EXPECTANCY_AGE,
+            'projected_estate': round(float(estate), 2),
+            'thresholds_crossed': [name for name, amount in thresholds.items() if estate > amount],
+            'crosses_wealth_rf1_threshold_later': bool(total_savings <= WEALTH_RF1_THRESHOLD < estate),
+        }
+        for estate, total_savings in zip(estates, inputs[0])
+    ]
+
+
+def find_future_estate_flags(responses_list: List[Dict]) -> Dict:
+    """
+    Users below the wealth_rf1 threshold today whose projected estate exceeds it
+    Returns: dict with the projected estates and the indices of future crossers
+    """
+    inputs = _estate_inputs(responses_list)
+    estates = project_estates(*inputs)
+    crosses_later = (inputs[0] <= WEALTH_RF1_THRESHOLD) & (estates > WEALTH_RF1_THRESHOLD)
+
+    return {
+        'projected_estates': estates,
+        'future_flag_indices': np.flatnonzero(crosses_later),
+    }
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        print("Usage: python estate_projection.py archive.jsonl")
+        sys.exit(1)
+
+    with open(sys.argv[1]) as f:
+        archive = [json.loads(line) for line in f if line.strip()]
+
+    result = find_future_estate_flags(archive)
+    print(f"Users crossing the wealth_rf1 threshold by age {LIFE_EXPECTANCY_AGE}: "
+          f"{len(result['future_flag_indices'])} of {len(archive)}")
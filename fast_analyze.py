@@ -0,0 +1,111 @@
+"""
+RetireUS Analyze Fast Path
+==========================
+A minimal WSGI application for POST /api/analyze, mounted in front of the
+Flask app by exact-path dispatch.
+
+It reads the body straight from wsgi.input, runs the same pipeline as the
+Flask route (result_cache.analyze_cached under the same load controller)
+and writes the response bytes itself, skipping Flask's request context,
+request.json and jsonify. The JSON is encoded with the same settings as
+Flask's default provider, so responses are byte-for-byte identical. Every
+other path and method falls through to the Flask app, which stays the
+reference implementation.
+
+The fast path only answers requests it can answer exactly as Flask would:
+a JSON Content-Type, a Content-Length and a body that parses. Anything else
+(another media type, a chunked or unsized body, malformed JSON) is handed
+to the Flask route with the body intact, so its error responses are the
+Flask ones.
+
+create_application() is the preloading factory gunicorn.conf.py serves by
+default: it builds the app's shared structures (app.create_app) and returns
+the dispatcher, so the fast path is what production actually mounts.
+
+USAGE (Procfile):
+    web: gunicorn -c gunicorn.conf.py
+    web: gunicorn fast_analyze:application      (no preloading)
+"""
+
+import io
+import json
+
+from app import app, create_app, load_controller
+from load_control import parse_request_start
+from result_cache import analyze_cached, encode_result
+
+
+def _json_response(start_response, status, body):
+    start_response(status, [('Content-Type', 'application/json'),
+                            ('Content-Length', str(len(body)))])
+    return [body]
+
+
+def _is_json(environ):
+    """Whether the request's Content-Type is one Flask's request.json accepts"""
+    mimetype = environ.get('CONTENT_TYPE', '').split(';', 1)[0].strip().lower()
+    return mimetype == 'application/json' or (mimetype.startswith('application/')
+                                              and mimetype.endswith('+json'))
+
+
+def analyze_wsgi(environ, start_response):
+    """
+    WSGI version of the Flask /api/analyze view
+    Returns: the response iterable, or None to hand the request to the Flask app
+    """
+    if not _is_json(environ) or 'chunked' in environ.get('HTTP_TRANSFER_ENCODING', '').lower():
+        return None
+    try:
+        length = int(environ['CONTENT_LENGTH'])
+    except (KeyError, ValueError):
+        return None
+
+    raw = environ['wsgi.input'].read(length)
+    try:
+        responses = json.loads(raw)
+    except ValueError:
+        # Flask reads the body again for its own error response
+        environ['wsgi.input'] = io.BytesIO(raw)
+        return None
+
+    try:
+        queued_since = parse_request_start(environ.get('HTTP_X_REQUEST_START', ''))
+        body, _ = analyze_cached(responses, load_controller.track, queued_since)
+
+        return _json_response(start_response, '200 OK', body)
+
+    except Exception as e:
+        return _json_response(start_response, '400 BAD REQUEST', encode_result({'error': str(e)}))
+
+
+class PathDispatcher:
+    """
+    Routes (method, exact path) pairs to fast WSGI handlers and everything
+    else to a fallback WSGI app. A handler returning None passes the request
+    on to the fallback.
+    """
+
+    def __init__(self, routes, fallback):
+        self.routes = routes
+        self.fallback = fallback
+
+    def __call__(self, environ, start_response):
+        handler = self.routes.get((environ.get('REQUEST_METHOD'), environ.get('PATH_INFO')))
+        if handler is not None:
+            response = handler(environ, start_response)
+            if response is not None:
+                return response
+        return self.fallback(environ, start_response)
+
+
+FAST_ROUTES = {('POST', '/api/analyze'): analyze_wsgi}
+
+application = PathDispatcher(FAST_ROUTES, app)
+
+
+def create_application():
+    """
+    The fast-path dispatcher around an app with its read-only structures
+    built in this process (see app.create_app)
+    """
+    return PathDispatcher(FAST_ROUTES, create_app())
@@ -0,0 +1,112 @@
+"""
+RetireUS Fee-Drag Analyzer
+==========================
+Puts a dollar figure on basic_rf6 (Old Employer Plan Limiting Strategy):
+how much an old plan's expense ratio costs by retirement, for a range of
+expense ratios at once.
+
+The old plan receives no new contributions, so the cost of a fee f over n
+years is balance * ((1 + r)^n - (1 + r - f)^n). Every fee level, and in bulk
+mode every flagged user, is one broadcast array expression.
+
+USAGE (bulk mode over an archive of quiz responses, one JSON object per line):
+    python fee_drag.py archive.jsonl
+"""
+
+import json
+import sys
+from typing import Dict, List
+
+import numpy as np
+
+from scoring import RATE_MAP
+
+# Expense ratios to price (annual, as a fraction of assets)
+EXPENSE_RATIOS = np.array([0.0005, 0.001, 0.0025, 0.005, 0.0075, 0.01, 0.015, 0.02])
+EXPENSE_RATIOS.flags.writeable = False
+
+
+def fee_drag_costs(balances, growth_rates, horizons, expense_ratios=EXPENSE_RATIOS):
+    """
+    Dollar cost of each expense ratio by retirement.
+
+    balances, growth_rates and horizons are per-user scalars or arrays.
+    Returns: array of shape (users, fee levels)
+    """
+    balances = np.atleast_1d(np.asarray(balances, dtype=np.float64))[:, None]
+    growth_rates = np.atleast_1d(np.asarray(growth_rates, dtype=np.float64))[:, None]
+    horizons = np.atleast_1d(np.maximum(np.asarray(horizons, dtype=np.float64), 0))[:, None]
+    fees = np.asarray(expense_ratios, dtype=np.float64)[None, :]
+
+    return balances * ((1 + growth_rates) ** horizons - (1 + growth_rates - fees) ** horizons)
+
+
+def _fee_drag_inputs(responses_list):
+    """Per-user (balance, growth rate, horizon) arrays"""
+    count = len(responses_list)
+    balances = np.empty(count)
+    growth_rates = np.empty(count)
+    horizons = np.empty(count)
+
+    current_age = 40
+    for i, responses in enumerate(responses_list):
+        rates = RATE_MAP.get(responses.get('q9_investment_style', 'b'), RATE_MAP['b'])
+        balances[i] = responses.get('q12_total_savings', 0)
+        growth_rates[i] = sum(rates) / len(rates)
+        horizons[i] = responses.get('q4_retirement_age', 65) - current_age
+
+    return balances, growth_rates, horizons
+
+
+def analyze_fee_drag(responses) -> Dict:
+    """
+    Fee drag for one user, assuming q12_total_savings sits in the old plan
+    Returns: dict with the inputs and the cost at each expense ratio
+    """
+    balances, growth_rates, horizons = _fee_drag_inputs([responses])
+    costs = fee_drag_costs(balances, growth_rates, horizons)[0]
+
+    return {
+        'balance': round(float(balances[0]), 2),
+        'years': int(max(horizons[0], 0)),
+        'growth_rate': round(float(growth_rates[0]), 4),
+        'costs': [
+            {'expense_ratio': float(fee), 'cost': round(float(cost), 2)}
+            for fee, cost in zip(EXPENSE_RATIOS, costs)
+        ],
+    }
+
+
+def analyze_fee_drag_bulk(responses_list: List[Dict]) -> Dict:
+    """
+    Fee drag for every basic_rf6 user in an archive, in one array pass
+    Returns: dict with the flagged indices and their (users x fee levels) cost matrix
+    """
+    flagged = np.array([
+        'old_employer_plan' in responses.get('q11_account_types', [])
+        for responses in responses_list
+    ], dtype=bool)
+    indices = np.flatnonzero(flagged)
+
+    balances, growth_rates, horizons = _fee_drag_inputs([responses_list[i] for i in indices])
+
+    return {
+        'indices': indices,
+        'expense_ratios': EXPENSE_RATIOS,
+        'costs': fee_drag_costs(balances, growth_rates, horizons),
+    }
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        print("Usage: python fee_drag.py archive.jsonl")
+        sys.exit(1)
+
+    with open(sys.argv[1]) as f:
+        archive = [json.loads(line) for line in f if line.strip()]
+
+    bulk = analyze_fee_drag_bulk(archive)
+    print(f"Flagged users: {len(bulk['indices'])} of {len(archive)}")
+    for fee, costs in zip(bulk['expense_ratios'], bulk['costs'].T):
+        if len(costs):
+            print(f"  {fee:.2%} expense ratio: total ${costs.sum():,.0f}, median ${np.median(costs):,.0f}")
@@ -0,0 +1,120 @@
+"""
+RetireUS Glide-Path Projections
+===============================
+Projects savings when the expected return changes every year along a glide
+path, the way target-date portfolios de-risk as retirement approaches.
+
+A glide path is described by the expected return for each number of years
+remaining before retirement. Growth and contribution factors for every
+horizon are precomputed once per glide path and cached, so projecting a
+balance is a dot product of (pv, pmt) with two table entries - for one user
+or for a whole batch of users at once.
+"""
+
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Tuple
+
+import numpy as np
+
+# Longest horizon the factor tables cover (years)
+MAX_HORIZON = 100
+
+# Years before retirement over which the default glide paths de-risk
+DEFAULT_GLIDE_YEARS = 25
+
+# How far each investment style's expected return falls by retirement
+DERISK_SPREAD = {
+    'a': 0.03,  # Casino/aggressive
+    'b': 0.02,  # Moderate
+    'c': 0.01,  # Income investments
+    'd': 0.00,  # Safe investments
+}
+
+
+@dataclass(frozen=True)
+class GlidePath:
+    """
+    Expected annual return by years remaining before retirement.
+
+    rates[k] applies to the year that starts with k + 1 years left, so rates[0]
+    is the final year before retirement. Years further out than the tuple
+    reaches use the last rate.
+    """
+    rates: Tuple[float, ...]
+
+    @classmethod
+    def linear(cls, start_rate, end_rate, glide_years=DEFAULT_GLIDE_YEARS):
+        """Glide linearly from start_rate (glide_years out) down to end_rate at retirement"""
+        if glide_years <= 0:
+            return cls(rates=(float(end_rate),))
+        steps = np.linspace(end_rate, start_rate, glide_years + 1)
+        return cls(rates=tuple(round(float(rate), 6) for rate in steps))
+
+    @classmethod
+    def flat(cls, rate):
+        """Constant return for every year (equivalent to the fixed-rate FV)"""
+        return cls(rates=(float(rate),))
+
+    def rate_for(self, years_remaining):
+        """Expected return for the year that starts with years_remaining left"""
+        index = min(max(years_remaining - 1, 0), len(self.rates) - 1)
+        return self.rates[index]
+
+
+def glide_path_for_style(investment_style, rate, glide_years=DEFAULT_GLIDE_YEARS):
+    """
+    Default glide path for an investment style: starts at rate and de-risks
+    by the style's spread over the final glide_years before retirement
+    """
+    spread = DERISK_SPREAD.get(investment_style, DERISK_SPREAD['b'])
+    return GlidePath.linear(rate, rate - spread, glide_years)
+
+
+@lru_cache(maxsize=256)
+def projection_factors(glide_path):
+    """
+    Precompute projection factors for every horizon 0..MAX_HORIZON.
+
+    For a horizon of n years:
+    - growth[n] = growth of today's balance by retirement
+    - contribution[n] = value at retirement of 1 saved at the end of each year
+    - discount[n] = 1 / growth[n]
+
+    Returns: (growth, contribution, discount) read-only arrays indexed by horizon
+    """
+    years_remaining = np.arange(1, MAX_HORIZON + 1)
+    rates = np.array([glide_path.rate_for(k) for k in years_remaining])
+
+    # growth[n] compounds the final n years before retirement (rates[0..n-1])
+    growth = np.concatenate(([1.0], np.cumprod(1.0 + rates)))
+
+    # A contribution made with k years left grows over the last k years,
+    # so summing growth[0..n-1] values all n end-of-year contributions.
+    contribution = np.concatenate(([0.0], np.cumsum(growth[:-1])))
+    discount = 1.0 / growth
+
+    for table in (growth, contribution, discount):
+        table.flags.writeable = False
+    return growth, contribution, discount
+
+
+def project_future_value(glide_path, pv, pmt, nper):
+    """
+    Balance at retirement along a glide path.
+
+    pv, pmt and nper may be scalars or equal-length arrays (batch scoring).
+    pv and pmt are plain positive amounts, not Excel-style negative cash flows.
+
+    Returns: float for scalar inputs, array otherwise
+    """
+    growth, contribution, _ = projection_factors(glide_path)
+    horizon = np.clip(np.asarray(nper, dtype=np.int64), 0, MAX_HORIZON)
+
+    # [pv, pmt] . [growth[n], contribution[n]]
+    fv = np.asarray(pv, dtype=np.float64) * growth[horizon] + \
+        np.asarray(pmt, dtype=np.float64) * contribution[horizon]
+
+    if np.ndim(fv) == 0:
+        return float(fv)
+    return fv
@@ -0,0 +1,49 @@
+"""
+RetireUS Gunicorn Configuration
+===============================
+Preloads the app in the master through fast_analyze.create_application(),
+so the analysis lookup tables, the scenario catalog and the rendered pages
+are built once and inherited by every worker, and POST /api/analyze is
+served by the raw WSGI fast path. RETIREUS_WSGI_APP selects another
+entry point, e.g. 'app:create_app()' for the plain Flask app.
+
+Inherited pages stay shared only while nothing writes to them, and the
+cyclic garbage collector writes to every object it examines. So the
+collector is off only while the master builds the app (this file is read
+just before the preload, and again on a HUP reload). Once it is built, the
+app is frozen (gc.freeze) and collection is turned back on, so the master
+still frees its own cycles while the frozen objects are left out of every
+collection, in the master and in every worker. Anything the master created
+since is frozen again before each fork.
+
+USAGE (Procfile):
+    web: gunicorn -c gunicorn.conf.py
+"""
+
+import gc
+import os
+
+wsgi_app = os.environ.get('RETIREUS_WSGI_APP', 'fast_analyze:create_application()')
+preload_app = True
+workers = int(os.environ.get('WEB_CONCURRENCY', 2))
+
+# No collections in the master while the app is built: freed cycles would
+# leave holes in the pages workers are about to share
+gc.disable()
+
+
+def _freeze_preloaded_app():
+    gc.freeze()
+    gc.enable()
+
+
+def when_ready(server):
+    _freeze_preloaded_app()
+
+
+def on_reload(server):
+    _freeze_preloaded_app()
+
+
+def pre_fork(server, worker):
+    gc.freeze()
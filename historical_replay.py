@@ -0,0 +1,136 @@
+"""
+RetireUS Historical Replay Engine
+=================================
+Replays a savings plan against every historical start year in the bundled
+annual-returns dataset (data/historical_returns.csv) and reports how often
+the plan would have reached its target.
+
+All start years are evaluated at once: the portfolio return series is cut
+into overlapping windows with a 2-D rolling-window view, so a replay is a
+handful of array operations rather than a loop over years.
+"""
+
+import csv
+import os
+from functools import lru_cache
+from typing import Dict
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from artifacts import load_artifact
+
+DATA_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'historical_returns.csv')
+
+ASSET_CLASSES = ('stocks', 'bonds', 'cash')
+
+# Investment style (q9) to (stocks, bonds, cash) allocation
+ALLOCATION_MAP = {
+    'a': (1.00, 0.00, 0.00),  # Casino/aggressive
+    'b': (0.60, 0.40, 0.00),  # Moderate
+    'c': (0.30, 0.60, 0.10),  # Income investments
+    'd': (0.10, 0.50, 0.40),  # Safe investments
+}
+
+
+@lru_cache(maxsize=1)
+def load_historical_returns():
+    """
+    Load the bundled annual-returns dataset (read once per process), from
+    the prebuilt artifacts when they are valid
+    Returns: (years, returns) where returns has shape (n_years, 3) in ASSET_CLASSES order
+    """
+    years = load_artifact('historical_returns/years')
+    returns = load_artifact('historical_returns/returns')
+    if years is None or returns is None:
+        return read_historical_returns()
+    return years, returns
+
+
+def read_historical_returns():
+    """
+    Parse data/historical_returns.csv
+    Returns: (years, returns) read-only arrays, as load_historical_returns
+    """
+    years = []
+    rows = []
+    with open(DATA_PATH, newline='') as f:
+        for row in csv.DictReader(f):
+            years.append(int(row['year']))
+            rows.append([float(row[asset]) for asset in ASSET_CLASSES])
+
+    years = np.array(years, dtype=np.int32)
+    returns = np.array(rows, dtype=np.float64)
+    years.flags.writeable = False
+    returns.flags.writeable = False
+    return years, returns
+
+
+@lru_cache(maxsize=None)
+def portfolio_returns(investment_style):
+    """
+    Annual returns of the allocation for an investment style, one per historical year
+    """
+    allocation = ALLOCATION_MAP.get(investment_style, ALLOCATION_MAP['b'])
+    _, returns = load_historical_returns()
+    series = returns @ np.array(allocation)
+    series.flags.writeable = False
+    return series
+
+
+def replay_future_values(investment_style, nper, pmt, pv):
+    """
+    Future value of the plan for every historical start year.
+
+    Mirrors future_value() in scoring.py (end-of-year contributions), but with
+    each year's growth taken from history instead of a fixed rate. pmt and pv
+    are plain positive amounts, not Excel-style negative cash flows.
+
+    Returns: (start_years, fv) arrays, one entry per complete window
+    """
+    years, _ = load_historical_returns()
+    series = portfolio_returns(investment_style)
+
+    if nper <= 0:
+        return years.copy(), np.full(len(years), float(pv))
+    if nper > len(series):
+        return years[:0], np.empty(0)
+
+    # windows[s, k] = growth factor of year k for the window starting at year s
+    windows = 1.0 + sliding_window_view(series, nper)
+
+    # tail[s, k] = growth from the start of year k to the end of the window
+    tail = np.cumprod(windows[:, ::-1], axis=1)[:, ::-1]
+
+    # Contribution at the end of year k grows over years k+1..n-1;
+    # the final contribution does not grow at all.
+    contribution_growth = tail[:, 1:].sum(axis=1) + 1.0
+
+    fv = pv * tail[:, 0] + pmt * contribution_growth
+    return years[:len(fv)], fv
+
+
+def historical_success_rate(investment_style, nper, pmt, pv, target) -> Dict:
+    """
+    Share of historical start years in which the plan reached the target.
+    Returns: dict with success rate, window count and the worst/median outcomes
+    """
+    start_years, fv = replay_future_values(investment_style, nper, pmt, pv)
+
+    if len(fv) == 0:
+        return {
+            'success_rate': None,
+            'windows': 0,
+            'worst_start_year': None,
+            'worst_fv': None,
+            'median_fv': None,
+        }
+
+    worst = int(np.argmin(fv))
+    return {
+        'success_rate': round(float(np.mean(fv >= target)), 4),
+        'windows': int(len(fv)),
+        'worst_start_year': int(start_years[worst]),
+        'worst_fv': round(float(fv[worst]), 2),
+        'median_fv': round(float(np.median(fv)), 2),
+    }
@@ -0,0 +1,167 @@
+"""
+RetireUS Load Control
+=====================
+Adaptive quality control for the expensive analytics in /api/analyze.
+
+Each worker keeps a LoadController that watches its own in-flight request
+count (queue depth) and an exponentially weighted average of recent request
+latency. While the worker is over budget, requests run at a lower fidelity:
+- full: every analytic at its normal simulation path count
+- reduced: simulations with fewer paths
+- closed_form: only the closed-form scores (calculate_pacing_score,
+  calculate_tax_planning_score, calculate_risk_of_failure_score) and table
+  lookups; simulations and optimizers are skipped
+
+The latency average decays while the worker is idle, and fidelity steps back
+up one level at a time once load is comfortably under budget, so a burst
+does not leave the worker degraded after it has passed.
+
+Bulk requests (a batch, a streamed chunk) are tracked with their item count
+and add their per-item time to the average, so one large batch reads as
+many fast requests rather than one slow one.
+
+Queue depth only counts with threaded workers (gunicorn gthread). A sync
+worker serves one request at a time, so there is never another request in
+flight ahead of the current one, and its load comes from latency alone:
+queued time from X-Request-Start included, which is where a backlog in
+front of sync workers shows up.
+"""
+
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+from enum import Enum
+
+
+def parse_request_start(header):
+    """
+    When the router queued a request, from its X-Request-Start header
+    (Heroku sends milliseconds since the epoch, nginx "t=" seconds or
+    microseconds), or None when the header is missing or malformed
+    """
+    digits = header[2:] if header.startswith('t=') else header
+    try:
+        started = float(digits)
+    except ValueError:
+        return None
+    if started > 1e14:
+        return started / 1e6
+    if started > 1e11:
+        return started / 1e3
+    return started
+
+
+class FidelityLevel(Enum):
+    FULL = "full"
+    REDUCED = "reduced"
+    CLOSED_FORM = "closed_form"
+
+
+_LEVELS = [FidelityLevel.FULL, FidelityLevel.REDUCED, FidelityLevel.CLOSED_FORM]
+
+
+def lower_fidelity(first, second):
+    """The lower of two fidelity levels (closed_form < reduced < full)"""
+    return max(first, second, key=_LEVELS.index)
+
+
+class LoadController:
+    """
+    Chooses a FidelityLevel per request from queue depth and recent latency.
+
+    Usage:
+        controller = LoadController()
+        with controller.track() as fidelity:
+            result = analyze_responses(responses, fidelity)
+    """
+
+    def __init__(self, latency_budget=0.25, queue_budget=4, smoothing=0.2,
+                 recovery_ratio=0.5, idle_half_life=5.0):
+        """
+        Args:
+            latency_budget: target request latency in seconds
+            queue_budget: in-flight requests before degrading
+            smoothing: weight of each new latency sample in the average
+            recovery_ratio: share of the budgets load must fall under to step back up
+            idle_half_life: seconds for the latency average to halve without new samples
+        """
+        self.latency_budget = latency_budget
+        self.queue_budget = queue_budget
+        self.smoothing = smoothing
+        self.recovery_ratio = recovery_ratio
+        self.idle_half_life = idle_half_life
+
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._latency = 0.0
+        self._last_sample = time.monotonic()
+        self._level = FidelityLevel.FULL
+
+    @classmethod
+    def from_env(cls):
+        """Controller configured from RETIREUS_LATENCY_BUDGET / RETIREUS_QUEUE_BUDGET"""
+        return cls(
+            latency_budget=float(os.environ.get('RETIREUS_LATENCY_BUDGET', 0.25)),
+            queue_budget=int(os.environ.get('RETIREUS_QUEUE_BUDGET', 4)),
+        )
+
+    @property
+    def level(self) -> FidelityLevel:
+        return self._level
+
+    def recent_latency(self, now=None) -> float:
+        """Latency average, decayed for the time since the last sample"""
+        now = time.monotonic() if now is None else now
+        idle = max(now - self._last_sample, 0.0)
+        return self._latency * math.pow(0.5, idle / self.idle_half_life)
+
+    def _choose_level(self, now) -> FidelityLevel:
+        latency_load = self.recent_latency(now) / self.latency_budget
+        # Requests already in flight ahead of this one (always 0 with sync workers)
+        queue_load = (self._in_flight - 1) / self.queue_budget
+        load = max(latency_load, queue_load)
+
+        index = _LEVELS.index(self._level)
+        if load > 2.0:
+            index = len(_LEVELS) - 1
+        elif load > 1.0:
+            index = max(index, 1)
+        elif load < self.recovery_ratio and index > 0:
+            index -= 1
+
+        self._level = _LEVELS[index]
+        return self._level
+
+    @contextmanager
+    def track(self, queued_since=None, items=1):
+        """
+        Track one request and yield the fidelity level it should run at.
+
+        Args:
+            queued_since: time.time() at which the request entered the queue
+                          (e.g. from the router's X-Request-Start header), so
+                          waiting time counts toward latency
+            items: analyses the request runs; the latency sample is the
+                   time per item, plus the queue wait
+        """
+        started = time.monotonic()
+        with self._lock:
+            self._in_flight += 1
+            level = self._choose_level(started)
+
+        queue_wait = 0.0
+        if queued_since is not None:
+            queue_wait = min(max(time.time() - queued_since, 0.0), 60.0)
+
+        try:
+            yield level
+        finally:
+            finished = time.monotonic()
+            sample = (finished - started) / max(items, 1) + queue_wait
+            with self._lock:
+                self._in_flight -= 1
+                self._latency = (1 - self.smoothing) * self.recent_latency(finished) + \
+                    self.smoothing * sample
+                self._last_sample = finished
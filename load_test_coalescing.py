@@ -0,0 +1,102 @@
+"""
+RetireUS Coalescing Load Test
+=============================
+Fires bursts of identical /api/analyze submissions at once and reports the
+CPU-seconds each burst consumes with and without coalescing:
+- threads: many threads in one process, as on a threaded worker, coalesced
+  by single_flight (the shared result cache is bypassed)
+- processes: one submission per process, as on gunicorn's sync workers,
+  coalesced by claims in a shared result cache file (claim_timeout=0 turns
+  claims off for the uncoalesced run)
+
+Every burst uses a fresh profile, so no burst is served from another's
+cached result.
+
+USAGE:
+    python load_test_coalescing.py [threads] [bursts] [processes]
+"""
+
+import multiprocessing
+import os
+import resource
+import sys
+import tempfile
+import threading
+import time
+
+from load_control import LoadController
+from result_cache import SharedResultCache, analyze_cached
+from single_flight import SingleFlight
+from build_reference_population import sample_population
+
+
+def unlimited_controller():
+    return LoadController(latency_budget=float('inf'), queue_budget=float('inf'))
+
+
+def run_burst(responses, threads, flight):
+    """CPU-seconds for threads concurrent analyses of the same responses"""
+    controller = unlimited_controller()
+    barrier = threading.Barrier(threads)
+    bodies = []
+
+    def submit():
+        barrier.wait()
+        bodies.append(analyze_cached(responses, controller.track, cache=None, flight=flight)[0])
+
+    workers = [threading.Thread(target=submit) for _ in range(threads)]
+    started = time.process_time()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    assert len(set(bodies)) == 1
+    return time.process_time() - started
+
+
+def run_process_burst(responses, processes, cache_path, claim_timeout):
+    """CPU-seconds, across every process, for processes concurrent analyses of the same responses"""
+    fork = multiprocessing.get_context('fork')
+    barrier = fork.Barrier(processes)
+    bodies = fork.Queue()
+
+    def submit():
+        cache = SharedResultCache(cache_path, claim_timeout=claim_timeout)
+        barrier.wait()
+        bodies.put(analyze_cached(responses, unlimited_controller().track, cache=cache,
+                                  flight=SingleFlight())[0])
+
+    before = resource.getrusage(resource.RUSAGE_CHILDREN)
+    workers = [fork.Process(target=submit) for _ in range(processes)]
+    for worker in workers:
+        worker.start()
+    results = {bodies.get() for _ in workers}
+    for worker in workers:
+        worker.join()
+    after = resource.getrusage(resource.RUSAGE_CHILDREN)
+    assert len(results) == 1
+    return (after.ru_utime + after.ru_stime) - (before.ru_utime + before.ru_stime)
+
+
+if __name__ == "__main__":
+    threads = int(sys.argv[1]) if len(sys.argv) > 1 else 32
+    bursts = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    processes = int(sys.argv[3]) if len(sys.argv) > 3 else min(os.cpu_count() or 4, 8)
+    # A fresh profile per burst, so no burst benefits from another's caches
+    profiles = sample_population(4 * bursts, seed=42)
+    run_burst(profiles[0], 2, None)
+
+    print(f"threads (one process, {threads} threads):")
+    for name, flight_factory, offset in (('uncoalesced', lambda: None, 0),
+                                         ('coalesced', SingleFlight, bursts)):
+        cpu = [run_burst(profiles[offset + i], threads, flight_factory()) for i in range(bursts)]
+        print(f"  {name:>12}: {sum(cpu) / bursts:.3f} CPU-s per burst of {threads}")
+
+    print(f"processes ({processes} processes sharing one cache file):")
+    with tempfile.TemporaryDirectory() as directory:
+        cache_path = os.path.join(directory, 'results.cache')
+        for name, claim_timeout, offset in (('uncoalesced', 0.0, 2 * bursts),
+                                            ('coalesced', 10.0, 3 * bursts)):
+            cpu = [run_process_burst(profiles[offset + i], processes, cache_path, claim_timeout)
+                   for i in range(bursts)]
+            print(f"  {name:>12}: {sum(cpu) / bursts:.3f} CPU-s per burst of {processes}")
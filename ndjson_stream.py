@@ -0,0 +1,175 @@
+"""
+RetireUS NDJSON Streaming
+=========================
+Analyzes newline-delimited JSON quiz responses straight off a request
+stream and yields NDJSON results as they are ready.
+
+The upload is read in fixed-size blocks (gunzipped incrementally when the
+body is gzip-compressed, at most one block of output per decompress call),
+records are analyzed in small chunks with analyze_batch, and each result
+line is yielded before the next chunk is read. Only one block, one partial
+line and one chunk of records are ever held in memory, whatever the size of
+the upload.
+
+The decoded body is capped at MAX_STREAM_BYTES, so a small gzip upload
+cannot expand without limit: iter_blocks raises StreamTooLarge past it.
+
+Every non-blank input line produces exactly one output line, in order;
+lines that are not valid JSON produce {"error": ..., "line": n}.
+"""
+
+import json
+import zlib
+
+from analysis import analyze_batch
+from load_control import FidelityLevel, lower_fidelity
+
+READ_BLOCK_BYTES = 64 * 1024
+
+# Records analyzed together; each chunk is tracked by the load controller
+# like one request
+CHUNK_RECORDS = 64
+
+# Longest input line accepted; longer lines are skipped with an error
+MAX_LINE_BYTES = 1024 * 1024
+
+# Most bytes of decoded (decompressed) body read from one upload
+MAX_STREAM_BYTES = 256 * 1024 * 1024
+
+
+class StreamTooLarge(ValueError):
+    """The decoded upload is longer than MAX_STREAM_BYTES"""
+
+
+def iter_blocks(stream, compressed=False, block_size=READ_BLOCK_BYTES, max_bytes=MAX_STREAM_BYTES):
+    """
+    Raw (decompressed) byte blocks from a file-like stream
+    Raises: StreamTooLarge once more than max_bytes have been decoded
+    """
+    total = 0
+    for block in _decoded_blocks(stream, compressed, block_size):
+        total += len(block)
+        if total > max_bytes:
+            raise StreamTooLarge(f'Upload larger than {max_bytes} bytes')
+        yield block
+
+
+def _decoded_blocks(stream, compressed, block_size):
+    decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS) if compressed else None
+    while True:
+        block = stream.read(block_size)
+        if not block:
+            break
+        if decompressor is None:
+            yield block
+            continue
+        while block:
+            yield decompressor.decompress(block, block_size)
+            block = decompressor.unconsumed_tail
+            if not block:
+                # Concatenated gzip members: start a new decompressor on the rest
+                block = decompressor.unused_data
+                if block:
+                    decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+    if decompressor is not None:
+        yield decompressor.flush()
+
+
+def iter_lines(blocks, max_line_bytes=MAX_LINE_BYTES):
+    """
+    Lines from byte blocks, without the newline; lines longer than
+    max_line_bytes are yielded as None
+    """
+    pending = b''
+    oversized = False
+    for block in blocks:
+        pending += block
+        start = 0
+        while True:
+            end = pending.find(b'\n', start)
+            if end < 0:
+                break
+            yield None if oversized else pending[start:end]
+            oversized = False
+            start = end + 1
+        pending = pending[start:]
+        if len(pending) > max_line_bytes:
+            # Drop the line's bytes as they arrive; report it once it ends
+            oversized = True
+            pending = b''
+    if pending or oversized:
+        yield None if oversized else pending
+
+
+def analyze_ndjson(stream, compressed=False, track=None, fidelity=FidelityLevel.FULL,
+                   chunk_records=CHUNK_RECORDS):
+    """
+    Analyze an NDJSON stream of quiz responses.
+
+    Args:
+        stream: file-like object with a read(size) method
+        compressed: whether the stream is gzip-compressed
+        track: LoadController.track, to lower the fidelity per chunk under load
+        fidelity: highest fidelity to analyze at
+
+    Yields: one encoded NDJSON result line per non-blank input line
+    Raises: StreamTooLarge if the upload passes MAX_STREAM_BYTES before the
+            first result line, so the caller can still reject it; later
+            on, the stream ends with an error line instead
+    """
+    chunk = []
+    line_number = 0
+    started = False
+    try:
+        for line in iter_lines(iter_blocks(stream, compressed)):
+            line_number += 1
+            if line is not None and not line.strip():
+                continue
+            chunk.append(_parse_line(line, line_number))
+            if len(chunk) >= chunk_records:
+                started = True
+                yield from _analyze_chunk(chunk, track, fidelity)
+                chunk = []
+    except zlib.error as e:
+        yield from _analyze_chunk(chunk, track, fidelity)
+        chunk = []
+        yield _encode({'error': f'Invalid gzip data: {e}', 'line': line_number + 1})
+    except StreamTooLarge as e:
+        if not started:
+            raise
+        yield from _analyze_chunk(chunk, track, fidelity)
+        chunk = []
+        yield _encode({'error': str(e), 'line': line_number + 1})
+    yield from _analyze_chunk(chunk, track, fidelity)
+
+
+def _parse_line(line, line_number):
+    """(line number, parsed record or None, error message or None)"""
+    if line is None:
+        return line_number, None, f'Line longer than {MAX_LINE_BYTES} bytes'
+    try:
+        return line_number, json.loads(line), None
+    except ValueError as e:
+        return line_number, None, f'Invalid JSON: {e}'
+
+
+def _analyze_chunk(chunk, track, fidelity):
+    """Encoded result lines for one chunk of parsed records, in order"""
+    if not chunk:
+        return
+    records = [record for _, record, error in chunk if error is None]
+    if track is None:
+        results = iter(analyze_batch(records, fidelity))
+    else:
+        with track(items=len(records)) as level:
+            results = iter(analyze_batch(records, lower_fidelity(fidelity, level)))
+
+    for line_number, _, error in chunk:
+        result = {'error': error} if error is not None else next(results)
+        if 'error' in result:
+            result = {**result, 'line': line_number}
+        yield _encode(result)
+
+
+def _encode(result):
+    return (json.dumps(result, separators=(',', ':')) + '\n').encode('utf-8')
@@ -4,7 +4,7 @@ RetireUS Checkpoint Quiz - Red Flag Detection Algorithm
 Paste in quiz responses and get back the red flags that should trigger.
 """
 
-from typing import Dict, List, Set
+from typing import Dict, List, Optional, Set
 from dataclasses import dataclass
 from enum import Enum
 
@@ -22,6 +22,7 @@ class RedFlag:
     name: str
     tier: ServiceTier
     description: str
+    details: Optional[Dict] = None
 
 
 class RedFlagDetector:
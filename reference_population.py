@@ -0,0 +1,151 @@
+"""
+RetireUS Reference Population
+=============================
+Percentile ranks against a reference population of quiz takers.
+
+The population is precomputed offline by build_reference_population.py into
+sorted arrays per retirement-age bucket (data/reference_population.npz).
+Each worker loads the file once; a percentile rank is then one binary search
+per metric, and the population is never scanned at request time.
+
+The file records where its population came from under 'source': 'synthetic'
+for build_reference_population.py's generated sample, 'archive' for real
+quiz takers. Responses carry it, so a rank against the synthetic sample is
+never mistaken for a rank against real users.
+
+A rank is the percent of the population at or below the user's value. For
+pacing_score and risk_score a lower score is better, so a low rank is the
+good end for those two (see LOWER_IS_BETTER); for the savings metrics a
+high rank is.
+"""
+
+import os
+from functools import lru_cache
+from typing import Dict, List
+
+import numpy as np
+
+from artifacts import load_artifact_group
+
+DATA_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'reference_population.npz')
+
+METRICS = ('pacing_score', 'risk_score', 'total_savings', 'annual_savings')
+
+# Metrics where a lower value is the better outcome
+LOWER_IS_BETTER = ('pacing_score', 'risk_score')
+
+# Key holding the population source in the .npz file and the loaded population
+SOURCE_KEY = 'source'
+UNKNOWN_SOURCE = 'unknown'
+
+# Retirement-age buckets: (name, first age, last age)
+AGE_BUCKETS = (
+    ('under_60', 0, 59),
+    ('60_to_64', 60, 64),
+    ('65_to_67', 65, 67),
+    ('68_plus', 68, 200),
+)
+
+
+def age_bucket(retirement_age):
+    """Name of the retirement-age bucket an age falls into"""
+    for name, first, last in AGE_BUCKETS:
+        if first <= retirement_age <= last:
+            return name
+    return AGE_BUCKETS[-1][0]
+
+
+@lru_cache(maxsize=1)
+def load_reference_population():
+    """
+    Sorted metric arrays keyed by (bucket, metric), plus the population
+    source under SOURCE_KEY, loaded once per process from the prebuilt
+    artifacts when they are valid
+    """
+    arrays = load_artifact_group('reference_population')
+    if arrays is None:
+        return read_reference_population()
+    population = {SOURCE_KEY: UNKNOWN_SOURCE}
+    for key, values in arrays.items():
+        if key == SOURCE_KEY:
+            population[SOURCE_KEY] = str(values.item())
+        else:
+            population[tuple(key.split('__'))] = values
+    return population
+
+
+def read_reference_population():
+    """
+    Sorted metric arrays keyed by (bucket, metric), plus the population
+    source under SOURCE_KEY, read from the .npz file
+    """
+    population = {SOURCE_KEY: UNKNOWN_SOURCE}
+    with np.load(DATA_PATH) as archive:
+        for key in archive.files:
+            if key == SOURCE_KEY:
+                population[SOURCE_KEY] = str(archive[key].item())
+                continue
+            bucket, metric = key.split('__')
+            values = np.array(archive[key])
+            values.flags.writeable = False
+            population[(bucket, metric)] = values
+    return population
+
+
+def percentile_rank(sorted_values, value):
+    """Percent of the population at or below value (binary search)"""
+    if len(sorted_values) == 0:
+        return None
+    position = np.searchsorted(sorted_values, value, side='right')
+    return round(100.0 * position / len(sorted_values), 1)
+
+
+def percentile_ranks(retirement_age, metrics: Dict) -> Dict:
+    """
+    Percentile rank of each metric within the user's retirement-age bucket
+    Returns: dict with the bucket, population size and source, a rank per
+             metric, and the ranked metrics where lower is better
+    """
+    return percentile_ranks_batch([retirement_age], {metric: [value] for metric, value in metrics.items()})[0]
+
+
+def percentile_ranks_batch(retirement_ages, metrics: Dict) -> List[Dict]:
+    """
+    percentile_ranks for many users: one binary search per bucket and metric
+    over all of that bucket's users
+
+    Args:
+        retirement_ages: one retirement age per user
+        metrics: dict of metric -> sequence of values, one per user
+    Returns: list of percentile_ranks dicts, in input order
+    """
+    population = load_reference_population()
+    buckets = [age_bucket(age) for age in retirement_ages]
+    ranks = [{} for _ in buckets]
+
+    for bucket in set(buckets):
+        users = [i for i, name in enumerate(buckets) if name == bucket]
+        for metric in METRICS:
+            if metric not in metrics:
+                continue
+            sorted_values = population[(bucket, metric)]
+            if len(sorted_values) == 0:
+                for i in users:
+                    ranks[i][metric] = None
+                continue
+            values = np.array([metrics[metric][i] for i in users], dtype=np.float64)
+            positions = np.searchsorted(sorted_values, values, side='right')
+            percents = np.round(100.0 * positions / len(sorted_values), 1)
+            for i, percent in zip(users, percents):
+                ranks[i][metric] = percent
+
+    return [
+        {
+            'bucket': bucket,
+            'population_size': int(len(population[(bucket, METRICS[0])])),
+            'source': population[SOURCE_KEY],
+            'ranks': user_ranks,
+            'lower_is_better': [metric for metric in LOWER_IS_BETTER if metric in user_ranks],
+        }
+        for bucket, user_ranks in zip(buckets, ranks)
+    ]
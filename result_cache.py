@@ -0,0 +1,444 @@
+"""
+RetireUS Shared Result Cache
+============================
+Content-addressed cache of encoded /api/analyze responses, shared by every
+gunicorn worker on the host.
+
+Keys are a hash of the canonical formatted responses (sorted keys, sorted
+and de-duplicated multi-selects) together with RULESET_VERSION, a digest of
+the code and data the results are computed from, so a deploy that changes
+a rule never serves a stale result.
+
+The store is one memory-mapped file (in /dev/shm where available) holding a
+fixed number of slots, so memory is bounded. Each slot keeps one response;
+the least recently used slot is evicted when the cache is full. Workers
+coordinate with an fcntl lock on the file (plus a thread lock within a
+process), and hit/miss/eviction counters live in the file header so they
+cover every worker.
+
+Only full-fidelity results are stored, and lookups always ask for the
+full-fidelity result, so a worker under load still serves full answers for
+anything already cached.
+
+Identical submissions arriving together are computed once across the host.
+Within a worker they go through single_flight. Across workers (gunicorn's
+sync workers are separate processes) the worker that computes a key first
+claims a slot for it: an in-flight marker holding its pid and claim time.
+Other workers that miss on a claimed key poll the file until the result
+lands, the claim is released (the leader failed or degraded) or the leader
+dies, and otherwise give up after the coalescing timeout and compute it
+themselves.
+
+Configuration:
+    RETIREUS_CACHE_PATH        cache file (default: retireus-results.cache in /dev/shm)
+    RETIREUS_CACHE_SLOTS       number of cached responses, 0 disables the cache (default 512)
+    RETIREUS_CACHE_SLOT_BYTES  largest cacheable response in bytes (default 16384)
+    RETIREUS_COALESCE_TIMEOUT  seconds to wait on another worker's claim, 0 disables claims (default 10)
+"""
+
+import base64
+import fcntl
+import hashlib
+import json
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+from analysis import MULTI_SELECT_FIELDS, analyze_formatted, format_responses
+from load_control import FidelityLevel
+from ruleset import RULESET_VERSION
+from single_flight import DEFAULT_TIMEOUT, SingleFlight
+
+DEFAULT_SLOTS = 512
+DEFAULT_SLOT_BYTES = 16 * 1024
+
+# Polling interval bounds while waiting on another worker's claim (seconds)
+CLAIM_POLL_MIN = 0.002
+CLAIM_POLL_MAX = 0.05
+
+LAYOUT_VERSION = 2
+MAGIC = b'RTUSCACH'
+# magic, layout version, slots, slot bytes, ruleset version, clock, hits, misses, evictions, coalesced
+HEADER = struct.Struct('<8sIII16sQQQQQ')
+COUNTERS_OFFSET = struct.calcsize('<8sIII16s')
+COUNTERS = struct.Struct('<QQQQQ')
+
+# A slot holds a result (length > 0), a claim (claimed_by set, length 0) or nothing
+INDEX_DTYPE = np.dtype([
+    ('key_hi', '<u8'),
+    ('key_lo', '<u8'),
+    ('last_used', '<u8'),
+    ('length', '<u4'),
+    ('claimed_by', '<u4'),
+    ('claimed_at', '<f8'),
+])
+
+
+def canonical_form(formatted_responses):
+    """Formatted responses with multi-selects sorted and de-duplicated"""
+    canonical = dict(formatted_responses)
+    for field in MULTI_SELECT_FIELDS:
+        if field in canonical:
+            canonical[field] = sorted(set(canonical[field]), key=str)
+    return canonical
+
+
+def canonical_key(formatted_responses, fidelity=FidelityLevel.FULL):
+    """
+    16-byte cache key for formatted responses under the current rule set
+    """
+    canonical = json.dumps(canonical_form(formatted_responses), sort_keys=True,
+                           separators=(',', ':'))
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(f'{RULESET_VERSION}|{fidelity.value}|'.encode('utf-8'))
+    digest.update(canonical.encode('utf-8'))
+    return digest.digest()
+
+
+def answers_token(formatted_responses):
+    """
+    Compact URL-safe encoding of formatted responses: unpadded base64url of
+    their canonical JSON, so equal answers always give the same token
+    """
+    canonical = json.dumps(canonical_form(formatted_responses), sort_keys=True,
+                           separators=(',', ':'))
+    return base64.urlsafe_b64encode(canonical.encode('utf-8')).rstrip(b'=').decode('ascii')
+
+
+def decode_answers_token(token):
+    """
+    Formatted responses from an answers token (canonical or not)
+    Raises: ValueError for tokens that are not base64url JSON objects
+    """
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        responses = json.loads(raw)
+    except (ValueError, TypeError) as e:
+        raise ValueError(f'Invalid answers token: {e}')
+    if not isinstance(responses, dict):
+        raise ValueError('Invalid answers token: not a JSON object')
+    return format_responses(responses)
+
+
+def encode_result(result):
+    """Response body bytes, encoded the way Flask's jsonify does outside debug mode"""
+    return (json.dumps(result, sort_keys=True, separators=(',', ':')) + '\n').encode('utf-8')
+
+
+class SharedResultCache:
+    """
+    Bounded LRU cache of response bytes in a memory-mapped file.
+
+    Usage:
+        cache = SharedResultCache('/dev/shm/retireus-results.cache')
+        body = cache.get(key)
+        if body is None:
+            if cache.claim(key):
+                try:
+                    cache.put(key, compute())
+                finally:
+                    cache.release(key)
+            else:
+                body = cache.wait(key) or compute()
+    """
+
+    def __init__(self, path, slots=DEFAULT_SLOTS, slot_bytes=DEFAULT_SLOT_BYTES,
+                 claim_timeout=DEFAULT_TIMEOUT):
+        """
+        Args:
+            claim_timeout: seconds a claim holds and a waiter waits on one;
+                           0 disables claims
+        """
+        self.path = path
+        self.slots = slots
+        self.slot_bytes = slot_bytes
+        self.claim_timeout = claim_timeout
+        self.data_offset = HEADER.size + slots * INDEX_DTYPE.itemsize
+        self.size = self.data_offset + slots * slot_bytes
+
+        self._thread_lock = threading.Lock()
+        self._pid = None
+        self._fd = None
+        self._map = None
+        self._index = None
+
+    @classmethod
+    def from_env(cls):
+        """Cache configured from RETIREUS_CACHE_*, or None when disabled"""
+        slots = int(os.environ.get('RETIREUS_CACHE_SLOTS', DEFAULT_SLOTS))
+        if slots <= 0:
+            return None
+        shm = '/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir()
+        path = os.environ.get('RETIREUS_CACHE_PATH', os.path.join(shm, 'retireus-results.cache'))
+        slot_bytes = int(os.environ.get('RETIREUS_CACHE_SLOT_BYTES', DEFAULT_SLOT_BYTES))
+        claim_timeout = float(os.environ.get('RETIREUS_COALESCE_TIMEOUT', DEFAULT_TIMEOUT))
+        return cls(path, slots, slot_bytes, claim_timeout)
+
+    def _open(self):
+        """
+        Map the file in this process; forked workers must not share the
+        parent's descriptor, or their flock calls would not exclude each other
+        """
+        if self._pid == os.getpid():
+            return
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        try:
+            if not self._layout_matches(fd):
+                # New file, other geometry or other rule set: start empty
+                os.ftruncate(fd, 0)
+                os.ftruncate(fd, self.size)
+                os.pwrite(fd, HEADER.pack(MAGIC, LAYOUT_VERSION, self.slots, self.slot_bytes,
+                                          RULESET_VERSION.encode('ascii'), 0, 0, 0, 0, 0), 0)
+        finally:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+
+        self._fd = fd
+        self._map = mmap.mmap(fd, self.size)
+        self._index = np.ndarray(self.slots, dtype=INDEX_DTYPE, buffer=self._map,
+                                 offset=HEADER.size)
+        self._pid = os.getpid()
+
+    def _layout_matches(self, fd):
+        if os.fstat(fd).st_size != self.size:
+            return False
+        header = HEADER.unpack(os.pread(fd, HEADER.size, 0))
+        return header[:5] == (MAGIC, LAYOUT_VERSION, self.slots, self.slot_bytes,
+                              RULESET_VERSION.encode('ascii'))
+
+    def _locked(self, operation):
+        """Run operation() holding the thread lock and the file lock"""
+        with self._thread_lock:
+            self._open()
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+            try:
+                return operation()
+            finally:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    def _counters(self):
+        return list(COUNTERS.unpack_from(self._map, COUNTERS_OFFSET))
+
+    def _matches(self, key):
+        hi, lo = struct.unpack('<QQ', key)
+        return (self._index['key_hi'] == hi) & (self._index['key_lo'] == lo)
+
+    def _find(self, key):
+        matches = np.flatnonzero(self._matches(key) & (self._index['length'] > 0))
+        return int(matches[0]) if len(matches) else None
+
+    def _live_claims(self):
+        """Mask of slots holding a claim that has not expired"""
+        index = self._index
+        return (index['length'] == 0) & (index['claimed_by'] != 0) & \
+            (index['claimed_at'] > time.time() - self.claim_timeout)
+
+    def _free_slot(self, counters):
+        """Slot to (re)use for a new entry: an empty one, else the least recently used result"""
+        free = (self._index['length'] == 0) & ~self._live_claims()
+        empty = np.flatnonzero(free)
+        if len(empty):
+            return int(empty[0])
+        candidates = np.flatnonzero(self._index['length'] > 0)
+        if not len(candidates):
+            return None
+        counters[3] += 1
+        return int(candidates[np.argmin(self._index['last_used'][candidates])])
+
+    def _read(self, slot, counters):
+        entry = self._index[slot]
+        counters[0] += 1
+        entry['last_used'] = counters[0]
+        start = self.data_offset + slot * self.slot_bytes
+        return bytes(self._map[start:start + int(entry['length'])])
+
+    def get(self, key):
+        """Cached bytes for key, or None; counts a hit or a miss"""
+        def operation():
+            counters = self._counters()
+            slot = self._find(key)
+            if slot is None:
+                counters[2] += 1
+                body = None
+            else:
+                counters[1] += 1
+                body = self._read(slot, counters)
+            COUNTERS.pack_into(self._map, COUNTERS_OFFSET, *counters)
+            return body
+        return self._locked(operation)
+
+    def put(self, key, body):
+        """
+        Store body under key (filling this key's claim, if any), evicting the
+        least recently used entry if full
+        """
+        if not body or len(body) > self.slot_bytes:
+            return False
+
+        def operation():
+            counters = self._counters()
+            slot = self._find(key)
+            if slot is None:
+                claimed = np.flatnonzero(self._matches(key) & (self._index['claimed_by'] != 0))
+                slot = int(claimed[0]) if len(claimed) else self._free_slot(counters)
+            if slot is None:
+                return False
+            start = self.data_offset + slot * self.slot_bytes
+            self._map[start:start + len(body)] = body
+            counters[0] += 1
+            self._index[slot] = (*struct.unpack('<QQ', key), counters[0], len(body), 0, 0.0)
+            COUNTERS.pack_into(self._map, COUNTERS_OFFSET, *counters)
+            return True
+        return self._locked(operation)
+
+    def claim(self, key):
+        """
+        Mark key as being computed by this process.
+        Returns: True when the caller should compute it (claimed, or claims
+                 are disabled or there is no slot to claim), False when
+                 another live claim exists or the result is already stored
+        """
+        if self.claim_timeout <= 0:
+            return True
+
+        def operation():
+            if self._find(key) is not None:
+                # Stored since the caller's miss: wait() returns it at once
+                return False
+            # An earlier claim on key: respected while live, taken over once stale
+            earlier = np.flatnonzero(self._matches(key) & (self._index['length'] == 0) &
+                                     (self._index['claimed_by'] != 0))
+            if len(earlier) and self._live_claims()[earlier[0]] and \
+                    _alive(int(self._index[earlier[0]]['claimed_by'])):
+                return False
+            counters = self._counters()
+            slot = int(earlier[0]) if len(earlier) else self._free_slot(counters)
+            if slot is None:
+                return True
+            counters[0] += 1
+            self._index[slot] = (*struct.unpack('<QQ', key), counters[0], 0, os.getpid(), time.time())
+            COUNTERS.pack_into(self._map, COUNTERS_OFFSET, *counters)
+            return True
+        return self._locked(operation)
+
+    def release(self, key):
+        """Drop this process's claim on key if no result was stored for it"""
+        if self.claim_timeout <= 0:
+            return
+
+        def operation():
+            mine = np.flatnonzero(self._matches(key) & (self._index['length'] == 0) &
+                                  (self._index['claimed_by'] == os.getpid()))
+            for slot in mine:
+                self._index[slot] = (0, 0, 0, 0, 0, 0.0)
+        self._locked(operation)
+
+    def wait(self, key, timeout=None):
+        """
+        Wait for another process's claim on key to produce a result
+        Returns: the result bytes (counted as coalesced), or None once the
+                 claim is released, its process has died or timeout passes
+        """
+        deadline = time.monotonic() + (self.claim_timeout if timeout is None else timeout)
+
+        def operation():
+            slot = self._find(key)
+            if slot is not None:
+                counters = self._counters()
+                counters[4] += 1
+                body = self._read(slot, counters)
+                COUNTERS.pack_into(self._map, COUNTERS_OFFSET, *counters)
+                return body, False
+            pending = np.flatnonzero(self._matches(key) & self._live_claims())
+            claimed = len(pending) and _alive(int(self._index[pending[0]]['claimed_by']))
+            return None, bool(claimed)
+
+        interval = CLAIM_POLL_MIN
+        while True:
+            body, claimed = self._locked(operation)
+            if body is not None or not claimed or time.monotonic() >= deadline:
+                return body
+            time.sleep(interval)
+            interval = min(interval * 2, CLAIM_POLL_MAX)
+
+    def stats(self):
+        """Counters shared by every process using the cache file"""
+        def operation():
+            _, hits, misses, evictions, coalesced = self._counters()
+            return {
+                'hits': hits,
+                'misses': misses,
+                'hit_rate': round(hits / (hits + misses), 4) if hits + misses else 0.0,
+                'evictions': evictions,
+                'coalesced': coalesced,
+                'claims': int(np.count_nonzero(self._live_claims())),
+                'entries': int(np.count_nonzero(self._index['length'])),
+                'capacity': self.slots,
+                'ruleset_version': RULESET_VERSION,
+            }
+        return self._locked(operation)
+
+
+def _alive(pid):
+    """Whether a process with this pid exists"""
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+result_cache = SharedResultCache.from_env()
+single_flight = SingleFlight.from_env()
+
+
+def analyze_cached(raw_responses, track, queued_since=None, cache=result_cache, flight=single_flight):
+    """
+    Encoded /api/analyze response for raw quiz responses, from the shared
+    cache when an identical submission was already analyzed at full fidelity.
+    Concurrent identical submissions share one computation: in this process
+    through flight, across processes through a claim in the cache.
+
+    Args:
+        track: LoadController.track, entered only when the result is computed
+
+    Returns: (response body bytes, FidelityLevel it was computed at)
+    """
+    formatted_responses = format_responses(raw_responses)
+    key = canonical_key(formatted_responses)
+    if cache is not None:
+        body = cache.get(key)
+        if body is not None:
+            return body, FidelityLevel.FULL
+
+    def analyze():
+        with track(queued_since=queued_since) as fidelity:
+            result = analyze_formatted(formatted_responses, fidelity)
+        return encode_result(result), fidelity
+
+    def compute():
+        if cache is None:
+            return analyze()
+        if not cache.claim(key):
+            body = cache.wait(key)
+            if body is not None:
+                return body, FidelityLevel.FULL
+            return analyze()
+        try:
+            body, fidelity = analyze()
+            if fidelity == FidelityLevel.FULL:
+                cache.put(key, body)
+            return body, fidelity
+        finally:
+            cache.release(key)
+
+    if flight is None:
+        return compute()
+    return flight.do(key, compute)
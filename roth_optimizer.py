@@ -0,0 +1,133 @@
+"""
+RetireUS Roth Conversion Optimizer
+==================================
+Chooses yearly Roth conversion amounts between retirement and the first RMD
+to minimize the present value of lifetime federal tax on pre-tax savings.
+
+The optimizer is a dynamic program over a grid of pre-tax balance states:
+- States are balances deflated by growth, so converting moves between grid
+  points exactly and every year shares the same grid.
+- A conversion's tax depends only on how many grid steps it spans, so each
+  year's transition costs are one memoized vector, not a matrix per user.
+- The value of the balance left at RMD age comes from the vectorized RMD
+  projection, evaluated for every grid state at once.
+- Conversions whose top dollar is taxed above the highest bracket RMDs would
+  ever reach are dominated by smaller conversions and pruned; since the
+  marginal rate only rises with the amount, the pruned columns are simply
+  sliced off the transition matrix.
+"""
+
+from functools import lru_cache
+from typing import Dict
+
+import numpy as np
+
+from tax_projection import RMD_START_AGE, SCHEDULE_YEARS, project_rmd_schedules
+from tax_tables import DEFAULT_FILING_STATUS, STANDARD_DEDUCTION, income_tax, marginal_rate
+
+# Number of pre-tax balance states in the grid
+GRID_STATES = 201
+
+# Rate used to discount future tax payments (long-run inflation)
+DEFAULT_DISCOUNT_RATE = 0.025
+
+
+@lru_cache(maxsize=4096)
+def conversion_tax_vector(dollar_step, other_income, n_states, filing_status=DEFAULT_FILING_STATUS):
+    """
+    Federal tax added by converting k grid steps, for k = 0..n_states-1.
+
+    Memoized on (dollar step, other income, grid size, filing status), so
+    repeat profiles and repeat years reuse the same vector.
+
+    Returns: (tax, top_marginal_rate) read-only arrays indexed by steps converted
+    """
+    deduction = STANDARD_DEDUCTION[filing_status]
+    conversions = np.arange(n_states) * dollar_step
+    taxable = other_income + conversions - deduction
+
+    tax = income_tax(taxable, filing_status) - income_tax(other_income - deduction, filing_status)
+    # Rate on the last dollar converted (the first dollar for k = 0)
+    top_rate = marginal_rate(np.maximum(taxable - 1.0, 0.0), filing_status)
+
+    for table in (tax, top_rate):
+        table.flags.writeable = False
+    return tax, top_rate
+
+
+def optimize_roth_conversions(pretax_balance, retirement_age, growth_rate, other_income=0.0,
+                              rmd_start_age=RMD_START_AGE, discount_rate=DEFAULT_DISCOUNT_RATE,
+                              filing_status=DEFAULT_FILING_STATUS, n_states=GRID_STATES) -> Dict:
+    """
+    Optimal yearly conversions from retirement_age up to rmd_start_age.
+
+    Args:
+        pretax_balance: pre-tax savings at retirement
+        growth_rate: annual growth of the pre-tax balance
+        other_income: other ordinary income each year, e.g. pension
+
+    Returns: dict with the conversion schedule and lifetime tax with and without it
+    """
+    window = max(rmd_start_age - retirement_age, 0)
+    pretax_balance = max(float(pretax_balance), 0.0)
+    step = pretax_balance / (n_states - 1)
+
+    # growth[t] turns a grid balance into dollars at the start of year t
+    growth = (1.0 + growth_rate) ** np.arange(window + 1)
+    discount = (1.0 + discount_rate) ** -np.arange(window + SCHEDULE_YEARS)
+
+    # Present value of RMD taxes on whatever is left at the end of the window
+    grid = np.arange(n_states) * step
+    schedule = project_rmd_schedules(grid * growth[window], rmd_start_age, growth_rate,
+                                     other_income, filing_status=filing_status)
+    value = schedule['rmd_tax'] @ discount[window:window + SCHEDULE_YEARS]
+    highest_rmd_rate = float(schedule['marginal_rate'].max())
+
+    # to_state[i, k] = state reached from state i by converting k steps
+    states = np.arange(n_states)
+    to_state = states[:, None] - states[None, :]
+    reachable = to_state >= 0
+    to_state = np.maximum(to_state, 0)
+
+    policy = np.zeros((window, n_states), dtype=np.int64)
+    for year in range(window - 1, -1, -1):
+        tax, top_rate = conversion_tax_vector(round(step * growth[year], 2), float(other_income),
+                                              n_states, filing_status)
+        # top_rate never falls as k grows, so the unpruned conversions are a prefix
+        width = max(int(np.count_nonzero(top_rate <= highest_rmd_rate)), 1)
+        allowed = reachable[:, :width]
+
+        cost = np.where(allowed, tax[None, :width] * discount[year] + value[to_state[:, :width]], np.inf)
+        policy[year] = np.argmin(cost, axis=1)
+        value = cost[states, policy[year]]
+
+    # Walk the policy forward from the full balance
+    state = n_states - 1
+    conversions = []
+    conversion_tax = 0.0
+    for year in range(window):
+        steps = int(policy[year, state])
+        tax, top_rate = conversion_tax_vector(round(step * growth[year], 2), float(other_income),
+                                              n_states, filing_status)
+        if steps:
+            conversions.append({
+                'age': retirement_age + year,
+                'amount': round(steps * step * growth[year], 2),
+                'tax': round(float(tax[steps]), 2),
+                'marginal_rate': float(top_rate[steps]),
+            })
+            conversion_tax += float(tax[steps]) * discount[year]
+        state -= steps
+
+    no_conversion = float(schedule['rmd_tax'][-1] @ discount[window:window + SCHEDULE_YEARS])
+    optimized = float(value[-1])
+
+    return {
+        'window_years': window,
+        'conversions': conversions,
+        'total_converted': round(sum((c['amount'] for c in conversions), 0.0), 2),
+        'conversion_tax_pv': round(conversion_tax, 2),
+        'lifetime_tax_pv': round(optimized, 2),
+        'lifetime_tax_pv_without_conversions': round(no_conversion, 2),
+        'tax_savings_pv': round(max(no_conversion - optimized, 0.0), 2),
+    }
@@ -0,0 +1,34 @@
+"""
+RetireUS Rule-Set Version
+=========================
+RULESET_VERSION is a digest of every module and data file that results are
+computed from (tests excluded). Anything derived from those files, such as
+cached results or prebuilt artifacts, records the version it was built under
+and is discarded when the version changes.
+"""
+
+import glob
+import hashlib
+import os
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+
+def _ruleset_version():
+    """
+    Digest of every module and data file results are computed from
+    (tests excluded)
+    """
+    paths = sorted(
+        path for path in glob.glob(os.path.join(ROOT, '*.py'))
+        if not os.path.basename(path).startswith('test_')
+    ) + sorted(glob.glob(os.path.join(ROOT, 'data', '*')))
+    digest = hashlib.sha256()
+    for path in paths:
+        digest.update(os.path.basename(path).encode('utf-8'))
+        with open(path, 'rb') as f:
+            digest.update(f.read())
+    return digest.hexdigest()[:16]
+
+
+RULESET_VERSION = _ruleset_version()
@@ -0,0 +1,155 @@
+"""
+RetireUS Scenario Catalog
+=========================
+The QA test scenarios, kept in one data file (data/scenarios.json) that the
+web app, test_scenarios.py and analyze_user_responses.py all read, so the
+scenarios they use cannot drift apart.
+
+Each scenario has an id, a name and description, the expected flag count and
+tiers, and the quiz responses that make it up.
+
+The catalog is loaded once at startup. The list and per-scenario response
+bodies are encoded once, with an ETag for each, so serving them is a dict
+lookup. warm_results() analyzes every scenario at full fidelity in one
+batch, so workers serve scenario results from memory as well; they are
+tagged with the rule-set version they were computed under and recomputed
+only when it changes. Nothing is analyzed at import: create_app() warms the
+results before gunicorn forks, and otherwise the first result request does.
+
+A scenario bundle is one scenario's catalog entry (metadata and responses),
+optionally with its analysis under 'result', so the scenarios page opens a
+scenario in a single request.
+
+USAGE:
+    from scenario_catalog import scenario_catalog
+    responses = scenario_catalog.responses('high_earner')
+"""
+
+import copy
+import hashlib
+import json
+import os
+import threading
+
+from analysis import analyze_batch, format_responses
+from load_control import FidelityLevel
+from result_cache import RULESET_VERSION, canonical_key, encode_result
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+CATALOG_PATH = os.path.join(ROOT, 'data', 'scenarios.json')
+
+# Fields of each scenario listed by /api/scenarios/list
+SUMMARY_FIELDS = ('id', 'name', 'description', 'expected_flags', 'expected_tiers')
+
+
+def encode_bundle(scenario, result=None):
+    """
+    (body, etag) for a scenario bundle: the catalog entry, plus the
+    analysis result when one is given
+    """
+    bundle = dict(scenario)
+    if result is not None:
+        bundle['result'] = result
+    body = encode_result(bundle)
+    return body, body_etag(body)
+
+
+def body_etag(body):
+    """Strong ETag for an encoded response body"""
+    return hashlib.blake2b(body, digest_size=16).hexdigest()
+
+
+class ScenarioCatalog:
+    """
+    Scenarios indexed by id, with their response bodies pre-encoded.
+
+    Usage:
+        catalog = ScenarioCatalog.load()
+        body, etag = catalog.list_body, catalog.list_etag
+    """
+
+    def __init__(self, scenarios):
+        self.scenarios = scenarios
+        self.by_id = {scenario['id']: scenario for scenario in scenarios}
+        if len(self.by_id) != len(scenarios):
+            raise ValueError('Duplicate scenario ids in the catalog')
+
+        self.list_body = encode_result([
+            {field: scenario[field] for field in SUMMARY_FIELDS} for scenario in scenarios
+        ])
+        self.list_etag = body_etag(self.list_body)
+
+        self.bodies = {}
+        for scenario_id, scenario in self.by_id.items():
+            body = encode_result(scenario['responses'])
+            self.bodies[scenario_id] = (body, body_etag(body))
+        self.bundles = {scenario_id: encode_bundle(scenario) for scenario_id, scenario in self.by_id.items()}
+
+        self.results = {}
+        self.result_bundles = {}
+        self.results_version = None
+        self._warm_lock = threading.Lock()
+
+    @classmethod
+    def load(cls, path=CATALOG_PATH):
+        """Catalog read from a scenarios JSON file"""
+        with open(path) as f:
+            return cls(json.load(f))
+
+    def ids(self):
+        """Scenario ids in catalog order"""
+        return list(self.by_id)
+
+    def responses(self, scenario_id):
+        """
+        A copy of one scenario's quiz responses
+        Raises: KeyError for unknown ids
+        """
+        return copy.deepcopy(self.by_id[scenario_id]['responses'])
+
+    def warm_results(self, ruleset_version=RULESET_VERSION):
+        """
+        Analyze every scenario at full fidelity, unless the results for this
+        rule-set version are already in memory. Scenarios whose analysis
+        fails are left out, so their result requests are computed on demand.
+        """
+        if self.results_version == ruleset_version:
+            return
+        with self._warm_lock:
+            if self.results_version != ruleset_version:
+                self._warm(ruleset_version)
+
+    def _warm(self, ruleset_version):
+        ids = self.ids()
+        analyzed = analyze_batch([self.by_id[scenario_id]['responses'] for scenario_id in ids],
+                                 FidelityLevel.FULL)
+        results = {}
+        result_bundles = {}
+        for scenario_id, result in zip(ids, analyzed):
+            if 'error' not in result:
+                # Same ETag as GET /api/analyze gives these answers
+                etag = canonical_key(format_responses(self.by_id[scenario_id]['responses'])).hex()
+                results[scenario_id] = (encode_result(result), etag)
+                result_bundles[scenario_id] = encode_bundle(self.by_id[scenario_id], result)
+        self.results = results
+        self.result_bundles = result_bundles
+        self.results_version = ruleset_version
+
+    def result(self, scenario_id):
+        """
+        Pre-computed (body, etag) for a scenario's analysis, or None when it
+        was not warmed
+        """
+        return self.results.get(scenario_id)
+
+    def bundle(self, scenario_id, include_result=False):
+        """
+        Pre-encoded (body, etag) for a scenario bundle, or None when the
+        result was asked for but not warmed
+        """
+        if include_result:
+            return self.result_bundles.get(scenario_id)
+        return self.bundles[scenario_id]
+
+
+scenario_catalog = ScenarioCatalog.load()
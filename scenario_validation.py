@@ -0,0 +1,144 @@
+"""
+RetireUS Scenario Validation
+============================
+Runs scenarios through the detector and scoring and checks each one against
+its catalog expectations:
+- expected_flags: the number of red flags detected
+- expected_tiers: the tiers the flags qualify for (Basic Planning with any
+  basic flag, Tax Mastery with 2+ tax flags, Wealth Mastery with any wealth
+  flag), not just the single recommended plan
+
+Scenarios are split into chunks that a process pool analyzes in parallel,
+each chunk as one analyze_batch call. Catalogs of a chunk or less, and any
+call with workers=1, run in this process; the web endpoint always does, so
+a request never starts a pool.
+
+By default scenarios are analyzed at closed_form fidelity: the flags and
+scores the expectations cover, without the simulations behind them.
+
+USAGE:
+    python scenario_validation.py [catalog.json] [workers] [fidelity]
+"""
+
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from analysis import analyze_batch
+from load_control import FidelityLevel
+
+CHUNK_SIZE = 256
+
+
+def qualifying_tiers(summary):
+    """Tiers a result's flag counts qualify for (see RedFlagDetector.get_recommendations)"""
+    tiers = []
+    if summary['basic_count'] > 0:
+        tiers.append('Basic Planning')
+    if summary['tax_count'] >= 2:
+        tiers.append('Tax Mastery')
+    if summary['wealth_count'] >= 1:
+        tiers.append('Wealth Mastery')
+    return tiers
+
+
+def check_scenario(scenario, result):
+    """Pass/fail report for one scenario's analysis result"""
+    report = {
+        'id': scenario.get('id'),
+        'expected_flags': scenario.get('expected_flags'),
+        'expected_tiers': scenario.get('expected_tiers'),
+    }
+    if 'error' in result:
+        return {**report, 'passed': False, 'error': result['error']}
+
+    actual_flags = result['summary']['total_flags']
+    actual_tiers = qualifying_tiers(result['summary'])
+    flags_match = actual_flags == report['expected_flags']
+    tiers_match = set(actual_tiers) == set(report['expected_tiers'] or [])
+    return {
+        **report,
+        'actual_flags': actual_flags,
+        'actual_tiers': actual_tiers,
+        'red_flags': [rf['id'] for rf in result['red_flags']],
+        'flags_match': flags_match,
+        'tiers_match': tiers_match,
+        'passed': flags_match and tiers_match,
+    }
+
+
+def validate_chunk(scenarios, fidelity):
+    """
+    Analyze and check a list of scenarios in one batch
+    Returns: (list of scenario reports, seconds spent)
+    """
+    started = time.perf_counter()
+    results = analyze_batch([scenario.get('responses') for scenario in scenarios], fidelity)
+    reports = [check_scenario(scenario, result) for scenario, result in zip(scenarios, results)]
+    return reports, time.perf_counter() - started
+
+
+def validate_scenarios(scenarios, fidelity=FidelityLevel.CLOSED_FORM, workers=None, chunk_size=CHUNK_SIZE):
+    """
+    Validate scenarios against their expectations, in parallel when there
+    is more than one chunk
+
+    Returns: report dict with pass/fail counts, timings and a per-scenario
+             report for every scenario, in input order
+    """
+    started = time.perf_counter()
+    chunks = [scenarios[i:i + chunk_size] for i in range(0, len(scenarios), chunk_size)]
+    workers = min(workers or os.cpu_count() or 1, len(chunks) or 1)
+
+    if len(chunks) <= 1 or workers == 1:
+        outcomes = [validate_chunk(chunk, fidelity) for chunk in chunks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            outcomes = list(pool.map(validate_chunk, chunks, [fidelity] * len(chunks)))
+
+    reports = [report for chunk_reports, _ in outcomes for report in chunk_reports]
+    elapsed = time.perf_counter() - started
+    analysis_seconds = sum(seconds for _, seconds in outcomes)
+    passed = sum(1 for report in reports if report['passed'])
+    return {
+        'total': len(reports),
+        'passed': passed,
+        'failed': len(reports) - passed,
+        'all_passed': passed == len(reports),
+        'fidelity': fidelity.value,
+        'timings': {
+            'wall_seconds': round(elapsed, 4),
+            'analysis_seconds': round(analysis_seconds, 4),
+            'per_scenario_ms': round(1000 * analysis_seconds / len(reports), 3) if reports else 0.0,
+            'workers': workers if len(chunks) > 1 else 1,
+            'chunks': len(chunks),
+        },
+        'scenarios': reports,
+    }
+
+
+if __name__ == "__main__":
+    from scenario_catalog import CATALOG_PATH
+
+    path = sys.argv[1] if len(sys.argv) > 1 else CATALOG_PATH
+    workers = int(sys.argv[2]) if len(sys.argv) > 2 else None
+    fidelity = FidelityLevel(sys.argv[3]) if len(sys.argv) > 3 else FidelityLevel.CLOSED_FORM
+
+    with open(path) as f:
+        scenarios = json.load(f)
+    report = validate_scenarios(scenarios, fidelity, workers)
+
+    for scenario in report['scenarios']:
+        if not scenario['passed']:
+            detail = scenario.get('error') or (
+                f"flags {scenario['actual_flags']} (expected {scenario['expected_flags']}), "
+                f"tiers {scenario['actual_tiers']} (expected {scenario['expected_tiers']})")
+            print(f"FAIL  {scenario['id']}: {detail}")
+
+    timings = report['timings']
+    print(f"\n{report['passed']}/{report['total']} scenarios passed at {report['fidelity']} fidelity "
+          f"in {timings['wall_seconds']:.2f}s ({timings['workers']} worker(s), "
+          f"{timings['per_scenario_ms']:.2f} ms of analysis per scenario)")
+    sys.exit(0 if report['all_passed'] else 1)
@@ -6,9 +6,56 @@ Calculates Pacing, Tax Planning, and Risk of Failure scores
 
 import math
 
-def calculate_pacing_score(responses):
+import numpy as np
+
+from glide_path import glide_path_for_style, project_future_value
+from historical_replay import historical_success_rate
+from roth_optimizer import optimize_roth_conversions
+from tax_projection import RMD_START_AGE, project_rmd_schedules, summarize_rmd_schedule
+from withdrawal_simulator import PLANNING_AGE, solve_safe_withdrawal_rate
+
+# Investment style to rates mapping
+RATE_MAP = {
+    'd': [0.025, 0.03, 0.035, 0.04],  # Safe investments
+    'c': [0.04, 0.045, 0.05, 0.055],   # Income investments
+    'b': [0.055, 0.06, 0.065, 0.07],   # Moderate
+    'a': [0.075, 0.08, 0.085, 0.09]    # Casino/aggressive
+}
+
+# Withdrawal rate the FV target is sized for, unless a solved rate is requested
+DEFAULT_WITHDRAWAL_RATE = 0.045
+
+# Historical success rate needed for each pacing result
+HISTORICAL_ON_TRACK_RATE = 0.90
+HISTORICAL_AT_RISK_RATE = 0.75
+
+# Score statuses, in the order the vectorized scorers code them
+STATUSES = ('on_track', 'at_risk', 'off_track')
+
+# Red flags that add to the Risk of Failure score, and their points
+RISK_FLAG_POINTS = {
+    'basic_rf1': 3,
+    'basic_rf3': 4,
+    'basic_rf4': 4,
+    'basic_rf5': 2,
+    'tax_rf1': 2,
+    'wealth_rf3': 3
+}
+
+
+def calculate_pacing_score(responses, mode='fixed', swr_target=None):
     """
     Calculate Pacing Score using FV formula
+    
+    Modes:
+    - 'fixed': FV at the four rate_map rates for the investment style
+    - 'glide': FV along a de-risking glide path starting at each rate_map rate
+    - 'historical': replay against every historical start year
+    
+    swr_target: when set (e.g. 0.9), the FV target is sized with the safe
+    withdrawal rate that succeeds with that probability until PLANNING_AGE,
+    instead of the fixed 4.5% rule.
+    
     Returns: dict with score, result text, and status
     """
     # Get inputs
@@ -24,28 +71,60 @@ def calculate_pacing_score(responses):
     current_age = 40  # You might want to add this as a quiz question
     number_of_periods = q4_retirement_age - current_age
     
-    # Investment style to rates mapping
-    rate_map = {
-        'd': [0.025, 0.03, 0.035, 0.04],  # Safe investments
-        'c': [0.04, 0.045, 0.05, 0.055],   # Income investments
-        'b': [0.055, 0.06, 0.065, 0.07],   # Moderate
-        'a': [0.075, 0.08, 0.085, 0.09]    # Casino/aggressive
-    }
+    rates = RATE_MAP.get(q9_investment_style, RATE_MAP['b'])
     
-    rates = rate_map.get(q9_investment_style, rate_map['b'])
+    withdrawal_rate = _withdrawal_rate(q9_investment_style, q4_retirement_age, swr_target)
     
     # Calculate FV Target
     fv_target = future_value(0.025, number_of_periods, -q10_annual_savings, 
-                             -(q7_annual_cost - q8b_pension_income), 0) / 0.045
+                             -(q7_annual_cost - q8b_pension_income), 0) / withdrawal_rate
+    
+    if mode == 'historical':
+        pacing = _historical_pacing_score(q9_investment_style, number_of_periods,
+                                          q10_annual_savings, q12_total_savings, fv_target)
+        return _with_withdrawal_rate(pacing, withdrawal_rate, swr_target)
     
     # Run FV calculation 4 times with different rates
     less_than_target_count = 0
     for rate in rates:
-        fv = future_value(rate, number_of_periods, -q10_annual_savings, -q12_total_savings, 0)
+        if mode == 'glide':
+            glide_path = glide_path_for_style(q9_investment_style, rate)
+            fv = project_future_value(glide_path, q12_total_savings, q10_annual_savings,
+                                      number_of_periods)
+        else:
+            fv = future_value(rate, number_of_periods, -q10_annual_savings, -q12_total_savings, 0)
         if fv < fv_target:
             less_than_target_count += 1
     
-    # Determine result
+    pacing = _pacing_result(less_than_target_count, fv_target)
+    return _with_withdrawal_rate(pacing, withdrawal_rate, swr_target)
+
+
+def _withdrawal_rate(investment_style, retirement_age, swr_target):
+    """
+    Withdrawal rate used to size the FV target
+    """
+    if swr_target is None:
+        return DEFAULT_WITHDRAWAL_RATE
+    style = investment_style if investment_style in RATE_MAP else 'b'
+    return solve_safe_withdrawal_rate(style, PLANNING_AGE - retirement_age, swr_target)
+
+
+def _with_withdrawal_rate(pacing, withdrawal_rate, swr_target):
+    """
+    Record the solved withdrawal rate in the pacing details
+    """
+    if swr_target is not None:
+        pacing['details']['withdrawal_rate'] = round(withdrawal_rate, 4)
+        pacing['details']['swr_target'] = swr_target
+    return pacing
+
+
+def _pacing_result(less_than_target_count, fv_target):
+    """
+    Map the number of FV calculations below target to the Pacing Score
+    Returns: dict with score, result text, and status
+    """
     if less_than_target_count == 0:
         result = "Likely On Track"
         status = "on_track"
@@ -70,9 +149,127 @@ def calculate_pacing_score(responses):
     }
 
 
-def calculate_tax_planning_score(responses):
+def calculate_pacing_scores(responses_list, mode='fixed', swr_target=None):
+    """
+    Calculate Pacing Scores for many users at once.
+    
+    Same results as calculate_pacing_score for the 'fixed' and 'glide'
+    modes, but each rate_map column is projected for the whole batch at
+    once: the FV target and 'fixed' mode with the FV formula over arrays,
+    'glide' mode with one lookup into the cached glide-path factor tables.
+    
+    Returns: list of score dicts, in input order
+    """
+    count = len(responses_list)
+    retirement_age = np.empty(count)
+    annual_cost = np.empty(count)
+    pension_income = np.empty(count)
+    annual_savings = np.empty(count)
+    total_savings = np.empty(count)
+    styles = np.empty(count, dtype=object)
+    
+    for i, responses in enumerate(responses_list):
+        has_pension = 'pension' in responses.get('q8_work_benefits', [])
+        retirement_age[i] = responses.get('q4_retirement_age', 65)
+        annual_cost[i] = responses.get('q7_annual_retirement_cost', 100000)
+        pension_income[i] = responses.get('q8b_pension_income', 0) if has_pension else 0
+        annual_savings[i] = responses.get('q10_annual_savings', 15000)
+        total_savings[i] = responses.get('q12_total_savings', 500000)
+        style = responses.get('q9_investment_style', 'b')
+        styles[i] = style if style in RATE_MAP else 'b'
+    
+    below_target, fv_target, withdrawal_rate = pacing_below_target(
+        retirement_age, annual_cost, pension_income, annual_savings, total_savings, styles,
+        mode, swr_target)
+    
+    return [
+        _with_withdrawal_rate(_pacing_result(int(below), float(target)), float(rate), swr_target)
+        for below, target, rate in zip(below_target, fv_target, withdrawal_rate)
+    ]
+
+
+def pacing_below_target(retirement_age, annual_cost, pension_income, annual_savings,
+                        total_savings, styles, mode='fixed', swr_target=None):
+    """
+    Array core of calculate_pacing_scores, for callers that already hold
+    per-user arrays (styles must be rate_map keys)
+    Returns: (FV calculations below target, FV target, withdrawal rate) arrays
+    """
+    current_age = 40
+    count = len(retirement_age)
+    number_of_periods = np.asarray(retirement_age, dtype=np.float64) - current_age
+    
+    if swr_target is None:
+        withdrawal_rate = np.full(count, DEFAULT_WITHDRAWAL_RATE)
+    else:
+        withdrawal_rate = np.array([
+            _withdrawal_rate(style, int(age), swr_target)
+            for style, age in zip(styles, retirement_age)
+        ])
+    fv_target = _future_values(0.025, number_of_periods, annual_savings,
+                               annual_cost - pension_income) / withdrawal_rate
+    
+    below_target = np.zeros(count, dtype=np.int64)
+    for style, rates in RATE_MAP.items():
+        members = styles == style
+        if not members.any():
+            continue
+        for rate in rates:
+            if mode == 'glide':
+                fv = project_future_value(glide_path_for_style(style, rate), total_savings[members],
+                                          annual_savings[members], number_of_periods[members])
+            else:
+                fv = _future_values(rate, number_of_periods[members], annual_savings[members],
+                                    total_savings[members])
+            below_target[members] += fv < fv_target[members]
+    
+    return below_target, fv_target, withdrawal_rate
+
+
+def _historical_pacing_score(investment_style, number_of_periods, annual_savings,
+                             total_savings, fv_target):
+    """
+    Pacing Score from the historical replay engine
+    Returns: dict with score, result text, and status
+    """
+    replay = historical_success_rate(investment_style, number_of_periods,
+                                     annual_savings, total_savings, fv_target)
+    success_rate = replay['success_rate']
+    
+    # No complete window (horizon longer than the dataset) counts as off track
+    if success_rate is None or success_rate < HISTORICAL_AT_RISK_RATE:
+        result = "Likely Off Track"
+        status = "off_track"
+        score = 6
+    elif success_rate < HISTORICAL_ON_TRACK_RATE:
+        result = "At Risk"
+        status = "at_risk"
+        score = 3
+    else:
+        result = "Likely On Track"
+        status = "on_track"
+        score = 0
+    
+    return {
+        'score': score,
+        'result': result,
+        'status': status,
+        'details': {
+            'mode': 'historical',
+            'fv_target': round(fv_target, 2),
+            **replay
+        }
+    }
+
+
+def calculate_tax_planning_score(responses, rmd_projection=None):
     """
     Calculate Tax Planning Score using baseline scoring
+    
+    rmd_projection: summarize_rmd_schedule result to attach under
+    details.rmd_projection; nothing is projected here, so callers that want
+    it project RMDs first (see calculate_tax_planning_scores)
+    
     Returns: dict with score, result text, and status
     """
     score = 0  # Baseline starts at 0
@@ -135,11 +332,93 @@ def calculate_tax_planning_score(responses):
         result = "Low Tax Burden"
         status = "on_track"
     
-    return {
+    tax_planning = {
         'score': score,
         'result': result,
         'status': status
     }
+    if rmd_projection is not None:
+        tax_planning['details'] = {'rmd_projection': rmd_projection}
+    return tax_planning
+
+
+def calculate_tax_planning_scores(responses_list):
+    """
+    Calculate Tax Planning Scores for many users at once, projecting every
+    user's RMD schedule in one vectorized pass
+    Returns: list of score dicts, in input order
+    """
+    schedule = calculate_rmd_projections(responses_list)
+    return [
+        calculate_tax_planning_score(responses, summarize_rmd_schedule(schedule, i))
+        for i, responses in enumerate(responses_list)
+    ]
+
+
+def calculate_rmd_projections(responses_list):
+    """
+    Project RMD schedules for many users at once.
+    
+    Savings (treated as pre-tax) grow at the investment style's average
+    rate_map rate with contributions until retirement, then without
+    contributions until RMDs start. Pension income is the other income
+    the RMDs stack on top of.
+    
+    Returns: schedule dict from tax_projection.project_rmd_schedules
+    """
+    retirement_age, growth_rate, at_retirement, pension_income = _pretax_projection_inputs(responses_list)
+    
+    start_age = np.maximum(retirement_age, RMD_START_AGE)
+    at_rmd_start = at_retirement * (1 + growth_rate) ** (start_age - retirement_age)
+    
+    return project_rmd_schedules(at_rmd_start, start_age, growth_rate, pension_income)
+
+
+def calculate_roth_conversion_plan(responses):
+    """
+    Optimal Roth conversion schedule from retirement until RMDs start,
+    using the same pre-tax projection as calculate_rmd_projections
+    Returns: dict from roth_optimizer.optimize_roth_conversions
+    """
+    retirement_age, growth_rate, at_retirement, pension_income = _pretax_projection_inputs([responses])
+    
+    return optimize_roth_conversions(
+        at_retirement[0],
+        int(retirement_age[0]),
+        float(growth_rate[0]),
+        float(pension_income[0]),
+        rmd_start_age=max(int(retirement_age[0]), RMD_START_AGE)
+    )
+
+
+def _pretax_projection_inputs(responses_list):
+    """
+    Per-user arrays for the pre-tax projections
+    Returns: (retirement_age, growth_rate, balance_at_retirement, pension_income)
+    """
+    count = len(responses_list)
+    retirement_age = np.empty(count, dtype=np.int64)
+    growth_rate = np.empty(count)
+    annual_savings = np.empty(count)
+    total_savings = np.empty(count)
+    pension_income = np.empty(count)
+    
+    for i, responses in enumerate(responses_list):
+        has_pension = 'pension' in responses.get('q8_work_benefits', [])
+        rates = RATE_MAP.get(responses.get('q9_investment_style', 'b'), RATE_MAP['b'])
+        retirement_age[i] = responses.get('q4_retirement_age', 65)
+        growth_rate[i] = sum(rates) / len(rates)
+        annual_savings[i] = responses.get('q10_annual_savings', 15000)
+        total_savings[i] = responses.get('q12_total_savings', 500000)
+        pension_income[i] = responses.get('q8b_pension_income', 0) if has_pension else 0
+    
+    current_age = 40
+    accumulation_years = np.maximum(retirement_age - current_age, 0)
+    
+    growth = (1 + growth_rate) ** accumulation_years
+    at_retirement = total_savings * growth + annual_savings * (growth - 1) / growth_rate
+    
+    return retirement_age, growth_rate, at_retirement, pension_income
 
 
 def calculate_risk_of_failure_score(responses, red_flags, pacing_score):
@@ -167,20 +446,11 @@ def calculate_risk_of_failure_score(responses, red_flags, pacing_score):
     timeline_weighted = timeline_score * 0.25
     
     # Red Flags component (25% weight)
-    red_flag_scores = {
-        'basic_rf1': 3,
-        'basic_rf3': 4,
-        'basic_rf4': 4,
-        'basic_rf5': 2,
-        'tax_rf1': 2,
-        'wealth_rf3': 3
-    }
-    
     red_flag_total = 0
     for flag in red_flags:
         flag_id = flag.id.lower()
-        if flag_id in red_flag_scores:
-            red_flag_total += red_flag_scores[flag_id]
+        if flag_id in RISK_FLAG_POINTS:
+            red_flag_total += RISK_FLAG_POINTS[flag_id]
     
     red_flags_weighted = red_flag_total * 0.25
     
@@ -210,6 +480,59 @@ def calculate_risk_of_failure_score(responses, red_flags, pacing_score):
     }
 
 
+def pacing_score_values(below_target):
+    """
+    Vectorized _pacing_result over FV-calculations-below-target counts
+    Returns: (score, status code into STATUSES) arrays
+    """
+    conditions = [below_target == 0, below_target == 1]
+    score = np.select(conditions, [0, 3], 6)
+    status = np.select(conditions, [STATUSES.index('on_track'), STATUSES.index('at_risk')],
+                       STATUSES.index('off_track'))
+    return score, status
+
+
+def tax_planning_score_values(retirement_age, annual_cost, annual_savings, total_savings,
+                              has_pension, has_deferred_compensation, rmd_planning):
+    """
+    Vectorized calculate_tax_planning_score over per-user arrays
+    (rmd_planning holds the timed_q6_rmd_planning answers)
+    Returns: (score, status code into STATUSES) arrays
+    """
+    timeline = retirement_age - 40
+    millionaire = total_savings >= 1000000
+    
+    score = (rmd_planning == 'yes_long_term_plan').astype(np.int64) - (rmd_planning == 'no_unclear')
+    score += np.where(annual_savings < 20000, 1, np.where(annual_savings >= 30000, -1, 0))
+    score -= (timeline > 10) & millionaire
+    score -= (timeline > 20) & (annual_savings >= 30000)
+    score -= (retirement_age > 65) & millionaire
+    score -= millionaire & (annual_cost == 50000)
+    score -= millionaire & has_pension
+    score -= millionaire & has_deferred_compensation
+    score += 2 * ((total_savings < 350000) & (annual_cost >= 150000))
+    score += 2 * ((total_savings < 200000) & (timeline < 5))
+    
+    status = np.where(score <= 0, STATUSES.index('off_track'), STATUSES.index('on_track'))
+    return score, status
+
+
+def risk_of_failure_score_values(retirement_age, red_flag_points, pacing_score):
+    """
+    Vectorized calculate_risk_of_failure_score; red_flag_points is each
+    user's RISK_FLAG_POINTS total
+    Returns: (score, status code into STATUSES) arrays
+    """
+    timeline = retirement_age - 40
+    timeline_score = np.select([timeline <= 5, timeline <= 10, timeline <= 15], [3, 2, 0], -2)
+    
+    total_score = pacing_score * 0.5 + timeline_score * 0.25 + red_flag_points * 0.25
+    status = np.select([total_score < 2, total_score <= 4],
+                       [STATUSES.index('on_track'), STATUSES.index('at_risk')],
+                       STATUSES.index('off_track'))
+    return np.round(total_score, 2), status
+
+
 def future_value(rate, nper, pmt, pv, type=0):
     """
     Calculate Future Value (Excel FV function equivalent)
@@ -220,4 +543,13 @@ def future_value(rate, nper, pmt, pv, type=0):
     fv = -pv * math.pow(1 + rate, nper)
     fv -= pmt * (1 + rate * type) * (math.pow(1 + rate, nper) - 1) / rate
     
-    return fv
\ No newline at end of file
+    return fv
+
+
+def _future_values(rate, nper, pmt, pv):
+    """
+    future_value(rate, nper, -pmt, -pv, 0) over arrays of nper, pmt and pv
+    (positive amounts), so a horizon below zero discounts as it does there
+    """
+    growth = np.power(1 + rate, nper)
+    return pv * growth + pmt * (growth - 1) / rate
\ No newline at end of file
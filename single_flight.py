@@ -0,0 +1,84 @@
+"""
+RetireUS Request Coalescing
+===========================
+Single-flight execution: while one thread computes the result for a key,
+other threads asking for the same key wait for that computation and share
+its result instead of repeating it.
+
+A burst of identical submissions on a threaded worker therefore costs one
+analysis. Waiters give up after a timeout and compute the result
+themselves, so a stuck computation never blocks them indefinitely.
+"""
+
+import os
+import threading
+
+DEFAULT_TIMEOUT = 10.0
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls that share a key.
+
+    Usage:
+        flight = SingleFlight()
+        body = flight.do(key, lambda: expensive(responses))
+    """
+
+    def __init__(self, timeout=DEFAULT_TIMEOUT):
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._calls = {}
+        self._counts = {'leaders': 0, 'coalesced': 0, 'timeouts': 0}
+
+    @classmethod
+    def from_env(cls):
+        """SingleFlight with the wait timeout from RETIREUS_COALESCE_TIMEOUT (seconds)"""
+        return cls(timeout=float(os.environ.get('RETIREUS_COALESCE_TIMEOUT', DEFAULT_TIMEOUT)))
+
+    def do(self, key, compute):
+        """
+        compute() for the first caller with this key; concurrent callers with
+        the same key get that call's result (or exception)
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self._counts['leaders'] += 1
+
+        if leader:
+            try:
+                call.result = compute()
+                return call.result
+            except BaseException as e:
+                call.error = e
+                raise
+            finally:
+                with self._lock:
+                    del self._calls[key]
+                call.done.set()
+
+        if not call.done.wait(self.timeout):
+            with self._lock:
+                self._counts['timeouts'] += 1
+            return compute()
+
+        with self._lock:
+            self._counts['coalesced'] += 1
+        if call.error is not None:
+            raise call.error
+        return call.result
+
+    def stats(self):
+        """Leader, coalesced and timed-out call counts for this process"""
+        with self._lock:
+            return {**self._counts, 'in_flight': len(self._calls)}
@@ -46,15 +46,10 @@ document.addEventListener('DOMContentLoaded', function() {
             }
         });
 
-        // Send to API
+        // Send to API (cacheable GET: same answers, same URL)
         try {
-            const response = await fetch('/api/analyze', {
-                method: 'POST',
-                headers: {
-                    'Content-Type': 'application/json'
-                },
-                body: JSON.stringify(responses)
-            });
+            const rulesetVersion = document.querySelector('meta[name="ruleset-version"]').content;
+            const response = await fetch(`/api/analyze/${rulesetVersion}/${answersToken(responses)}`);
 
             const result = await response.json();
             
@@ -69,6 +64,70 @@ document.addEventListener('DOMContentLoaded', function() {
     });
 });
 
+// Canonical answers token - must match answers_token(format_responses(...)) on
+// the server, so the first request is the canonical URL (anything else still
+// works, via a redirect). Mirrors analysis.format_responses: known fields only,
+// numbers coerced the way Python's int() does, and zero numbers left out (the
+// server drops falsy numbers when it decodes a token).
+const TOKEN_MULTI_SELECT_FIELDS = ['q2_concerns', 'q8_work_benefits', 'q11_account_types'];
+const TOKEN_NUMERIC_FIELDS = [
+    'q4_retirement_age', 'q7_annual_retirement_cost', 'q8b_pension_income',
+    'q10_annual_savings', 'q12_total_savings'
+];
+const TOKEN_SINGLE_SELECT_FIELDS = [
+    'q9_investment_style', 'timed_q1_value_more', 'timed_q2_upset_more',
+    'timed_q3_saving_enough', 'timed_q4_on_pace', 'timed_q5_investments_appropriate',
+    'timed_q6_rmd_planning', 'timed_q7_market_crash', 'timed_q8_financial_plan',
+    'q_current_progress', 'q_tax_concern', 'q_market_volatility_concern'
+];
+
+// Python int(): truncates numbers, parses whole decimal strings, 0 otherwise
+function pythonInt(value) {
+    if (typeof value === 'number') {
+        return Number.isFinite(value) ? Math.trunc(value) : 0;
+    }
+    if (typeof value === 'boolean') {
+        return value ? 1 : 0;
+    }
+    if (typeof value === 'string' && /^\s*[+-]?\d+(_\d+)*\s*$/.test(value)) {
+        return parseInt(value.replace(/_/g, ''), 10);
+    }
+    return 0;
+}
+
+function answersToken(responses) {
+    const canonical = {};
+    TOKEN_MULTI_SELECT_FIELDS.forEach(field => {
+        if (field in responses) {
+            const value = Array.isArray(responses[field]) ? responses[field] : [];
+            canonical[field] = [...new Set(value)].sort();
+        }
+    });
+    TOKEN_NUMERIC_FIELDS.forEach(field => {
+        const value = responses[field] ? pythonInt(responses[field]) : 0;
+        if (value) {
+            canonical[field] = value;
+        }
+    });
+    TOKEN_SINGLE_SELECT_FIELDS.forEach(field => {
+        if (field in responses) {
+            canonical[field] = responses[field];
+        }
+    });
+
+    // JSON with sorted keys and non-ASCII escaped, like json.dumps(sort_keys=True)
+    const sorted = {};
+    Object.keys(canonical).sort().forEach(field => {
+        sorted[field] = canonical[field];
+    });
+    const json = JSON.stringify(sorted)
+        .replace(/[\u0080-\uffff]/g, c => '\\u' + c.charCodeAt(0).toString(16).padStart(4, '0'));
+    return btoa(json)
+        .replace(/\+/g, '-')
+        .replace(/\//g, '_')
+        .replace(/=+$/, '');
+}
+
 function displayResults(result) {
     const resultsContainer = document.getElementById('resultsContainer');
     
@@ -2,6 +2,10 @@
 
 let currentScenario = null;
 let currentScenarioData = null;
+let currentScenarioResult = null;
+
+// Scenario list, fetched once per page load
+let scenarioList = null;
 
 document.addEventListener('DOMContentLoaded', function() {
     loadScenarios();
@@ -11,6 +15,7 @@ async function loadScenarios() {
     try {
         const response = await fetch('/api/scenarios/list');
         const scenarios = await response.json();
+        scenarioList = scenarios;
         
         const grid = document.getElementById('scenariosGrid');
         grid.innerHTML = '';
@@ -41,17 +46,19 @@ async function loadScenarios() {
 
 async function showScenario(scenarioId) {
     try {
-        // Get scenario list for metadata
-        const listResponse = await fetch('/api/scenarios/list');
-        const scenarios = await listResponse.json();
-        const scenarioMeta = scenarios.find(s => s.id === scenarioId);
+        // Metadata, responses and precomputed result in one request
+        const response = await fetch(`/api/scenarios/${scenarioId}/bundle?result=1`);
+        const bundle = await response.json();
+        if (!response.ok) {
+            throw new Error(bundle.error || 'Unknown error');
+        }
         
-        // Get scenario data
-        const dataResponse = await fetch(`/api/scenarios/${scenarioId}`);
-        const scenarioData = await dataResponse.json();
+        const scenarioMeta = (scenarioList && scenarioList.find(s => s.id === scenarioId)) || bundle;
+        const scenarioData = bundle.responses;
         
         currentScenario = scenarioMeta;
         currentScenarioData = scenarioData;
+        currentScenarioResult = bundle.result || null;
         
         // Update modal
         document.getElementById('modalTitle').textContent = scenarioMeta.name;
@@ -79,19 +86,21 @@ function closeModal() {
     document.getElementById('scenarioModal').style.display = 'none';
     currentScenario = null;
     currentScenarioData = null;
+    currentScenarioResult = null;
 }
 
 async function runScenario() {
     if (!currentScenarioData) return;
     
+    // Already delivered with the scenario bundle
+    if (currentScenarioResult) {
+        displayScenarioResults(currentScenarioResult);
+        return;
+    }
+    
     try {
-        const response = await fetch('/api/analyze', {
-            method: 'POST',
-            headers: {
-                'Content-Type': 'application/json'
-            },
-            body: JSON.stringify(currentScenarioData)
-        });
+        // Scenario results are precomputed on the server
+        const response = await fetch(`/api/scenarios/${currentScenario.id}/result`);
 
         const result = await response.json();
         
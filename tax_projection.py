@@ -0,0 +1,91 @@
+"""
+RetireUS RMD & Tax-Bracket Projection
+=====================================
+Estimates yearly Required Minimum Distributions from the Uniform Lifetime
+table and the federal bracket they push each user into.
+
+A full schedule is computed for many users at once: the RMD balance path has
+a closed form (each year keeps 1 - 1/divisor of the balance, then grows), so
+the (users x years) schedule is a cumulative product rather than a loop, and
+divisors and brackets come from binary searches over the sorted tables in
+tax_tables.py.
+"""
+
+from typing import Dict
+
+import numpy as np
+
+from tax_tables import (
+    DEFAULT_FILING_STATUS,
+    STANDARD_DEDUCTION,
+    income_tax,
+    marginal_rate,
+    rmd_divisor,
+)
+
+# SECURE 2.0 RMD age for anyone born in 1960 or later (current age is estimated at 40)
+RMD_START_AGE = 75
+
+SCHEDULE_YEARS = 30
+
+
+def project_rmd_schedules(balances, start_ages, growth_rates, other_income=0.0,
+                          years=SCHEDULE_YEARS, filing_status=DEFAULT_FILING_STATUS) -> Dict:
+    """
+    Project RMDs and their tax cost for many users.
+
+    Args:
+        balances: pre-tax balance of each user when RMDs start
+        start_ages: age of each user's first RMD
+        growth_rates: annual growth of the remaining balance (scalar or per user)
+        other_income: other ordinary income per year, e.g. pension (scalar or per user)
+
+    Returns: dict of (users x years) arrays: ages, rmd, balance, marginal_rate and
+             rmd_tax (federal tax attributable to the RMD on top of other income)
+    """
+    balances = np.atleast_1d(np.asarray(balances, dtype=np.float64))
+    count = len(balances)
+    start_ages = np.broadcast_to(np.asarray(start_ages, dtype=np.int64), (count,))
+    growth_rates = np.broadcast_to(np.asarray(growth_rates, dtype=np.float64), (count,))
+    other_income = np.broadcast_to(np.asarray(other_income, dtype=np.float64), (count,))
+
+    ages = start_ages[:, None] + np.arange(years)[None, :]
+    kept = 1.0 - 1.0 / rmd_divisor(ages)
+
+    # balance[:, t] = balance at the start of year t
+    carry = kept * (1.0 + growth_rates[:, None])
+    balance = balances[:, None] * np.concatenate(
+        (np.ones((count, 1)), np.cumprod(carry[:, :-1], axis=1)), axis=1)
+    rmd = balance * (1.0 - kept)
+
+    deduction = STANDARD_DEDUCTION[filing_status]
+    base_income = np.maximum(other_income[:, None] - deduction, 0.0)
+    taxable = np.maximum(other_income[:, None] + rmd - deduction, 0.0)
+
+    return {
+        'ages': ages,
+        'balance': balance,
+        'rmd': rmd,
+        'marginal_rate': marginal_rate(taxable, filing_status),
+        'rmd_tax': income_tax(taxable, filing_status) - income_tax(base_income, filing_status),
+    }
+
+
+def summarize_rmd_schedule(schedule, index=0) -> Dict:
+    """
+    Dollar figures for one user's RMD schedule
+    Returns: dict with first/peak RMD, totals and the highest marginal bracket reached
+    """
+    rmd = schedule['rmd'][index]
+    peak = int(np.argmax(rmd))
+    return {
+        'start_age': int(schedule['ages'][index, 0]),
+        'starting_balance': round(float(schedule['balance'][index, 0]), 2),
+        'first_rmd': round(float(rmd[0]), 2),
+        'peak_rmd': round(float(rmd[peak]), 2),
+        'peak_rmd_age': int(schedule['ages'][index, peak]),
+        'total_rmds': round(float(rmd.sum()), 2),
+        'total_rmd_tax': round(float(schedule['rmd_tax'][index].sum()), 2),
+        'first_marginal_rate': float(schedule['marginal_rate'][index, 0]),
+        'peak_marginal_rate': float(schedule['marginal_rate'][index].max()),
+    }
@@ -0,0 +1,99 @@
+"""
+RetireUS Tax Tables
+===================
+IRS tables used by the decumulation and tax projections.
+
+Tables are held as sorted read-only numpy arrays built once at import, and
+looked up with a binary search so whole arrays of ages can be resolved at once.
+"""
+
+import numpy as np
+
+# IRS Uniform Lifetime Table (Pub. 590-B, effective 2022): age -> distribution period
+UNIFORM_LIFETIME_TABLE = {
+    72: 27.4, 73: 26.5, 74: 25.5, 75: 24.6, 76: 23.7, 77: 22.9, 78: 22.0, 79: 21.1,
+    80: 20.2, 81: 19.4, 82: 18.5, 83: 17.7, 84: 16.8, 85: 16.0, 86: 15.2, 87: 14.4,
+    88: 13.7, 89: 12.9, 90: 12.2, 91: 11.5, 92: 10.8, 93: 10.1, 94: 9.5, 95: 8.9,
+    96: 8.4, 97: 7.8, 98: 7.3, 99: 6.8, 100: 6.4, 101: 6.0, 102: 5.6, 103: 5.2,
+    104: 4.9, 105: 4.6, 106: 4.3, 107: 4.1, 108: 3.9, 109: 3.7, 110: 3.5, 111: 3.4,
+    112: 3.3, 113: 3.1, 114: 3.0, 115: 2.9, 116: 2.8, 117: 2.7, 118: 2.5, 119: 2.3,
+    120: 2.0,
+}
+
+RMD_AGES = np.array(sorted(UNIFORM_LIFETIME_TABLE), dtype=np.int64)
+RMD_DIVISORS = np.array([UNIFORM_LIFETIME_TABLE[age] for age in RMD_AGES])
+RMD_AGES.flags.writeable = False
+RMD_DIVISORS.flags.writeable = False
+
+
+def rmd_divisor(age):
+    """
+    Uniform Lifetime distribution period for an age (scalar or array).
+    Ages below the table use its first row; ages above use its last row.
+    """
+    index = np.searchsorted(RMD_AGES, age, side='right') - 1
+    return RMD_DIVISORS[np.clip(index, 0, len(RMD_DIVISORS) - 1)]
+
+
+# ==================== FEDERAL INCOME TAX ====================
+
+TAX_YEAR = 2025
+
+# Federal ordinary income brackets: (bracket floor, marginal rate)
+FEDERAL_BRACKETS = {
+    'single': [
+        (0, 0.10), (11925, 0.12), (48475, 0.22), (103350, 0.24),
+        (197300, 0.32), (250525, 0.35), (626350, 0.37),
+    ],
+    'married_joint': [
+        (0, 0.10), (23850, 0.12), (96950, 0.22), (206700, 0.24),
+        (394600, 0.32), (501050, 0.35), (751600, 0.37),
+    ],
+}
+
+STANDARD_DEDUCTION = {
+    'single': 15750,
+    'married_joint': 31500,
+}
+
+DEFAULT_FILING_STATUS = 'married_joint'
+
+
+def _build_bracket_arrays(brackets):
+    """Sorted floors, rates, and the tax owed on income up to each floor"""
+    floors = np.array([floor for floor, _ in brackets], dtype=np.float64)
+    rates = np.array([rate for _, rate in brackets], dtype=np.float64)
+    base = np.concatenate(([0.0], np.cumsum(np.diff(floors) * rates[:-1])))
+    for table in (floors, rates, base):
+        table.flags.writeable = False
+    return floors, rates, base
+
+
+BRACKET_ARRAYS = {
+    status: _build_bracket_arrays(brackets)
+    for status, brackets in FEDERAL_BRACKETS.items()
+}
+
+
+def _bracket_index(taxable_income, filing_status):
+    floors, _, _ = BRACKET_ARRAYS[filing_status]
+    index = np.searchsorted(floors, taxable_income, side='right') - 1
+    return np.clip(index, 0, len(floors) - 1)
+
+
+def marginal_rate(taxable_income, filing_status=DEFAULT_FILING_STATUS):
+    """
+    Marginal federal rate for taxable income (scalar or array)
+    """
+    _, rates, _ = BRACKET_ARRAYS[filing_status]
+    return rates[_bracket_index(taxable_income, filing_status)]
+
+
+def income_tax(taxable_income, filing_status=DEFAULT_FILING_STATUS):
+    """
+    Federal income tax on taxable income (scalar or array)
+    """
+    floors, rates, base = BRACKET_ARRAYS[filing_status]
+    taxable_income = np.maximum(np.asarray(taxable_income, dtype=np.float64), 0.0)
+    index = _bracket_index(taxable_income, filing_status)
+    return base[index] + (taxable_income - floors[index]) * rates[index]
@@ -0,0 +1,350 @@
+"""
+RetireUS Analytics - Regression Tests
+=====================================
+Checks the simulation and projection engines that sit alongside scoring.py.
+Run with: python -m pytest test_analytics.py
+"""
+
+import numpy as np
+
+from analysis import analyze_responses
+from concentration_risk import cholesky_factor, estimate_concentration_risk, rank_wealth_leads, \
+    simulate_returns
+from estate_projection import find_future_estate_flags, project_estate
+from fee_drag import EXPENSE_RATIOS, analyze_fee_drag, analyze_fee_drag_bulk
+from glide_path import GlidePath, glide_path_for_style, project_future_value
+from historical_replay import portfolio_returns, replay_future_values
+from load_control import FidelityLevel
+from roth_optimizer import optimize_roth_conversions
+from scoring import calculate_pacing_score, calculate_pacing_scores, calculate_rmd_projections, \
+    calculate_roth_conversion_plan, calculate_tax_planning_score, calculate_tax_planning_scores, \
+    future_value
+from tax_projection import project_rmd_schedules
+from tax_tables import income_tax, marginal_rate, rmd_divisor
+from reference_population import load_reference_population, percentile_rank, percentile_ranks
+from withdrawal_simulator import STRATEGIES, run_withdrawal_strategies, simulate_return_paths, \
+    simulate_withdrawals, solve_safe_withdrawal_rate
+
+SAMPLE_RESPONSES = [
+    {'q4_retirement_age': 55, 'q9_investment_style': 'a', 'q10_annual_savings': 3000,
+     'q12_total_savings': 10000},
+    {'q4_retirement_age': 68, 'q8_work_benefits': ['pension'], 'q8b_pension_income': 80000,
+     'q9_investment_style': 'b', 'q10_annual_savings': 50000, 'q12_total_savings': 2500000},
+    {'q4_retirement_age': 62, 'q7_annual_retirement_cost': 40000, 'q9_investment_style': 'd',
+     'q10_annual_savings': 18000, 'q12_total_savings': 600000},
+    {'q4_retirement_age': 65, 'q7_annual_retirement_cost': 30000, 'q9_investment_style': 'c',
+     'q10_annual_savings': 40000, 'q12_total_savings': 1500000},
+]
+
+
+def test_historical_replay_matches_year_by_year_loop():
+    """Rolling-window replay equals compounding each window one year at a time"""
+    nper, pmt, pv = 25, 20000, 500000
+    start_years, fv = replay_future_values('b', nper, pmt, pv)
+    series = portfolio_returns('b')
+
+    assert len(fv) == len(series) - nper + 1
+    for start in (0, 10, len(fv) - 1):
+        balance = pv
+        for k in range(nper):
+            balance = balance * (1 + series[start + k]) + pmt
+        assert np.isclose(fv[start], balance)
+
+
+def test_historical_pacing_mode():
+    """Historical mode reports a success rate and maps it to the usual score bands"""
+    responses = {
+        'q4_retirement_age': 65,
+        'q7_annual_retirement_cost': 20000,
+        'q9_investment_style': 'a',
+        'q10_annual_savings': 30000,
+        'q12_total_savings': 800000,
+    }
+    pacing = calculate_pacing_score(responses, mode='historical')
+
+    assert pacing['details']['mode'] == 'historical'
+    assert 0.0 <= pacing['details']['success_rate'] <= 1.0
+    assert pacing['score'] in (0, 3, 6)
+    assert calculate_pacing_score(responses)['details']['fv_target'] == pacing['details']['fv_target']
+
+
+def test_flat_glide_path_matches_future_value():
+    """A flat glide path reproduces the fixed-rate FV formula"""
+    for rate in (0.025, 0.06, 0.09):
+        for nper in (0, 1, 15, 40):
+            expected = future_value(rate, nper, -15000, -500000, 0)
+            assert np.isclose(project_future_value(GlidePath.flat(rate), 500000, 15000, nper), expected)
+
+
+def test_glide_path_projects_batches_with_one_lookup():
+    """Array inputs project the whole batch; de-risking lowers the balance"""
+    glide = glide_path_for_style('a', 0.08)
+    fv = project_future_value(glide, np.array([1e5, 2e5]), np.array([1e4, 0.0]), np.array([30, 10]))
+
+    assert fv.shape == (2,)
+    assert np.all(fv < project_future_value(GlidePath.flat(0.08), np.array([1e5, 2e5]),
+                                            np.array([1e4, 0.0]), np.array([30, 10])))
+
+
+def test_batch_pacing_matches_single_user_scoring():
+    """calculate_pacing_scores agrees with calculate_pacing_score user by user"""
+    for mode in ('fixed', 'glide'):
+        batch = calculate_pacing_scores(SAMPLE_RESPONSES, mode=mode)
+        for responses, scored in zip(SAMPLE_RESPONSES, batch):
+            single = calculate_pacing_score(responses, mode=mode)
+            assert scored['score'] == single['score']
+            assert scored['details'] == single['details']
+
+
+def test_batch_pacing_retirement_age_under_40():
+    """A negative horizon is discounted by the FV formula in both paths, not clamped to zero"""
+    responses = [{'q4_retirement_age': age, 'q9_investment_style': 'a', 'q10_annual_savings': 5000,
+                  'q12_total_savings': 900000} for age in (30, 35, 39)]
+    for user, scored in zip(responses, calculate_pacing_scores(responses)):
+        assert scored == calculate_pacing_score(user)
+        nper = user['q4_retirement_age'] - 40
+        fv_target = future_value(0.025, nper, -5000, -100000, 0) / 0.045
+        below = sum(future_value(rate, nper, -5000, -900000, 0) < fv_target
+                    for rate in (0.075, 0.08, 0.085, 0.09))
+        assert scored['details'] == {'calculations_below_target': below,
+                                     'fv_target': round(fv_target, 2)}
+
+
+def test_withdrawal_strategies_share_paths():
+    """Constant-dollar results match a per-path loop over the shared return paths"""
+    returns = simulate_return_paths('a', 30, n_paths=200, seed=7)
+    assert simulate_return_paths('a', 30, n_paths=200, seed=7) is returns
+
+    outcomes = run_withdrawal_strategies(1_000_000, returns, 65, initial_rate=0.06)
+    constant = STRATEGIES.index('constant_dollar')
+
+    for path in (0, 50, 199):
+        balance, funded = 1_000_000.0, 0
+        for year in range(30):
+            if balance < 60_000:
+                break
+            balance = (balance - 60_000) * (1 + returns[path, year])
+            funded += 1
+        assert outcomes['years_funded'][constant, path] == funded
+        assert outcomes['depleted'][constant, path] == (funded < 30)
+
+
+def test_simulate_withdrawals_reports_every_strategy():
+    """Each strategy gets longevity and ending-balance distributions"""
+    result = simulate_withdrawals(SAMPLE_RESPONSES[2], n_paths=500)
+
+    assert set(result['strategies']) == set(STRATEGIES)
+    for summary in result['strategies'].values():
+        assert 0.0 <= summary['depletion_rate'] <= 1.0
+        assert summary['longevity_years']['p10'] <= summary['longevity_years']['p90'] <= result['years']
+        assert summary['ending_balance']['p10'] <= summary['ending_balance']['p90']
+
+
+def test_safe_withdrawal_rate_hits_target_on_shared_paths():
+    """The solved rate succeeds on the target share of paths; a higher rate does not"""
+    rate = solve_safe_withdrawal_rate('b', 30, 0.9)
+    assert solve_safe_withdrawal_rate('b', 30, 0.9) == rate
+
+    returns = simulate_return_paths('b', 30)
+    constant = STRATEGIES.index('constant_dollar')
+    at_rate = run_withdrawal_strategies(1.0, returns, 65, rate)
+    above_rate = run_withdrawal_strategies(1.0, returns, 65, rate * 1.01)
+
+    assert 1 - at_rate['depleted'][constant].mean() >= 0.9
+    assert 1 - above_rate['depleted'][constant].mean() < 0.9
+
+
+def test_pacing_target_uses_solved_withdrawal_rate():
+    """swr_target swaps the 4.5% divisor for the solved rate"""
+    responses = SAMPLE_RESPONSES[3]
+    default = calculate_pacing_score(responses)
+    solved = calculate_pacing_score(responses, swr_target=0.9)
+    rate = solved['details']['withdrawal_rate']
+
+    assert 'withdrawal_rate' not in default['details']
+    assert np.isclose(solved['details']['fv_target'] * rate, default['details']['fv_target'] * 0.045,
+                      rtol=1e-3)
+    assert calculate_pacing_scores([responses], swr_target=0.9)[0] == solved
+
+
+def test_rmd_schedule_matches_year_by_year_loop():
+    """Vectorized RMD schedule equals withdrawing balance / divisor one year at a time"""
+    schedule = project_rmd_schedules([1_000_000, 250_000], [75, 80], [0.05, 0.03],
+                                     other_income=[40_000, 0])
+
+    for user, (balance, age, growth, other) in enumerate([(1_000_000, 75, 0.05, 40_000),
+                                                           (250_000, 80, 0.03, 0)]):
+        for year in range(30):
+            rmd = balance / rmd_divisor(age + year)
+            taxable = other + rmd - 31500
+            assert np.isclose(schedule['rmd'][user, year], rmd)
+            assert schedule['marginal_rate'][user, year] == marginal_rate(taxable)
+            assert np.isclose(schedule['rmd_tax'][user, year],
+                              income_tax(taxable) - income_tax(max(other - 31500, 0)))
+            balance = (balance - rmd) * (1 + growth)
+
+
+def test_tax_planning_score_reports_rmd_dollars():
+    """Batch tax planning results carry each user's RMD projection; the single scorer does not project"""
+    tax_planning = calculate_tax_planning_scores(SAMPLE_RESPONSES)[1]
+    projection = tax_planning['details']['rmd_projection']
+    assert set(calculate_tax_planning_score(SAMPLE_RESPONSES[1])) == {'score', 'result', 'status'}
+    assert calculate_tax_planning_score(SAMPLE_RESPONSES[1])['score'] == tax_planning['score']
+
+    assert projection['start_age'] == 75
+    assert projection['first_rmd'] > 0
+    assert projection['total_rmd_tax'] > 0
+    assert calculate_rmd_projections(SAMPLE_RESPONSES)['rmd'].shape == (len(SAMPLE_RESPONSES), 30)
+
+
+def test_roth_conversions_never_raise_lifetime_tax():
+    """The optimized plan costs no more than converting nothing"""
+    plan = optimize_roth_conversions(1_500_000, 62, 0.06, other_income=20_000)
+
+    assert plan['window_years'] == 13
+    assert plan['conversions']
+    assert plan['lifetime_tax_pv'] <= plan['lifetime_tax_pv_without_conversions']
+    assert all(62 <= c['age'] < 75 and c['amount'] > 0 for c in plan['conversions'])
+
+
+def test_roth_conversion_window_closed_after_rmd_age():
+    """Retiring after RMDs start leaves nothing to convert"""
+    plan = calculate_roth_conversion_plan(SAMPLE_RESPONSES[1] | {'q4_retirement_age': 78})
+
+    assert plan['window_years'] == 0
+    assert plan['conversions'] == []
+    assert plan['tax_savings_pv'] == 0
+
+
+def test_fee_drag_attached_to_basic_rf6():
+    """basic_rf6 carries the dollar cost of each expense ratio, rising with the fee"""
+    responses = {'q4_retirement_age': 65, 'q9_investment_style': 'b',
+                 'q11_account_types': ['old_employer_plan'], 'q12_total_savings': 400000}
+    flags = {rf['id']: rf for rf in analyze_responses(responses, FidelityLevel.CLOSED_FORM)['red_flags']}
+    costs = [level['cost'] for level in flags['basic_rf6']['details']['fee_drag']['costs']]
+
+    assert len(costs) == len(EXPENSE_RATIOS)
+    assert all(earlier < later for earlier, later in zip(costs, costs[1:]))
+    assert np.isclose(costs[-1], 400000 * (1.0625 ** 25 - 1.0425 ** 25), rtol=1e-6)
+
+
+def test_fee_drag_bulk_matches_single_user():
+    """Bulk mode prices only flagged users, matching the per-user analyzer"""
+    archive = [
+        {'q11_account_types': ['old_employer_plan'], 'q12_total_savings': 250000, 'q4_retirement_age': 60},
+        {'q11_account_types': ['roth_accounts'], 'q12_total_savings': 900000},
+        {'q11_account_types': ['old_employer_plan'], 'q12_total_savings': 50000, 'q9_investment_style': 'a'},
+    ]
+    bulk = analyze_fee_drag_bulk(archive)
+
+    assert list(bulk['indices']) == [0, 2]
+    for row, index in zip(bulk['costs'], bulk['indices']):
+        single = [level['cost'] for level in analyze_fee_drag(archive[index])['costs']]
+        assert np.allclose(row, single, atol=0.01)
+
+
+def test_concentration_risk_simulation_uses_cached_correlation():
+    """Simulated stock/portfolio returns carry the configured correlation"""
+    assert cholesky_factor(0.5) is cholesky_factor(0.5)
+
+    stock, portfolio = simulate_returns('b')
+    assert abs(np.corrcoef(np.log1p(stock), np.log1p(portfolio))[0, 1] - 0.5) < 0.02
+
+
+def test_concentration_risk_ranks_wealth_leads():
+    """Concentration adds risk, and leads rank by their dollar exposure"""
+    leads = [
+        {'q8_work_benefits': ['stock_options'], 'q9_investment_style': 'b', 'q12_total_savings': 500000},
+        {'q8_work_benefits': ['pension'], 'q12_total_savings': 9000000},
+        {'q8_work_benefits': ['stock_options'], 'q9_investment_style': 'd', 'q12_total_savings': 3000000},
+    ]
+    risk = estimate_concentration_risk(leads[0])
+    ranked = rank_wealth_leads(leads)
+
+    assert risk['cvar'] >= risk['var'] > risk['diversified_var'] > 0
+    assert list(ranked['indices']) == [2, 0]
+    assert np.isclose(ranked['excess_cvar'][1], risk['excess_cvar'], atol=0.01)
+
+
+def test_estate_projection_matches_year_by_year_loop():
+    """Glide-path accumulation then flat-rate drawdown, compounded one year at a time"""
+    responses = {'q4_retirement_age': 65, 'q7_annual_retirement_cost': 60000, 'q9_investment_style': 'c',
+                 'q10_annual_savings': 10000, 'q12_total_savings': 300000}
+    glide = glide_path_for_style('c', 0.0475)
+
+    balance = 300000.0
+    for years_left in range(25, 0, -1):
+        balance = balance * (1 + glide.rate_for(years_left)) + 10000
+    for _ in range(20):
+        balance = balance * (1 + glide.rate_for(1)) - 60000
+
+    assert np.isclose(project_estate(responses)['projected_estate'], balance, atol=0.01)
+
+
+def test_future_estate_flags_find_later_crossers():
+    """Users under $2M today who grow past it are flagged; those over it today are not"""
+    archive = [
+        {'q12_total_savings': 1200000, 'q10_annual_savings': 25000, 'q7_annual_retirement_cost': 50000},
+        {'q12_total_savings': 2500000},
+        {'q12_total_savings': 20000, 'q10_annual_savings': 1000},
+    ]
+    result = find_future_estate_flags(archive)
+
+    assert list(result['future_flag_indices']) == [0]
+    assert result['projected_estates'][2] == 0
+
+
+def test_percentile_ranks_use_sorted_reference_arrays():
+    """Binary-search ranks agree with counting the population directly"""
+    population = load_reference_population()
+    savings = population[('65_to_67', 'total_savings')]
+
+    assert np.all(np.diff(savings) >= 0)
+    assert load_reference_population() is population
+
+    ranks = percentile_ranks(65, {'total_savings': 500000, 'annual_savings': 15000, 'risk_score': 1.0})
+    assert ranks['bucket'] == '65_to_67'
+    assert ranks['source'] == 'synthetic'
+    assert ranks['lower_is_better'] == ['risk_score']
+    assert ranks['ranks']['total_savings'] == round(100.0 * np.mean(savings <= 500000), 1)
+    assert percentile_rank(savings, -1) == 0.0
+    assert percentile_rank(savings, savings[-1]) == 100.0
+
+
+def test_artifacts_round_trip_and_reject_stale_sets(tmp_path):
+    """Artifacts load as read-only memory maps, swap atomically and are rejected when stale or altered"""
+    import json
+    import os
+    from artifacts import MANIFEST_NAME, check_artifacts, current_set, write_artifacts
+    from historical_replay import read_historical_returns
+
+    directory = str(tmp_path / 'artifacts')
+    years, returns = read_historical_returns()
+    write_artifacts({'historical_returns/years': years, 'historical_returns/returns': returns}, directory)
+    first_set = current_set(directory)
+
+    entries, _ = check_artifacts(directory)
+    loaded = np.load(os.path.join(first_set, entries['historical_returns/returns']['file']), mmap_mode='r')
+    assert np.array_equal(loaded, returns) and not loaded.flags.writeable
+
+    with open(os.path.join(first_set, entries['historical_returns/years']['file']), 'r+b') as f:
+        f.seek(-1, 2)
+        f.write(b'\xff')
+    assert check_artifacts(directory)[0] is None
+
+    # Each build flips 'current' to a new set, keeping only the one it replaced
+    write_artifacts({'historical_returns/years': years}, directory)
+    second_set = current_set(directory)
+    assert second_set != first_set and os.path.isdir(first_set)
+    assert set(check_artifacts(directory)[0]) == {'historical_returns/years'}
+    write_artifacts({'historical_returns/years': years}, directory)
+    assert not os.path.exists(first_set) and os.path.isdir(second_set)
+
+    manifest_path = os.path.join(current_set(directory), MANIFEST_NAME)
+    with open(manifest_path) as f:
+        manifest = json.load(f)
+    manifest['inputs_version'] = '0' * 16
+    with open(manifest_path, 'w') as f:
+        json.dump(manifest, f)
+    assert check_artifacts(directory)[0] is None
+    assert check_artifacts(str(tmp_path / 'missing'))[0] is None
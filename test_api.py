@@ -0,0 +1,542 @@
+"""
+RetireUS Web API - Regression Tests
+===================================
+Exercises the Flask endpoints and the request-handling helpers around them.
+Run with: python -m pytest test_api.py
+"""
+
+import os
+import time
+
+from app import app
+from load_control import FidelityLevel, LoadController
+
+YOUNG_PROFESSIONAL = {
+    'q2_concerns': ['running_out_of_money', 'not_being_on_pace'],
+    'q4_retirement_age': 55,
+    'q8_work_benefits': [],
+    'q9_investment_style': 'a',
+    'q10_annual_savings': 3000,
+    'q11_account_types': [],
+    'q12_total_savings': 10000,
+    'timed_q4_on_pace': 'not_sure',
+    'timed_q5_investments_appropriate': 'should_reevaluate',
+    'timed_q7_market_crash': 'concerned_stressed',
+    'timed_q8_financial_plan': 'dont_have_one',
+}
+
+
+def test_analyze_reports_fidelity():
+    """An idle worker answers at full fidelity with every analytic filled in"""
+    result = app.test_client().post('/api/analyze', json=YOUNG_PROFESSIONAL).get_json()
+
+    assert result['fidelity'] == 'full'
+    assert result['summary']['total_flags'] == 7
+    assert result['decumulation'] is not None
+    assert result['scores']['historical_pacing'] is not None
+
+
+def test_load_controller_degrades_and_recovers():
+    """Queue depth over budget lowers fidelity; it steps back up once load drops"""
+    controller = LoadController(latency_budget=10.0, queue_budget=2)
+    levels = []
+
+    with controller.track(), controller.track(), controller.track(), controller.track():
+        with controller.track() as level:
+            levels.append(level)
+        with controller.track(), controller.track():
+            with controller.track() as level:
+                levels.append(level)
+
+    assert levels == [FidelityLevel.REDUCED, FidelityLevel.CLOSED_FORM]
+
+    recovered = []
+    for _ in range(3):
+        with controller.track() as level:
+            recovered.append(level)
+    assert recovered == [FidelityLevel.REDUCED, FidelityLevel.FULL, FidelityLevel.FULL]
+
+    # A bulk request adds its per-item time, not its total, to the latency average
+    bulk = LoadController(latency_budget=0.01, smoothing=1.0)
+    with bulk.track(items=1000):
+        time.sleep(0.05)
+    assert bulk.recent_latency() < 0.01
+
+
+def test_closed_form_fidelity_skips_simulations():
+    """At closed_form only the closed-form scores and table lookups run"""
+    from analysis import analyze_responses
+
+    result = analyze_responses(YOUNG_PROFESSIONAL, FidelityLevel.CLOSED_FORM)
+
+    assert result['fidelity'] == 'closed_form'
+    assert result['decumulation'] is None
+    assert result['roth_conversion'] is None
+    assert result['scores']['pacing']['status'] == 'off_track'
+
+
+def test_batch_matches_single_and_isolates_failures():
+    """Batch results come back in input order, equal to single analyses at the same fidelity, and bad items fail alone"""
+    from analysis import analyze_responses
+
+    client = app.test_client()
+    high_earner = client.get('/api/scenarios/high_earner').get_json()
+    batch = [YOUNG_PROFESSIONAL, 'not a response', high_earner]
+
+    body = client.post('/api/analyze/batch', json=batch).get_json()
+    assert body['fidelity'] == 'closed_form'
+    assert body['count'] == 3
+    assert body['errors'] == 1
+    assert 'error' in body['results'][1]
+    for position in (0, 2):
+        assert body['results'][position] == analyze_responses(batch[position], FidelityLevel.CLOSED_FORM)
+
+    full = client.post('/api/analyze/batch?fidelity=full', json=batch).get_json()
+    assert full['fidelity'] == 'full'
+    for position in (0, 2):
+        assert full['results'][position] == client.post('/api/analyze', json=batch[position]).get_json()
+    assert client.post('/api/analyze/batch?fidelity=best', json=batch).status_code == 400
+
+
+def test_batch_rejects_non_array():
+    response = app.test_client().post('/api/analyze/batch', json=YOUNG_PROFESSIONAL)
+    assert response.status_code == 400
+
+
+def test_stream_analyzes_ndjson_and_gzip():
+    """Each non-blank NDJSON line gets one result line, in order, plain or gzipped"""
+    import gzip
+    import json
+
+    body = (json.dumps(YOUNG_PROFESSIONAL) + '\n\n{not json}\n' + json.dumps(YOUNG_PROFESSIONAL)).encode()
+    client = app.test_client()
+
+    for data, headers in ((body, {}), (gzip.compress(body), {'Content-Encoding': 'gzip'})):
+        response = client.post('/api/analyze/stream', data=data, headers=headers,
+                               content_type='application/x-ndjson')
+        lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+
+        assert response.mimetype == 'application/x-ndjson'
+        assert len(lines) == 3
+        assert lines[0]['summary']['total_flags'] == 7
+        assert lines[1]['line'] == 3 and 'error' in lines[1]
+        assert lines[2] == lines[0]
+        assert lines[0]['fidelity'] == 'closed_form'
+
+    full = client.post('/api/analyze/stream?fidelity=full', data=body).get_data(as_text=True).splitlines()
+    assert json.loads(full[0])['decumulation'] is not None
+
+
+def test_stream_caps_decompressed_bytes():
+    """Gzip bodies are inflated a block at a time and rejected past the byte cap"""
+    import io
+    import zlib
+
+    from ndjson_stream import StreamTooLarge, iter_blocks
+
+    compressor = zlib.compressobj(9, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    bomb = io.BytesIO(compressor.compress(b'\0' * (4 << 20)) + compressor.flush())
+    blocks = []
+    try:
+        for block in iter_blocks(bomb, compressed=True, block_size=4096, max_bytes=1 << 20):
+            blocks.append(len(block))
+    except StreamTooLarge:
+        pass
+    else:
+        raise AssertionError('cap not enforced')
+    assert max(blocks) <= 4096
+    assert sum(blocks) <= 1 << 20
+
+
+def test_packed_round_trip_matches_json_pipeline():
+    """Wire-format records round-trip, and packed results match /api/analyze at closed_form"""
+    from analysis import analyze_batch, format_responses
+    from build_reference_population import sample_population
+    from wire_format import decode_records, decode_responses, decode_results, encode_responses, result_dicts
+
+    population = sample_population(200, seed=5) + [YOUNG_PROFESSIONAL]
+    payload = encode_responses(population)
+
+    records = decode_records(payload)
+    assert decode_responses(records) == [format_responses(responses) for responses in population]
+    assert encode_responses(decode_responses(records)) == payload
+
+    response = app.test_client().post('/api/analyze/packed', data=payload)
+    packed = result_dicts(decode_results(response.data))
+    expected = analyze_batch(population, FidelityLevel.CLOSED_FORM)
+
+    for got, want in zip(packed, expected):
+        assert got['red_flags'] == [flag['id'] for flag in want['red_flags']]
+        assert got['recommended_plan'] == want['recommended_plan']
+        for score in ('pacing', 'tax_planning', 'risk_of_failure'):
+            assert got['scores'][score]['score'] == want['scores'][score]['score']
+            assert got['scores'][score]['status'] == want['scores'][score]['status']
+        assert got['scores']['pacing']['fv_target'] == want['scores']['pacing']['details']['fv_target']
+
+
+def test_packed_rejects_malformed_payload():
+    response = app.test_client().post('/api/analyze/packed', data=b'RTUQ\x01\x00')
+    assert response.status_code == 400
+
+
+def test_fast_path_matches_flask_endpoint():
+    """The raw WSGI analyze route returns the same bytes as the Flask route and falls through otherwise"""
+    from werkzeug.test import Client, EnvironBuilder, run_wsgi_app
+
+    from fast_analyze import application
+
+    flask_client = app.test_client()
+    fast_client = Client(application)
+    for scenario in ('young_professional', 'high_earner', 'optimal'):
+        responses = flask_client.get(f'/api/scenarios/{scenario}').get_json()
+        expected = flask_client.post('/api/analyze', json=responses)
+        got = fast_client.post('/api/analyze', json=responses)
+
+        assert got.status_code == expected.status_code == 200
+        assert got.headers['Content-Type'] == expected.headers['Content-Type']
+        assert got.get_data() == expected.get_data()
+
+    # Requests the fast path does not answer itself get Flask's error responses
+    bad_requests = (
+        {'data': '{not json', 'content_type': 'application/json'},
+        {'data': '{}', 'content_type': 'text/plain'},
+        {'data': '{}'},
+        {'data': '{}', 'content_type': 'application/json', 'headers': {'Transfer-Encoding': 'chunked'}},
+    )
+    for request in bad_requests:
+        expected = flask_client.post('/api/analyze', **request)
+        got = fast_client.post('/api/analyze', **request)
+        assert got.status_code == expected.status_code == 400
+        assert got.get_data() == expected.get_data()
+
+    unsized = []
+    for wsgi_app in (app, application):
+        environ = EnvironBuilder(method='POST', path='/api/analyze', data='{}',
+                                 content_type='application/json').get_environ()
+        del environ['CONTENT_LENGTH']
+        body, status, _ = run_wsgi_app(wsgi_app, environ)
+        unsized.append((status, b''.join(body)))
+    assert unsized[0] == unsized[1]
+
+    assert fast_client.get('/api/scenarios/optimal').get_json()['q4_retirement_age'] == 65
+
+
+def test_shared_result_cache_across_instances(tmp_path):
+    """Two cache handles on one file (as two workers would be) share entries, LRU eviction and counters"""
+    from result_cache import SharedResultCache, canonical_key
+
+    path = str(tmp_path / 'results.cache')
+    worker_a = SharedResultCache(path, slots=2, slot_bytes=64)
+    worker_b = SharedResultCache(path, slots=2, slot_bytes=64)
+
+    first = canonical_key({'q2_concerns': ['not_being_on_pace', 'running_out_of_money'], 'q4_retirement_age': 55})
+    reordered = canonical_key({'q4_retirement_age': 55, 'q2_concerns': ['running_out_of_money', 'not_being_on_pace']})
+    assert first == reordered
+
+    second, third = canonical_key({'q4_retirement_age': 60}), canonical_key({'q4_retirement_age': 70})
+    assert worker_a.get(first) is None
+    worker_a.put(first, b'one')
+    worker_a.put(second, b'two')
+    assert worker_b.get(first) == b'one'
+
+    worker_b.put(third, b'three')  # evicts second, the least recently used
+    assert worker_a.get(second) is None
+    assert worker_a.get(third) == b'three'
+    assert not worker_a.put(first, b'x' * 65)
+
+    stats = worker_b.stats()
+    assert (stats['hits'], stats['misses'], stats['evictions'], stats['entries']) == (2, 2, 1, 2)
+
+
+def test_claims_coalesce_misses_across_processes(tmp_path):
+    """A worker missing on a key another worker is computing waits for its result; dead claims are taken over"""
+    import multiprocessing
+    from result_cache import SharedResultCache, canonical_key
+
+    path = str(tmp_path / 'results.cache')
+    key = canonical_key({'q4_retirement_age': 61})
+    cache = SharedResultCache(path, slots=4, slot_bytes=64, claim_timeout=5.0)
+    fork = multiprocessing.get_context('fork')
+    claimed, release = fork.Event(), fork.Event()
+
+    def leader():
+        worker = SharedResultCache(path, slots=4, slot_bytes=64, claim_timeout=5.0)
+        assert worker.claim(key)
+        claimed.set()
+        release.wait(5.0)
+        worker.put(key, b'computed once')
+        worker.release(key)
+
+    process = fork.Process(target=leader)
+    process.start()
+    assert claimed.wait(5.0)
+    assert not cache.claim(key)
+    release.set()
+    assert cache.wait(key) == b'computed once'
+    process.join()
+    assert cache.stats()['coalesced'] == 1
+
+    # A leader that dies holding its claim does not hold up the other workers
+    orphan = canonical_key({'q4_retirement_age': 62})
+    process = fork.Process(target=lambda: SharedResultCache(path, slots=4, slot_bytes=64).claim(orphan))
+    process.start()
+    process.join()
+    assert cache.wait(orphan) is None
+    assert cache.claim(orphan)
+    cache.release(orphan)
+    assert cache.stats()['claims'] == 0
+
+
+def test_analyze_serves_repeat_submissions_from_cache():
+    """Repeat submissions are cache hits, in the test run's own cache file (see conftest.py)"""
+    from result_cache import result_cache
+
+    assert result_cache.path == os.environ['RETIREUS_CACHE_PATH']
+    client = app.test_client()
+    before = client.get('/api/cache/stats').get_json()
+    assert before['enabled']
+
+    first = client.post('/api/analyze', json=YOUNG_PROFESSIONAL).get_data()
+    second = client.post('/api/analyze', json=YOUNG_PROFESSIONAL).get_data()
+    after = client.get('/api/cache/stats').get_json()
+
+    assert first == second
+    assert after['hits'] > before['hits']
+
+
+def test_single_flight_coalesces_concurrent_calls():
+    """Concurrent calls with one key share a single computation; a stuck leader falls back after the timeout"""
+    import threading
+    import time
+
+    from single_flight import SingleFlight
+
+    flight = SingleFlight(timeout=5.0)
+    calls = []
+    release = threading.Event()
+
+    def compute():
+        calls.append(1)
+        release.wait(2.0)
+        return b'result'
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(flight.do('key', compute))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    while flight.stats()['in_flight'] == 0:
+        time.sleep(0.001)
+    time.sleep(0.1)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert results == [b'result'] * 8
+    assert len(calls) == 1
+    assert flight.stats()['coalesced'] == 7
+
+    impatient = SingleFlight(timeout=0.01)
+    blocker = threading.Event()
+    leader = threading.Thread(target=lambda: impatient.do('key', lambda: blocker.wait(2.0)))
+    leader.start()
+    while impatient.stats()['in_flight'] == 0:
+        time.sleep(0.001)
+    assert impatient.do('key', lambda: 'fallback') == 'fallback'
+    blocker.set()
+    leader.join()
+    assert impatient.stats()['timeouts'] == 1
+
+
+def test_get_analyze_is_cacheable():
+    """GET by answers token: canonical URL, strong ETag, 304 on revalidation, same body as POST"""
+    from analysis import format_responses
+    from result_cache import RULESET_VERSION, answers_token
+
+    client = app.test_client()
+    token = answers_token(format_responses(YOUNG_PROFESSIONAL))
+    url = f'/api/analyze/{RULESET_VERSION}/{token}'
+
+    response = client.get(url)
+    assert response.status_code == 200
+    assert response.headers['Cache-Control'] == 'public, max-age=31536000, immutable'
+    assert response.get_data() == client.post('/api/analyze', json=YOUNG_PROFESSIONAL).get_data()
+
+    etag = response.headers['ETag']
+    revalidated = client.get(url, headers={'If-None-Match': etag})
+    assert revalidated.status_code == 304
+    assert revalidated.headers['ETag'] == etag
+
+    stale = client.get(f'/api/analyze/0000000000000000/{token}')
+    assert stale.status_code == 308
+    assert stale.headers['Location'].endswith(url)
+
+    import base64
+    import json
+    reordered = dict(reversed(list(YOUNG_PROFESSIONAL.items())))
+    loose = base64.urlsafe_b64encode(json.dumps(reordered).encode()).decode()
+    assert client.get(f'/api/analyze/{RULESET_VERSION}/{loose}').headers['Location'].endswith(url)
+
+    assert client.get(f'/api/analyze/{RULESET_VERSION}/not-base64!').status_code == 400
+
+
+def test_client_answers_token_is_canonical_for_form_defaults():
+    """static/js/app.js builds the canonical token for the quiz defaults: 200, no redirect"""
+    import json
+    import os
+    import shutil
+    import subprocess
+    from html.parser import HTMLParser
+    import pytest
+    from result_cache import RULESET_VERSION
+
+    node = shutil.which('node')
+    if node is None:
+        pytest.skip('node is not installed')
+
+    class FormDefaults(HTMLParser):
+        def __init__(self):
+            super().__init__()
+            self.responses = {'q2_concerns': [], 'q8_work_benefits': [], 'q11_account_types': []}
+
+        def handle_starttag(self, tag, attrs):
+            attrs = dict(attrs)
+            if tag != 'input' or 'name' not in attrs:
+                return
+            if attrs.get('type') == 'checkbox':
+                if 'checked' in attrs:
+                    self.responses[attrs['name']].append(attrs['value'])
+            elif attrs.get('type') != 'radio' or 'checked' in attrs:
+                self.responses[attrs['name']] = attrs.get('value', '')
+
+    client = app.test_client()
+    form = FormDefaults()
+    form.feed(client.get('/').get_data(as_text=True))
+    assert form.responses['q8b_pension_income'] == '0'
+
+    script = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static', 'js', 'app.js')
+    runner = ("globalThis.document = {addEventListener() {}};"
+              "require('vm').runInThisContext(require('fs').readFileSync(process.argv[1], 'utf8'));"
+              "process.stdout.write(answersToken(JSON.parse(process.argv[2])));")
+    token = subprocess.run([node, '-e', runner, script, json.dumps(form.responses)],
+                           capture_output=True, text=True, check=True).stdout
+
+    response = client.get(f'/api/analyze/{RULESET_VERSION}/{token}')
+    assert response.status_code == 200
+    assert response.get_data() == client.post('/api/analyze', json=form.responses).get_data()
+
+
+def test_scenarios_served_from_catalog():
+    """Scenario endpoints serve the shared catalog's pre-encoded bytes with ETag revalidation"""
+    from scenario_catalog import scenario_catalog
+
+    client = app.test_client()
+    listing = client.get('/api/scenarios/list')
+    assert [scenario['id'] for scenario in listing.get_json()] == scenario_catalog.ids()
+    assert client.get('/api/scenarios/list', headers={'If-None-Match': listing.headers['ETag']}).status_code == 304
+
+    scenario = client.get('/api/scenarios/high_earner')
+    assert scenario.get_json() == scenario_catalog.responses('high_earner')
+    assert client.get('/api/scenarios/high_earner',
+                      headers={'If-None-Match': scenario.headers['ETag']}).status_code == 304
+    assert client.get('/api/scenarios/missing').status_code == 404
+
+
+def test_scenario_results_warmed_on_first_request(monkeypatch):
+    """Without create_app() the first result request warms the catalog; results match a fresh POST"""
+    from scenario_catalog import scenario_catalog
+
+    monkeypatch.setattr(scenario_catalog, 'results', {})
+    monkeypatch.setattr(scenario_catalog, 'result_bundles', {})
+    monkeypatch.setattr(scenario_catalog, 'results_version', None)
+
+    client = app.test_client()
+    client.get('/api/scenarios/conservative/bundle')
+    assert scenario_catalog.results_version is None
+    client.get(f'/api/scenarios/{scenario_catalog.ids()[0]}/result')
+    assert set(scenario_catalog.results) == set(scenario_catalog.ids())
+    for scenario_id in scenario_catalog.ids():
+        response = client.get(f'/api/scenarios/{scenario_id}/result')
+        posted = client.post('/api/analyze', json=scenario_catalog.responses(scenario_id))
+        assert response.get_data() == posted.get_data()
+    etag = response.headers['ETag']
+    assert client.get(f'/api/scenarios/{scenario_id}/result', headers={'If-None-Match': etag}).status_code == 304
+    assert client.get('/api/scenarios/missing/result').status_code == 404
+
+
+def test_scenario_bundle_combines_metadata_responses_and_result():
+    """One bundle request carries what the scenarios page used to fetch in three"""
+    from scenario_catalog import scenario_catalog
+
+    client = app.test_client()
+    bundle = client.get('/api/scenarios/conservative/bundle?result=1').get_json()
+    listed = next(s for s in client.get('/api/scenarios/list').get_json() if s['id'] == 'conservative')
+    assert {key: bundle[key] for key in listed} == listed
+    assert bundle['responses'] == scenario_catalog.responses('conservative')
+    assert bundle['result'] == client.get('/api/scenarios/conservative/result').get_json()
+
+    assert 'result' not in client.get('/api/scenarios/conservative/bundle').get_json()
+    assert client.get('/api/scenarios/missing/bundle').status_code == 404
+
+
+def test_validate_scenarios_reports_pass_fail():
+    """Validation reports every catalog scenario; a wrong expectation fails"""
+    from scenario_catalog import scenario_catalog
+    from scenario_validation import validate_scenarios
+
+    client = app.test_client()
+    report = client.get('/api/scenarios/validate').get_json()
+    assert report['total'] == len(scenario_catalog.ids())
+    assert [s['id'] for s in report['scenarios']] == scenario_catalog.ids()
+    assert report['passed'] + report['failed'] == report['total']
+
+    optimal = dict(scenario_catalog.by_id['optimal'])
+    wrong = dict(optimal, id='wrong', expected_tiers=['Wealth Mastery'])
+    posted = client.post('/api/scenarios/validate', json=[optimal, wrong]).get_json()
+    assert [s['passed'] for s in posted['scenarios']] == [True, False]
+    assert report['all_passed']
+
+    from app import MAX_VALIDATE_SCENARIOS
+    oversized = client.post('/api/scenarios/validate', json=[optimal] * (MAX_VALIDATE_SCENARIOS + 1))
+    assert oversized.status_code == 413
+
+    pooled = validate_scenarios([optimal, wrong] * 3, workers=2, chunk_size=2)
+    assert pooled['timings']['chunks'] == 3
+    assert [s['passed'] for s in pooled['scenarios']] == [True, False] * 3
+
+
+def test_fingerprinted_assets(tmp_path, monkeypatch):
+    """Built assets are minified and hashed, pages link them, and they are served immutable"""
+    import shutil
+    import app as app_module
+    from build_assets import build, minify_js
+
+    source = "const re = /\\/+$/; // trailing slashes\nconst s = `a  ${ {b: 1}.b }  c`;\n"
+    assert minify_js(source) == "const re = /\\/+$/;\nconst s = `a  ${ {b: 1}.b }  c`;\n"
+
+    static = tmp_path / 'static'
+    shutil.copytree(app.static_folder, static, ignore=shutil.ignore_patterns('dist'))
+    manifest = build(str(static), str(static / 'dist'))
+    monkeypatch.setattr(app, 'static_folder', str(static))
+    monkeypatch.setattr(app_module, 'asset_manifest', manifest)
+    monkeypatch.setattr(app_module, 'rendered_pages', {})
+
+    client = app.test_client()
+    page = client.get('/scenarios')
+    assert f'/static/{manifest["js/scenarios.js"]}'.encode() in page.get_data()
+    assert client.get('/scenarios', headers={'If-None-Match': page.headers['ETag']}).status_code == 304
+
+    asset = client.get(f'/static/{manifest["css/style.css"]}')
+    assert asset.headers['Cache-Control'] == 'public, max-age=31536000, immutable'
+    assert 'immutable' not in client.get('/static/css/style.css').headers.get('Cache-Control', '')
+
+
+def test_create_app_builds_shared_structures():
+    """The preload factory leaves pages, scenario results and lookup tables built"""
+    import app as app_module
+    import fast_analyze
+    from reference_population import load_reference_population
+
+    assert app_module.create_app() is app
+    assert fast_analyze.create_application().fallback is app
+    assert set(app_module.rendered_pages) == {'index.html', 'scenarios.html'}
+    assert load_reference_population.cache_info().currsize == 1
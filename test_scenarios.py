@@ -13,6 +13,8 @@ TEST INSTRUCTIONS:
 """
 
 from red_flag_detector import analyze_quiz_responses, ServiceTier
+from scenario_catalog import scenario_catalog
+from scenario_validation import validate_scenarios
 
 # ============================================================================
 # SECTION 1: BASIC PLANNING RED FLAGS (Individual Tests)
@@ -407,6 +409,7 @@ def test_wealth_rf3_stock_concentration():
 
 # ============================================================================
 # SECTION 4: MULTI-TIER SCENARIOS (Complex Cases)
+# Responses come from data/scenarios.json, the catalog the web app serves
 # ============================================================================
 
 def test_scenario_young_professional():
@@ -419,18 +422,7 @@ def test_scenario_young_professional():
     print("SCENARIO: Young Professional Starting Career")
     print("="*80)
     
-    responses = {
-        'q2_concerns': ['running_out_of_money', 'not_being_on_pace'],
-        'q4_retirement_age': 55,  # Early retirement
-        'q9_investment_style': 'a',  # Risky
-        'q10_annual_savings': 3000,  # Low savings
-        'q11_account_types': [],  # No accounts
-        'q12_total_savings': 10000,  # Just starting
-        'timed_q4_on_pace': 'not_sure',
-        'timed_q5_investments_appropriate': 'should_reevaluate',
-        'timed_q7_market_crash': 'concerned_stressed',
-        'timed_q8_financial_plan': 'dont_have_one',
-    }
+    responses = scenario_catalog.responses('young_professional')
     
     analyze_quiz_responses(responses)
     
@@ -449,18 +441,7 @@ def test_scenario_high_earner_approaching_retirement():
     print("SCENARIO: High Earner Approaching Retirement")
     print("="*80)
     
-    responses = {
-        'q2_concerns': ['paying_too_much_taxes'],
-        'q4_retirement_age': 68,  # Late retirement
-        'q8_work_benefits': ['pension', 'deferred_compensation', 'stock_options'],
-        'q8b_pension_income': 80000,
-        'q9_investment_style': 'b',
-        'q10_annual_savings': 50000,
-        'q11_account_types': ['old_employer_plan'],  # No Roth/Whole Life
-        'q12_total_savings': 2500000,  # High net worth
-        'q_current_progress': 'multiple_retirement_accounts',
-        'timed_q6_rmd_planning': 'no_unclear',
-    }
+    responses = scenario_catalog.responses('high_earner')
     
     analyze_quiz_responses(responses)
     
@@ -479,15 +460,7 @@ def test_scenario_conservative_mid_career():
     print("SCENARIO: Conservative Mid-Career Investor")
     print("="*80)
     
-    responses = {
-        'q2_concerns': ['market_volatility'],
-        'q4_retirement_age': 62,
-        'q9_investment_style': 'd',  # Safe investments
-        'q10_annual_savings': 18000,
-        'q11_account_types': ['roth_accounts', 'whole_life'],
-        'q12_total_savings': 600000,
-        'timed_q8_financial_plan': 'very_clear',
-    }
+    responses = scenario_catalog.responses('conservative')
     
     analyze_quiz_responses(responses)
     
@@ -506,18 +479,7 @@ def test_scenario_optimal_planner():
     print("SCENARIO: Optimal Retirement Planner")
     print("="*80)
     
-    responses = {
-        'q2_concerns': [],
-        'q4_retirement_age': 65,
-        'q9_investment_style': 'b',  # Moderate
-        'q10_annual_savings': 25000,
-        'q11_account_types': ['roth_accounts', 'whole_life'],
-        'q12_total_savings': 1200000,
-        'timed_q4_on_pace': 'calculated_target',
-        'timed_q5_investments_appropriate': 'risk_return_target',
-        'timed_q6_rmd_planning': 'yes_long_term_plan',
-        'timed_q8_financial_plan': 'very_clear',
-    }
+    responses = scenario_catalog.responses('optimal')
     
     analyze_quiz_responses(responses)
     
@@ -534,18 +496,11 @@ def test_scenario_tax_mastery_threshold():
     print("SCENARIO: Tax Mastery Threshold Test (Exactly 2 Tax Flags)")
     print("="*80)
     
-    responses = {
-        'q2_concerns': ['paying_too_much_taxes'],
-        'q4_retirement_age': 57,  # Early retirement (tax_rf1)
-        'q9_investment_style': 'b',
-        'q10_annual_savings': 20000,
-        'q11_account_types': ['old_employer_plan'],  # No Roth/Whole Life (tax_rf4)
-        'q12_total_savings': 800000,
-    }
+    responses = scenario_catalog.responses('tax_threshold')
     
     analyze_quiz_responses(responses)
     
-    print("\n✅ EXPECTED: tax_rf1, tax_rf4 (exactly 2 tax flags)")
+    print("\n✅ EXPECTED: tax_rf1, tax_rf4 (exactly 2 tax flags) plus basic_rf6 (old employer plan)")
     print("✅ EXPECTED: Tax Mastery recommended (threshold met)")
 
 
@@ -793,6 +748,14 @@ def run_full_test_suite():
     run_all_scenario_tests()
     run_all_edge_case_tests()
     
+    # Automated check of the whole scenario catalog against its expectations
+    report = validate_scenarios(scenario_catalog.scenarios)
+    print("\n\n" + "#"*80)
+    print(f"# CATALOG VALIDATION: {report['passed']}/{report['total']} scenarios passed")
+    print("#"*80)
+    for scenario in report['scenarios']:
+        print(f"  {'PASS' if scenario['passed'] else 'FAIL'}  {scenario['id']}")
+    
     print("\n\n" + "="*80)
     print("TEST SUITE COMPLETE")
     print("="*80)
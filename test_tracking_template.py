@@ -158,7 +158,7 @@ EXAMPLE 3: Conservative mid-career
 EXAMPLE 4: Edge case - exactly 2 tax flags (threshold)
 -------------------------------------------------------
 {
-    'q2_concerns': ['paying_too_much_taxes'],
+    'q2_concerns': [],
     'q4_retirement_age': 57,
     'q9_investment_style': 'b',
     'q10_annual_savings': 20000,
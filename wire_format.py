@@ -0,0 +1,268 @@
+"""
+RetireUS Binary Wire Format
+===========================
+Fixed-width binary records for bulk analysis, so large uploads skip JSON
+parsing and per-record dicts entirely.
+
+A payload is a 12-byte header followed by packed little-endian records:
+
+    magic (4 bytes) | version (uint16) | record size (uint16) | count (uint32)
+
+Request records (magic RTUQ) carry the quiz fields that format_responses
+keeps:
+- numeric answers as integers, NOT_ANSWERED (the dtype's minimum) when the
+  answer is missing or zero, exactly as format_responses drops them
+- single-select answers as uint8 codes: 0 = not answered, 1.. = position in
+  the field's vocabulary + 1, OTHER_CODE = an answer outside the vocabulary
+- multi-select answers as uint8 bitsets over the field's vocabulary
+
+Result records (magic RTUR) carry the red flags as a bitset over FLAG_IDS,
+the recommended tier and the three scores with their status codes.
+
+The server decodes a body with numpy.frombuffer over the buffer itself, so
+decoding is zero-copy and creates no Python object per record.
+
+USAGE:
+    python wire_format.py encode responses.jsonl records.bin
+    python wire_format.py decode results.bin          # results as JSON lines
+"""
+
+import json
+import struct
+import sys
+
+import numpy as np
+
+from analysis import format_responses
+from scoring import STATUSES
+
+WIRE_VERSION = 1
+
+REQUEST_MAGIC = b'RTUQ'
+RESULT_MAGIC = b'RTUR'
+HEADER = struct.Struct('<4sHHI')
+
+MIME_TYPE = 'application/x-retireus-records'
+RESULT_MIME_TYPE = 'application/x-retireus-results'
+
+NUMERIC_FIELDS = (
+    ('q4_retirement_age', '<i2'),
+    ('q7_annual_retirement_cost', '<i4'),
+    ('q8b_pension_income', '<i4'),
+    ('q10_annual_savings', '<i4'),
+    ('q12_total_savings', '<i8'),
+)
+
+SINGLE_SELECT_FIELDS = {
+    'q9_investment_style': ('a', 'b', 'c', 'd'),
+    'timed_q4_on_pace': ('calculated_target', 'not_sure'),
+    'timed_q5_investments_appropriate': ('risk_return_target', 'should_reevaluate'),
+    'timed_q6_rmd_planning': ('yes_long_term_plan', 'no_unclear'),
+    'timed_q7_market_crash': ('wouldnt_bother_me', 'concerned_stressed'),
+    'timed_q8_financial_plan': ('very_clear', 'dont_have_one'),
+    'q_current_progress': ('savings_not_set_for_retirement', 'havent_started_saving',
+                           'only_employer_account', 'multiple_retirement_accounts'),
+    'q_tax_concern': ('not_much_tax_free_savings', 'lot_in_pretax_accounts'),
+    'q_market_volatility_concern': ('not_sure_risk_exposure',),
+}
+
+MULTI_SELECT_FIELDS = {
+    'q2_concerns': ('running_out_of_money', 'not_being_on_pace', 'market_volatility',
+                    'paying_too_much_taxes'),
+    'q8_work_benefits': ('pension', 'deferred_compensation', 'stock_options'),
+    'q11_account_types': ('roth_accounts', 'whole_life', 'annuity_contracts', 'old_employer_plan'),
+}
+
+OTHER_CODE = 255
+OTHER_ANSWER = 'other'
+
+RECORD_DTYPE = np.dtype(
+    [(name, dtype) for name, dtype in NUMERIC_FIELDS]
+    + [(name, 'u1') for name in SINGLE_SELECT_FIELDS]
+    + [(name, 'u1') for name in MULTI_SELECT_FIELDS]
+)
+
+NOT_ANSWERED = {name: np.iinfo(dtype).min for name, dtype in NUMERIC_FIELDS}
+
+# Red flags in detection order; bit i of a result's flags is FLAG_IDS[i]
+FLAG_IDS = (
+    'basic_rf1', 'basic_rf2', 'basic_rf3', 'basic_rf4', 'basic_rf5', 'basic_rf6', 'basic_rf7',
+    'tax_rf1', 'tax_rf2', 'tax_rf3', 'tax_rf4', 'tax_rf5',
+    'wealth_rf1', 'wealth_rf2', 'wealth_rf3',
+)
+
+TIERS = ('Basic Planning', 'Tax Mastery', 'Wealth Mastery')
+
+RESULT_DTYPE = np.dtype([
+    ('flags', '<u2'),
+    ('tier', 'u1'),
+    ('tier_flag_count', 'u1'),
+    ('pacing_score', 'i1'),
+    ('pacing_status', 'u1'),
+    ('tax_planning_score', 'i1'),
+    ('tax_planning_status', 'u1'),
+    ('risk_score', '<f8'),
+    ('risk_status', 'u1'),
+    ('pacing_fv_target', '<f8'),
+])
+
+
+class WireFormatError(ValueError):
+    """Raised for payloads that are not valid wire-format data"""
+
+
+def _pack(magic, records, dtype):
+    header = HEADER.pack(magic, WIRE_VERSION, dtype.itemsize, len(records))
+    return header + np.ascontiguousarray(records, dtype=dtype).tobytes()
+
+
+def _unpack(buffer, magic, dtype):
+    view = memoryview(buffer)
+    if len(view) < HEADER.size:
+        raise WireFormatError('Payload shorter than the wire-format header')
+    found_magic, version, record_size, count = HEADER.unpack_from(view)
+    if found_magic != magic:
+        raise WireFormatError(f'Bad magic {found_magic!r}, expected {magic!r}')
+    if version != WIRE_VERSION:
+        raise WireFormatError(f'Unsupported wire-format version {version}')
+    if record_size != dtype.itemsize:
+        raise WireFormatError(f'Record size {record_size} does not match version {version}')
+    if len(view) != HEADER.size + count * record_size:
+        raise WireFormatError(f'Payload length does not match {count} records')
+    return np.frombuffer(view, dtype=dtype, count=count, offset=HEADER.size)
+
+
+def decode_records(buffer):
+    """
+    Zero-copy view of a request payload's records
+    Returns: read-only structured array of RECORD_DTYPE
+    """
+    return _unpack(buffer, REQUEST_MAGIC, RECORD_DTYPE)
+
+
+def encode_results(results):
+    """Result payload bytes for a RESULT_DTYPE array"""
+    return _pack(RESULT_MAGIC, results, RESULT_DTYPE)
+
+
+def decode_results(buffer):
+    """
+    Zero-copy view of a result payload's records
+    Returns: read-only structured array of RESULT_DTYPE
+    """
+    return _unpack(buffer, RESULT_MAGIC, RESULT_DTYPE)
+
+
+def encode_responses(responses_list):
+    """
+    Request payload bytes for raw quiz responses, applying the same
+    field handling as format_responses
+    """
+    records = np.zeros(len(responses_list), dtype=RECORD_DTYPE)
+    for i, raw_responses in enumerate(responses_list):
+        formatted = format_responses(raw_responses)
+        record = records[i]
+        for name, dtype in NUMERIC_FIELDS:
+            value = formatted.get(name)
+            if value is None:
+                record[name] = NOT_ANSWERED[name]
+            elif NOT_ANSWERED[name] < value <= np.iinfo(dtype).max:
+                record[name] = value
+            else:
+                raise WireFormatError(f'{name}={value} does not fit the wire format')
+        for name, vocabulary in SINGLE_SELECT_FIELDS.items():
+            if name in formatted:
+                value = formatted[name]
+                record[name] = vocabulary.index(value) + 1 if value in vocabulary else OTHER_CODE
+        for name, vocabulary in MULTI_SELECT_FIELDS.items():
+            chosen = formatted.get(name, [])
+            record[name] = sum(1 << bit for bit, value in enumerate(vocabulary) if value in chosen)
+    return _pack(REQUEST_MAGIC, records, RECORD_DTYPE)
+
+
+def answers(records, name):
+    """
+    A single-select field's answers as a numpy string array ('' when not
+    answered, OTHER_ANSWER outside the vocabulary), built with one take
+    """
+    table = np.full(256, OTHER_ANSWER, dtype=object)
+    table[0] = ''
+    table[1:len(SINGLE_SELECT_FIELDS[name]) + 1] = SINGLE_SELECT_FIELDS[name]
+    return table.astype(str)[records[name]]
+
+
+def chose(records, name, value):
+    """Boolean array: whether each record's multi-select answer includes value"""
+    bit = MULTI_SELECT_FIELDS[name].index(value)
+    return (records[name] & (1 << bit)) != 0
+
+
+def numeric(records, name, default):
+    """A numeric field as int64, with default where it was not answered"""
+    values = records[name].astype(np.int64)
+    return np.where(values == NOT_ANSWERED[name], default, values)
+
+
+def decode_responses(records):
+    """
+    Formatted responses dicts back from request records (OTHER_ANSWER
+    stands in for answers outside a vocabulary)
+    Returns: list of dicts
+    """
+    responses_list = []
+    for record in records:
+        responses = {}
+        for name, vocabulary in MULTI_SELECT_FIELDS.items():
+            bits = int(record[name])
+            responses[name] = [value for bit, value in enumerate(vocabulary) if bits & (1 << bit)]
+        for name, _ in NUMERIC_FIELDS:
+            if record[name] != NOT_ANSWERED[name]:
+                responses[name] = int(record[name])
+        for name, vocabulary in SINGLE_SELECT_FIELDS.items():
+            code = int(record[name])
+            if code:
+                responses[name] = vocabulary[code - 1] if code <= len(vocabulary) else OTHER_ANSWER
+        responses_list.append(responses)
+    return responses_list
+
+
+def result_dicts(results):
+    """
+    Plain dicts from result records, in the /api/analyze field names
+    Returns: list of dicts
+    """
+    return [
+        {
+            'red_flags': [flag for bit, flag in enumerate(FLAG_IDS) if int(result['flags']) & (1 << bit)],
+            'recommended_plan': {'tier': TIERS[result['tier']],
+                                 'flag_count': int(result['tier_flag_count'])},
+            'scores': {
+                'pacing': {'score': int(result['pacing_score']),
+                           'status': STATUSES[result['pacing_status']],
+                           'fv_target': round(float(result['pacing_fv_target']), 2)},
+                'tax_planning': {'score': int(result['tax_planning_score']),
+                                 'status': STATUSES[result['tax_planning_status']]},
+                'risk_of_failure': {'score': float(result['risk_score']),
+                                    'status': STATUSES[result['risk_status']]},
+            },
+        }
+        for result in results
+    ]
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 4 and sys.argv[1] == 'encode':
+        with open(sys.argv[2]) as f:
+            responses_list = [json.loads(line) for line in f if line.strip()]
+        with open(sys.argv[3], 'wb') as f:
+            f.write(encode_responses(responses_list))
+        print(f"Encoded {len(responses_list)} responses into {sys.argv[3]}")
+    elif len(sys.argv) == 3 and sys.argv[1] == 'decode':
+        with open(sys.argv[2], 'rb') as f:
+            payload = f.read()
+        for result in result_dicts(decode_results(payload)):
+            print(json.dumps(result))
+    else:
+        print("Usage: python wire_format.py encode responses.jsonl records.bin")
+        print("       python wire_format.py decode results.bin")
+        sys.exit(1)
@@ -0,0 +1,241 @@
+"""
+RetireUS Withdrawal-Strategy Simulator
+======================================
+Models the decumulation phase after q4_retirement_age.
+
+Four withdrawal rules run side by side over the same simulated return paths:
+- fixed_percent: the initial rate of the current balance every year
+- constant_dollar: the first year's dollar amount, held constant
+- guardrails: constant dollar, cut 10% when the current rate drifts 20% above
+  the initial rate and raised 10% when it drifts 20% below
+- rmd: the current balance divided by the Uniform Lifetime distribution period
+
+All strategies share one (strategies x paths) state array, so the cost of a run
+is close to a single simulation rather than four.
+"""
+
+from functools import lru_cache
+from typing import Dict
+
+import numpy as np
+
+from historical_replay import portfolio_returns, replay_future_values
+from tax_tables import rmd_divisor
+
+STRATEGIES = ('fixed_percent', 'constant_dollar', 'guardrails', 'rmd')
+
+# Age the plan has to last until
+PLANNING_AGE = 95
+
+DEFAULT_PATHS = 2000
+DEFAULT_SEED = 2024
+DEFAULT_WITHDRAWAL_RATE = 0.04
+
+# Guardrail band around the initial withdrawal rate, and the size of each adjustment
+GUARDRAIL_BAND = 0.20
+GUARDRAIL_ADJUSTMENT = 0.10
+
+# Relative margin the solved withdrawal rate keeps below a path's exact capacity
+CAPACITY_MARGIN = 1e-9
+
+
+@lru_cache(maxsize=64)
+def simulate_return_paths(investment_style, n_years, n_paths=DEFAULT_PATHS, seed=DEFAULT_SEED):
+    """
+    Annual return paths bootstrapped from the historical portfolio returns for a style.
+
+    Paths are cached per (style, years, paths, seed), so every strategy and every
+    request with the same inputs reuses one read-only array.
+
+    Returns: array of shape (n_paths, n_years)
+    """
+    series = portfolio_returns(investment_style)
+    rng = np.random.default_rng(seed)
+    paths = series[rng.integers(0, len(series), size=(n_paths, n_years))]
+    paths.flags.writeable = False
+    return paths
+
+
+def run_withdrawal_strategies(start_balance, returns, start_age,
+                              initial_rate=DEFAULT_WITHDRAWAL_RATE):
+    """
+    Run every strategy in STRATEGIES over the same return paths.
+
+    Withdrawals are taken at the start of each year, then the remaining balance
+    earns that year's return. A year counts as funded when the strategy could
+    pay its full withdrawal.
+
+    Returns: dict of (strategies x paths) arrays: ending_balance, years_funded,
+             depleted and total_withdrawn
+    """
+    n_paths, n_years = returns.shape
+    n_strategies = len(STRATEGIES)
+    fixed, constant, guardrails, rmd = range(n_strategies)
+
+    balance = np.full((n_strategies, n_paths), float(start_balance))
+    planned = np.empty_like(balance)
+    years_funded = np.zeros((n_strategies, n_paths), dtype=np.int64)
+    depleted = np.zeros((n_strategies, n_paths), dtype=bool)
+    total_withdrawn = np.zeros_like(balance)
+
+    first_year = initial_rate * start_balance
+    planned[constant] = first_year
+    planned[guardrails] = first_year
+
+    growth = 1.0 + returns.T
+    for year in range(n_years):
+        planned[fixed] = initial_rate * balance[fixed]
+        planned[rmd] = balance[rmd] / rmd_divisor(start_age + year)
+
+        if year > 0:
+            with np.errstate(divide='ignore', invalid='ignore'):
+                current_rate = planned[guardrails] / balance[guardrails]
+            cut = current_rate > initial_rate * (1 + GUARDRAIL_BAND)
+            raise_ = current_rate < initial_rate * (1 - GUARDRAIL_BAND)
+            planned[guardrails] *= np.where(cut, 1 - GUARDRAIL_ADJUSTMENT,
+                                            np.where(raise_, 1 + GUARDRAIL_ADJUSTMENT, 1.0))
+
+        withdrawal = np.minimum(planned, balance)
+        funded = ~depleted & (withdrawal >= planned) & (planned > 0)
+        years_funded += funded
+        depleted |= ~funded
+        total_withdrawn += withdrawal
+        balance = (balance - withdrawal) * growth[year]
+
+    return {
+        'ending_balance': balance,
+        'years_funded': years_funded,
+        'depleted': depleted,
+        'total_withdrawn': total_withdrawn,
+    }
+
+
+def strategy_statistics(outcomes):
+    """
+    Depletion rate, longevity and ending-balance percentiles and median total
+    withdrawn for each strategy
+    Returns: array of shape (strategies, 8)
+    """
+    statistics = np.empty((len(STRATEGIES), 8))
+    for i in range(len(STRATEGIES)):
+        statistics[i, 0] = np.mean(outcomes['depleted'][i])
+        statistics[i, 1:4] = np.percentile(outcomes['years_funded'][i], [10, 50, 90])
+        statistics[i, 4:7] = np.percentile(outcomes['ending_balance'][i], [10, 50, 90])
+        statistics[i, 7] = np.median(outcomes['total_withdrawn'][i])
+    return statistics
+
+
+@lru_cache(maxsize=1024)
+def unit_strategy_statistics(investment_style, start_age, n_years, n_paths=DEFAULT_PATHS,
+                             seed=DEFAULT_SEED, initial_rate=DEFAULT_WITHDRAWAL_RATE):
+    """
+    strategy_statistics for a starting balance of 1.0.
+
+    Every strategy's withdrawals are proportional to the starting or current
+    balance, so dollar figures scale linearly with the starting balance and
+    the rest do not change. One cached run per (style, age, horizon) serves
+    every user who shares them.
+
+    Returns: read-only array of shape (strategies, 8)
+    """
+    returns = simulate_return_paths(investment_style, n_years, n_paths, seed)
+    statistics = strategy_statistics(run_withdrawal_strategies(1.0, returns, start_age, initial_rate))
+    statistics.flags.writeable = False
+    return statistics
+
+
+def summarize_strategies(outcomes, n_years) -> Dict:
+    """
+    Longevity and ending-balance distributions for each strategy
+    Returns: dict keyed by strategy name
+    """
+    return _format_statistics(strategy_statistics(outcomes), n_years)
+
+
+def _format_statistics(statistics, n_years, start_balance=1.0) -> Dict:
+    """Strategy summary dict from strategy_statistics, with dollars scaled by start_balance"""
+    summary = {}
+    for i, name in enumerate(STRATEGIES):
+        depletion, longevity, ending, withdrawn = (statistics[i, 0], statistics[i, 1:4],
+                                                   statistics[i, 4:7] * start_balance,
+                                                   statistics[i, 7] * start_balance)
+        summary[name] = {
+            'depletion_rate': round(float(depletion), 4),
+            'longevity_years': {
+                'p10': float(longevity[0]),
+                'p50': float(longevity[1]),
+                'p90': float(longevity[2]),
+            },
+            'ending_balance': {
+                'p10': round(float(ending[0]), 2),
+                'p50': round(float(ending[1]), 2),
+                'p90': round(float(ending[2]), 2),
+            },
+            'median_annual_withdrawal': round(float(withdrawn) / n_years, 2),
+        }
+    return summary
+
+
+@lru_cache(maxsize=1024)
+def solve_safe_withdrawal_rate(investment_style, n_years, target_success=0.90,
+                               n_paths=DEFAULT_PATHS, seed=DEFAULT_SEED):
+    """
+    Highest constant-dollar withdrawal rate that lasts n_years on at least
+    target_success of the simulated paths.
+
+    Every path is solved once on the shared return paths: with start-of-year
+    withdrawals, a path funds all n_years exactly when the rate is at most
+    1 / sum(1 / cumulative growth before each withdrawal). Success is monotone
+    in the rate, so the bisection reduces to a binary search over the sorted
+    per-path capacities - nothing is re-simulated per step. Results are cached
+    by (investment style, horizon, target).
+
+    Returns: withdrawal rate as a fraction of the starting balance
+    """
+    n_years = max(int(n_years), 1)
+    returns = simulate_return_paths(investment_style, n_years, n_paths, seed)
+
+    # growth_before[:, t] = growth of the starting balance before year t's withdrawal
+    growth_before = np.cumprod(1.0 + returns, axis=1) / (1.0 + returns)
+    capacity = np.sort(1.0 / np.sum(1.0 / growth_before, axis=1))
+
+    # Smallest capacity that still leaves target_success of paths at or above it.
+    # That path runs out exactly at the boundary, so step just inside it: the
+    # year-by-year simulation rounds differently from the closed form
+    paths_needed = int(np.ceil(target_success * n_paths))
+    paths_needed = min(max(paths_needed, 1), n_paths)
+    return float(capacity[n_paths - paths_needed] * (1.0 - CAPACITY_MARGIN))
+
+
+def simulate_withdrawals(responses, n_paths=DEFAULT_PATHS, seed=DEFAULT_SEED,
+                         initial_rate=DEFAULT_WITHDRAWAL_RATE) -> Dict:
+    """
+    Simulate the decumulation phase for a user's quiz responses.
+
+    The starting balance is the median historical-replay balance at
+    q4_retirement_age; the plan has to last until PLANNING_AGE.
+
+    Returns: dict with the simulation inputs and a summary per strategy
+    """
+    retirement_age = responses.get('q4_retirement_age', 65)
+    investment_style = responses.get('q9_investment_style', 'b')
+    annual_savings = responses.get('q10_annual_savings', 15000)
+    total_savings = responses.get('q12_total_savings', 500000)
+
+    current_age = 40
+    _, balances = replay_future_values(investment_style, retirement_age - current_age,
+                                       annual_savings, total_savings)
+    start_balance = float(np.median(balances)) if len(balances) else float(total_savings)
+    n_years = max(PLANNING_AGE - retirement_age, 1)
+
+    statistics = unit_strategy_statistics(investment_style, retirement_age, n_years,
+                                          n_paths, seed, initial_rate)
+
+    return {
+        'start_age': retirement_age,
+        'start_balance': round(start_balance, 2),
+        'years': n_years,
+        'paths': n_paths,
+        'initial_rate': initial_rate,
+        'strategies': _format_statistics(statistics, n_years, start_balance),
+    }